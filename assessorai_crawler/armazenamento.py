@@ -0,0 +1,287 @@
+# Arquivo: assessorai_crawler/armazenamento.py
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+
+def abrir_sqlite(caminho, **kwargs):
+    """Abre um banco SQLite em modo WAL, criando o diretório se necessário."""
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    conexao = sqlite3.connect(caminho, **kwargs)
+    conexao.row_factory = sqlite3.Row
+    conexao.execute('PRAGMA journal_mode=WAL')
+    conexao.execute('PRAGMA synchronous=NORMAL')
+    return conexao
+
+
+def sha256_arquivo(caminho, tamanho_bloco=1 << 20):
+    """Calcula o SHA-256 de um arquivo sem carregá-lo inteiro na memória."""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+class ArmazemConteudo:
+    """
+    Armazém de arquivos endereçado por conteúdo: cada arquivo é salvo uma única vez
+    em <raiz>/ab/cd/<sha256>, e os caminhos legíveis são hardlinks para esses blobs.
+    """
+
+    def __init__(self, raiz):
+        self.raiz = raiz
+
+    def caminho_blob(self, sha256):
+        return os.path.join(self.raiz, sha256[:2], sha256[2:4], sha256)
+
+    def existe(self, sha256):
+        return os.path.exists(self.caminho_blob(sha256))
+
+    def guardar(self, dados):
+        """Salva os bytes (se ainda não existirem) e devolve o SHA-256."""
+        sha256 = hashlib.sha256(dados).hexdigest()
+        if not self.existe(sha256):
+            destino = self.caminho_blob(sha256)
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            fd, temporario = tempfile.mkstemp(dir=os.path.dirname(destino), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(dados)
+            os.replace(temporario, destino)
+        return sha256
+
+    def adotar(self, caminho, sha256):
+        """Move para o armazém um arquivo já gravado em disco cujo hash é conhecido."""
+        destino = self.caminho_blob(sha256)
+        if os.path.exists(destino):
+            os.remove(caminho)
+        else:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            os.replace(caminho, destino)
+        return sha256
+
+    def materializar(self, sha256, destino):
+        """Cria (ou substitui) o caminho legível como hardlink para o blob."""
+        origem = self.caminho_blob(sha256)
+        if os.path.exists(destino) and os.path.samefile(origem, destino):
+            return destino
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporario = f"{destino}.{os.getpid()}.tmp"
+        try:
+            os.link(origem, temporario)
+        except OSError:
+            # sistemas de arquivos diferentes ou sem suporte a hardlink
+            shutil.copyfile(origem, temporario)
+        os.replace(temporario, destino)
+        return destino
+
+
+class IndiceArquivos:
+    """
+    Índice persistente URL → SHA-256 dos arquivos baixados, com os validadores HTTP
+    (ETag, Last-Modified, Content-Length) usados para revalidar com requisições condicionais.
+    """
+
+    COLUNAS_VALIDADORES = {
+        "etag": "TEXT",
+        "last_modified": "TEXT",
+        "content_length": "INTEGER",
+        "validado_em": "REAL",
+    }
+
+    def __init__(self, caminho):
+        self.conexao = abrir_sqlite(caminho)
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS arquivos (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                caminho TEXT,
+                tamanho INTEGER,
+                atualizado_em REAL
+            )
+        """)
+        # índices criados antes dos validadores ganham as colunas novas
+        existentes = {linha["name"] for linha in self.conexao.execute("PRAGMA table_info(arquivos)")}
+        for coluna, tipo in self.COLUNAS_VALIDADORES.items():
+            if coluna not in existentes:
+                self.conexao.execute(f"ALTER TABLE arquivos ADD COLUMN {coluna} {tipo}")
+        self.conexao.execute("CREATE INDEX IF NOT EXISTS arquivos_sha256 ON arquivos (sha256)")
+        self.conexao.commit()
+
+    def obter(self, url):
+        linha = self.conexao.execute("SELECT * FROM arquivos WHERE url = ?", (url,)).fetchone()
+        return dict(linha) if linha else None
+
+    def registrar(self, url, sha256, caminho, tamanho, etag=None, last_modified=None, content_length=None):
+        agora = time.time()
+        self.conexao.execute(
+            """
+            INSERT INTO arquivos (url, sha256, caminho, tamanho, atualizado_em,
+                                  etag, last_modified, content_length, validado_em)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                sha256 = excluded.sha256,
+                caminho = excluded.caminho,
+                tamanho = excluded.tamanho,
+                atualizado_em = excluded.atualizado_em,
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                content_length = excluded.content_length,
+                validado_em = excluded.validado_em
+            """,
+            (url, sha256, caminho, tamanho, agora, etag, last_modified, content_length, agora)
+        )
+        self.conexao.commit()
+
+    def marcar_validado(self, url):
+        """Registra que o servidor confirmou (304) que o arquivo não mudou."""
+        self.conexao.execute("UPDATE arquivos SET validado_em = ? WHERE url = ?", (time.time(), url))
+        self.conexao.commit()
+
+    def fechar(self):
+        self.conexao.commit()
+        self.conexao.close()
+
+
+class RegistroVistos:
+    """
+    Registro persistente, por spider, das proposições já coletadas: uuid → impressão da linha da
+    listagem e momento da última coleta completa. Permite pular as páginas de detalhe das
+    proposições cuja linha não mudou (ver VistosSpiderMiddleware).
+    """
+
+    def __init__(self, caminho):
+        self.conexao = abrir_sqlite(caminho)
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS vistos (
+                spider TEXT NOT NULL,
+                uuid TEXT NOT NULL,
+                impressao TEXT NOT NULL,
+                visto_em REAL NOT NULL,
+                PRIMARY KEY (spider, uuid)
+            ) WITHOUT ROWID
+        """)
+        self.conexao.commit()
+
+    def obter(self, spider, uuid):
+        linha = self.conexao.execute(
+            "SELECT impressao, visto_em FROM vistos WHERE spider = ? AND uuid = ?", (spider, uuid)
+        ).fetchone()
+        return dict(linha) if linha else None
+
+    def vazio(self, spider):
+        return self.conexao.execute("SELECT 1 FROM vistos WHERE spider = ? LIMIT 1", (spider,)).fetchone() is None
+
+    def registrar(self, spider, uuid, impressao):
+        self.conexao.execute(
+            """
+            INSERT INTO vistos (spider, uuid, impressao, visto_em) VALUES (?, ?, ?, ?)
+            ON CONFLICT(spider, uuid) DO UPDATE SET
+                impressao = excluded.impressao,
+                visto_em = excluded.visto_em
+            """,
+            (spider, uuid, impressao, time.time())
+        )
+
+    def confirmar(self):
+        self.conexao.commit()
+
+    def fechar(self):
+        self.conexao.commit()
+        self.conexao.close()
+
+
+class RegistroMarcasDagua:
+    """Data mais recente (YYYY-MM-DD) de documento coletada na última execução completa de cada spider."""
+
+    def __init__(self, caminho):
+        self.conexao = abrir_sqlite(caminho)
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS marcas_dagua (
+                spider TEXT PRIMARY KEY,
+                data_documento TEXT NOT NULL,
+                atualizado_em REAL
+            )
+        """)
+        self.conexao.commit()
+
+    def obter(self, spider):
+        linha = self.conexao.execute(
+            "SELECT data_documento FROM marcas_dagua WHERE spider = ?", (spider,)
+        ).fetchone()
+        return linha["data_documento"] if linha else None
+
+    def avancar(self, spider, data_documento):
+        """Grava a nova marca, que nunca recua."""
+        self.conexao.execute(
+            """
+            INSERT INTO marcas_dagua (spider, data_documento, atualizado_em) VALUES (?, ?, ?)
+            ON CONFLICT(spider) DO UPDATE SET
+                data_documento = max(data_documento, excluded.data_documento),
+                atualizado_em = excluded.atualizado_em
+            """,
+            (spider, data_documento, time.time())
+        )
+        self.conexao.commit()
+
+    def fechar(self):
+        self.conexao.close()
+
+
+class RegistroPaginacao:
+    """
+    Ponto de retomada das listagens paginadas por postback (ASP.NET): a requisição (URL e corpo com
+    o __VIEWSTATE) da última página até a qual todas as anteriores já foram processadas, com os
+    parâmetros da execução (período, limite, registros por página) a que ela se refere.
+    """
+
+    def __init__(self, caminho):
+        self.conexao = abrir_sqlite(caminho)
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS paginacao (
+                spider TEXT NOT NULL,
+                listagem TEXT NOT NULL,
+                pagina INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                corpo TEXT NOT NULL,
+                atualizado_em REAL NOT NULL,
+                parametros TEXT,
+                PRIMARY KEY (spider, listagem)
+            )
+        """)
+        # pontos gravados antes dos parâmetros ficam sem eles e não são retomados
+        existentes = {linha["name"] for linha in self.conexao.execute("PRAGMA table_info(paginacao)")}
+        if "parametros" not in existentes:
+            self.conexao.execute("ALTER TABLE paginacao ADD COLUMN parametros TEXT")
+        self.conexao.commit()
+
+    def obter(self, spider, listagem):
+        linha = self.conexao.execute(
+            "SELECT pagina, url, corpo, atualizado_em, parametros FROM paginacao WHERE spider = ? AND listagem = ?",
+            (spider, listagem)
+        ).fetchone()
+        if not linha:
+            return None
+        ponto = dict(linha)
+        ponto["parametros"] = json.loads(ponto["parametros"]) if ponto["parametros"] else None
+        return ponto
+
+    def salvar(self, spider, listagem, pagina, url, corpo, parametros=None):
+        self.conexao.execute(
+            "INSERT OR REPLACE INTO paginacao (spider, listagem, pagina, url, corpo, atualizado_em, parametros) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (spider, listagem, pagina, url, corpo, time.time(), json.dumps(parametros, sort_keys=True))
+        )
+        self.conexao.commit()
+
+    def remover(self, spider, listagem):
+        self.conexao.execute("DELETE FROM paginacao WHERE spider = ? AND listagem = ?", (spider, listagem))
+        self.conexao.commit()
+
+    def fechar(self):
+        self.conexao.close()
@@ -0,0 +1,347 @@
+# Arquivo: assessorai_crawler/aspnet.py
+
+import re
+import time
+import weakref
+
+import scrapy
+from scrapy import signals
+from scrapy.utils.spider import iterate_spider_output
+
+from .armazenamento import RegistroPaginacao
+
+_RE_DO_POSTBACK = re.compile(r"""__doPostBack\(\s*['"]([^'"]*)['"]\s*,\s*['"]([^'"]*)['"]\s*\)""")
+# argumento dos paginadores do GridView: Page$3
+_RE_ARGUMENTO_PAGINA = re.compile(r'^Page\$(\d+)$')
+# selects de "registros por página"
+_RE_CONTROLE_TAMANHO = re.compile(r'(?i)pagina|pagesize|registros|quantidade|tamanho')
+
+
+def campos_formulario(response):
+    """Campos que o navegador enviaria num postback: ocultos (__VIEWSTATE etc.), texto, marcados e selects."""
+    campos = {}
+    for campo in response.css('form input'):
+        nome = campo.attrib.get('name')
+        tipo = campo.attrib.get('type', 'text').lower()
+        if not nome:
+            continue
+        if tipo in ('hidden', 'text', 'search'):
+            campos[nome] = campo.attrib.get('value', '')
+        elif tipo in ('checkbox', 'radio') and 'checked' in campo.attrib:
+            campos[nome] = campo.attrib.get('value', 'on')
+    for select in response.css('form select'):
+        nome = select.attrib.get('name')
+        valor = select.css('option[selected]::attr(value)').get() or select.css('option::attr(value)').get()
+        if nome and valor is not None:
+            campos[nome] = valor
+    return campos
+
+
+def links_de_pagina(response, id_proximo):
+    """
+    Postbacks diretos para páginas da listagem, {numero: (__EVENTTARGET, __EVENTARGUMENT)}:
+    argumentos Page$N em qualquer lugar da página e links numerados do paginador onde está o
+    botão de próxima página (os números dentro dos itens da listagem não contam).
+    """
+    paginas = {}
+    for link in response.css('a[href*="__doPostBack"]'):
+        postback = _RE_DO_POSTBACK.search(link.attrib['href'])
+        argumento = _RE_ARGUMENTO_PAGINA.match(postback.group(2)) if postback else None
+        if argumento:
+            paginas.setdefault(int(argumento.group(1)), postback.groups())
+
+    # sobe até três níveis a partir do botão de próxima página procurando os números do paginador
+    for paginador in response.xpath(f'//a[@id="{id_proximo}"]/ancestor::*[position() <= 3]'):
+        numerados = {}
+        for link in paginador.css('a[href*="__doPostBack"]'):
+            texto = ''.join(link.css('::text').getall()).strip()
+            postback = _RE_DO_POSTBACK.search(link.attrib['href'])
+            if postback and texto.isdigit():
+                numerados.setdefault(int(texto), postback.groups())
+        if len(numerados) >= 2:
+            for numero, postback in numerados.items():
+                paginas.setdefault(numero, postback)
+            break
+    return paginas
+
+
+def controle_tamanho_pagina(response):
+    """(nome do select, maior valor) do controle de registros por página com AutoPostBack, se der para aumentar."""
+    for select in response.css('form select'):
+        nome = select.attrib.get('name', '')
+        if not _RE_CONTROLE_TAMANHO.search(f"{nome} {select.attrib.get('id', '')}"):
+            continue
+        if '__doPostBack' not in select.attrib.get('onchange', ''):
+            continue
+        valores = [v.strip() for v in select.css('option::attr(value)').getall()]
+        if not valores or not all(v.isdigit() for v in valores):
+            continue
+        maior = max(valores, key=int)
+        atual = (select.css('option[selected]::attr(value)').get() or valores[0]).strip()
+        if int(maior) > int(atual):
+            return nome, maior
+    return None
+
+
+class PaginadorAspNet:
+    """
+    Paginação das listagens ASP.NET WebForms (Câmara Sem Papel), em que trocar de página é um
+    postback com o __VIEWSTATE/__EVENTVALIDATION da página anterior.
+
+    - Na primeira página, aumenta o número de registros por página se houver um select para isso.
+    - A cada página, pede de uma vez todas as páginas seguintes que o paginador oferece por número
+      (o __EVENTVALIDATION aceita qualquer link exibido), em vez de uma por vez pelo botão de
+      próxima página; sem links numerados, segue a cadeia serial do botão.
+    - Guarda em PAGINACAO_DB a requisição da última página até a qual todas as anteriores foram
+      processadas por inteiro: a listagem e todo o trabalho que saiu dela (páginas de detalhe,
+      requisições seguintes e itens, até passarem pelos pipelines ou falharem). Uma execução
+      interrompida recomeça dali, e o ponto é apagado quando a execução termina normalmente. Se o
+      __VIEWSTATE guardado não valer mais, a listagem recomeça do início.
+    - Só retoma execuções com saída incremental (spider.saida_incremental, um .jl de delta): numa
+      execução completa o .jl é reescrito e as páginas puladas ficariam de fora. O ponto também é
+      descartado se o período, o limite ou o número de registros por página forem outros.
+
+    O spider chama proximas(response, continuar) ao fim do parse de cada página da listagem, com
+    continuar=False quando encontra itens anteriores ao período, e fechar(reason) em closed().
+    """
+
+    def __init__(self, spider, url, callback, alvo_proximo, id_proximo, seletor_itens):
+        self.spider = spider
+        self.url = url
+        self.callback = callback
+        self.alvo_proximo = alvo_proximo
+        self.id_proximo = id_proximo
+        self.seletor_itens = seletor_itens
+        self.stats = spider.crawler.stats
+
+        settings = spider.settings
+        self.registro = None
+        if settings.getbool('PAGINACAO_RETOMADA_ENABLED'):
+            self.registro = RegistroPaginacao(settings.get('PAGINACAO_DB', 'storage/dbs/paginacao.sqlite3'))
+        self.validade_retomada = settings.getfloat('PAGINACAO_RETOMADA_HORAS', 12) * 3600
+        # argumentos da execução que mudam o conteúdo da listagem; o ponto de retomada só vale para os mesmos
+        self.parametros = None
+        # trabalho em andamento que saiu de cada página: requisições e itens ainda não finalizados
+        self.pendentes = {}
+        self.itens = {}
+        self._reiniciar()
+
+        sinais = spider.crawler.signals
+        sinais.connect(self._agendada, signal=signals.request_scheduled)
+        sinais.connect(self._requisicao_descartada, signal=signals.request_dropped)
+        sinais.connect(self._item_finalizado, signal=signals.item_scraped)
+        sinais.connect(self._item_finalizado, signal=signals.item_dropped)
+        sinais.connect(self._item_finalizado, signal=signals.item_error)
+
+    def _reiniciar(self):
+        self.solicitadas = set()
+        self.concluidas = set()
+        self.requisicoes = {}
+        self.contigua = 0
+        # primeira página com itens anteriores ao período: as seguintes não são pedidas
+        self.ultima_pagina = None
+
+    def inicio(self):
+        return scrapy.Request(self.url, callback=self._primeira_pagina, dont_filter=True)
+
+    def _primeira_pagina(self, response):
+        controle = controle_tamanho_pagina(response)
+        self.parametros = {
+            'data_inicio': getattr(self.spider, 'data_inicio', None),
+            'data_fim': getattr(self.spider, 'data_fim', None),
+            'limite': getattr(self.spider, 'limite_total_itens', None),
+            'tamanho_pagina': controle[1] if controle else None,
+        }
+        retomada = None if response.meta.get('sem_retomada') else self._ponto_retomada()
+        if retomada:
+            self.spider.logger.info(f"↩️ Paginação: retomando a listagem na página {retomada['pagina']}.")
+            self.stats.inc_value('aspnet/retomadas')
+            self.solicitadas.add(retomada['pagina'])
+            self.contigua = retomada['pagina'] - 1
+            yield scrapy.Request(
+                retomada['url'], method='POST', body=retomada['corpo'],
+                headers={'Content-Type': 'application/x-www-form-urlencoded'},
+                callback=self._listagem, errback=self._falha_retomada,
+                meta={'pagina': retomada['pagina'], 'retomada': True}, dont_filter=True,
+            )
+            return
+
+        if controle:
+            nome, valor = controle
+            self.spider.logger.info(f"Paginação: {valor} registros por página.")
+            self.stats.set_value('aspnet/tamanho_pagina', int(valor))
+            yield self._postback(response, nome, '', 1, {nome: valor})
+            return
+
+        self.solicitadas.add(1)
+        response.meta['pagina'] = 1
+        yield from self._listagem(response)
+
+    def _ponto_retomada(self):
+        if self.registro is None:
+            return None
+        retomada = self.registro.obter(self.spider.name, self.url)
+        if not retomada:
+            return None
+        if not getattr(self.spider, 'saida_incremental', False):
+            self.spider.logger.info("Paginação: execução com saída completa; a listagem começa do início.")
+            retomada = None
+        elif retomada['parametros'] != self.parametros:
+            self.spider.logger.info("Paginação: ponto de retomada de outro período, limite ou tamanho de página; descartado.")
+            retomada = None
+        elif time.time() - retomada['atualizado_em'] > self.validade_retomada:
+            retomada = None
+        if retomada is None:
+            self.registro.remover(self.spider.name, self.url)
+        return retomada
+
+    def _recomecar(self):
+        self.stats.inc_value('aspnet/retomadas_invalidas')
+        self.registro.remover(self.spider.name, self.url)
+        self._reiniciar()
+        return scrapy.Request(self.url, callback=self._primeira_pagina, meta={'sem_retomada': True}, dont_filter=True)
+
+    def _falha_retomada(self, failure):
+        self.spider.logger.warning(f"Paginação: falha ao retomar a listagem ({failure.value!r}); recomeçando do início.")
+        yield self._recomecar()
+
+    def _postback(self, response, alvo, argumento, pagina, extras=None):
+        campos = campos_formulario(response)
+        campos.update({'__EVENTTARGET': alvo, '__EVENTARGUMENT': argumento})
+        campos.update(extras or {})
+        self.solicitadas.add(pagina)
+        return scrapy.FormRequest(url=response.url, formdata=campos, callback=self._listagem, meta={'pagina': pagina})
+
+    def proximas(self, response, continuar=True):
+        """Requisições das próximas páginas da listagem a partir da página em `response`."""
+        pagina = response.meta.get('pagina', 1)
+        if response.meta.get('retomada') and not response.css(self.seletor_itens):
+            self.spider.logger.warning("Paginação: o ponto de retomada não vale mais; recomeçando do início.")
+            yield self._recomecar()
+            return
+
+        self._concluir(pagina, response.request)
+        if not continuar:
+            self.ultima_pagina = pagina if self.ultima_pagina is None else min(self.ultima_pagina, pagina)
+            return
+        if self.ultima_pagina is not None and pagina >= self.ultima_pagina:
+            return
+
+        for numero, (alvo, argumento) in sorted(links_de_pagina(response, self.id_proximo).items()):
+            if numero <= pagina or numero in self.solicitadas:
+                continue
+            if self.ultima_pagina is not None and numero > self.ultima_pagina:
+                break
+            self.stats.inc_value('aspnet/paginas_diretas')
+            yield self._postback(response, alvo, argumento, numero)
+
+        if pagina + 1 not in self.solicitadas and response.css(f'a#{self.id_proximo}[href]'):
+            self.spider.logger.info("➡️ Paginação: indo para próxima página...")
+            self.stats.inc_value('aspnet/paginas_sequenciais')
+            yield self._postback(response, self.alvo_proximo, '', pagina + 1)
+
+    def _listagem(self, response):
+        yield from self._acompanhar(self.callback(response), response.meta.get('pagina', 1))
+
+    def _acompanhar(self, resultado, pagina):
+        """
+        Repassa o que um callback devolve, contando como pendentes da página `pagina` as requisições
+        (que passam a ter _detalhe/_falha_detalhe como callback/errback) e os itens.
+        """
+        for objeto in resultado:
+            if isinstance(objeto, scrapy.Request):
+                if objeto.callback in (self._listagem, self._primeira_pagina):
+                    yield objeto
+                    continue
+                objeto = objeto.replace(
+                    callback=self._detalhe, errback=self._falha_detalhe,
+                    meta={**objeto.meta, '_paginacao': (pagina, objeto.callback, objeto.errback)},
+                )
+                self._abrir(pagina)
+                # o que os spider middlewares descartam (ex.: VistosSpiderMiddleware) nunca é agendado:
+                # é liberado quando a requisição deixa de existir
+                weakref.finalize(objeto, self._nao_agendada, objeto.meta, pagina)
+                yield objeto
+            elif objeto is not None:
+                self._abrir(pagina)
+                self.itens[id(objeto)] = (objeto, pagina)
+                yield objeto
+            else:
+                yield objeto
+
+    def _detalhe(self, response, **kwargs):
+        pagina, callback, _ = response.meta['_paginacao']
+        try:
+            resultado = (callback or self.spider._parse)(response, **kwargs)
+            yield from self._acompanhar(iterate_spider_output(resultado), pagina)
+        finally:
+            self._liberar(pagina)
+
+    def _falha_detalhe(self, failure):
+        pagina, _, errback = failure.request.meta['_paginacao']
+        if errback is None:
+            self._liberar(pagina)
+            return failure
+        return self._falha_acompanhada(errback(failure), pagina)
+
+    def _falha_acompanhada(self, resultado, pagina):
+        try:
+            yield from self._acompanhar(iterate_spider_output(resultado), pagina)
+        finally:
+            self._liberar(pagina)
+
+    def _agendada(self, request, spider):
+        if '_paginacao' in request.meta:
+            request.meta['_paginacao_agendada'] = True
+
+    def _nao_agendada(self, meta, pagina):
+        if not meta.get('_paginacao_agendada'):
+            self._liberar(pagina)
+
+    def _requisicao_descartada(self, request, spider):
+        # recusada pelo filtro de duplicadas (inclusive depois de um redirecionamento): não terá callback
+        if '_paginacao' in request.meta:
+            self._liberar(request.meta['_paginacao'][0])
+
+    def _item_finalizado(self, item, spider, **kwargs):
+        # depois da padronização o item chega como {'item_bruto', 'item_padronizado'}
+        acompanhado = self.itens.pop(id(item), None)
+        if acompanhado is None and isinstance(item, dict) and 'item_bruto' in item:
+            acompanhado = self.itens.pop(id(item['item_bruto']), None)
+        if acompanhado is not None:
+            self._liberar(acompanhado[1])
+
+    def _abrir(self, pagina):
+        self.pendentes[pagina] = self.pendentes.get(pagina, 0) + 1
+
+    def _liberar(self, pagina):
+        self.pendentes[pagina] -= 1
+        if not self.pendentes[pagina]:
+            del self.pendentes[pagina]
+            self._avancar()
+
+    def _concluir(self, pagina, request):
+        self.concluidas.add(pagina)
+        if request is not None and request.method == 'POST':
+            self.requisicoes[pagina] = (request.url, request.body.decode('ascii'))
+        self._avancar()
+
+    def _avancar(self):
+        """Avança o ponto de retomada até a última página que, com todas as anteriores, não tem mais nada pendente."""
+        contigua = self.contigua
+        while self.contigua + 1 in self.concluidas and self.contigua + 1 not in self.pendentes:
+            self.contigua += 1
+        if self.contigua == contigua:
+            return
+        if self.registro is not None and self.contigua in self.requisicoes:
+            url, corpo = self.requisicoes[self.contigua]
+            self.registro.salvar(self.spider.name, self.url, self.contigua, url, corpo, self.parametros)
+        for anterior in [p for p in self.requisicoes if p < self.contigua]:
+            del self.requisicoes[anterior]
+
+    def fechar(self, reason):
+        if self.registro is None:
+            return
+        if reason == 'finished':
+            self.registro.remover(self.spider.name, self.url)
+        self.registro.fechar()
@@ -0,0 +1,107 @@
+# Arquivo: assessorai_crawler/cache_gemini.py
+
+import hashlib
+import os
+import threading
+import time
+from .armazenamento import abrir_sqlite
+
+
+def versao_prompt(prompt):
+    """Identifica a versão do prompt pelo hash do seu texto: qualquer alteração invalida o cache."""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+
+
+def chave_cache(hash_conteudo, prompt, modelo):
+    return hashlib.sha256(f"{hash_conteudo}|{versao_prompt(prompt)}|{modelo}".encode('utf-8')).hexdigest()
+
+
+class CacheGemini:
+    """
+    Cache persistente das respostas do Gemini, indexado por hash do conteúdo + versão do prompt + modelo.
+    Quando o total passa de `tamanho_maximo` bytes, remove as entradas usadas há mais tempo (LRU).
+    """
+
+    def __init__(self, caminho, tamanho_maximo=None):
+        self.tamanho_maximo = tamanho_maximo
+        self.lock = threading.Lock()
+        self.conexao = abrir_sqlite(caminho, check_same_thread=False)
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT PRIMARY KEY,
+                modelo TEXT,
+                versao_prompt TEXT,
+                resposta TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                criado_em REAL,
+                acessado_em REAL
+            )
+        """)
+        self.conexao.execute("CREATE INDEX IF NOT EXISTS respostas_acessado_em ON respostas (acessado_em)")
+        self.conexao.commit()
+        self.total = self._total()
+
+    def _total(self):
+        return self.conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+
+    def obter(self, hash_conteudo, prompt, modelo):
+        """Devolve a resposta guardada ou None."""
+        chave = chave_cache(hash_conteudo, prompt, modelo)
+        with self.lock:
+            linha = self.conexao.execute("SELECT resposta FROM respostas WHERE chave = ?", (chave,)).fetchone()
+            if linha is None:
+                return None
+            self.conexao.execute("UPDATE respostas SET acessado_em = ? WHERE chave = ?", (time.time(), chave))
+            self.conexao.commit()
+            return linha["resposta"]
+
+    def guardar(self, hash_conteudo, prompt, modelo, resposta):
+        chave = chave_cache(hash_conteudo, prompt, modelo)
+        tamanho = len(resposta.encode('utf-8'))
+        agora = time.time()
+        with self.lock:
+            self.conexao.execute(
+                """
+                INSERT OR REPLACE INTO respostas
+                    (chave, modelo, versao_prompt, resposta, tamanho, criado_em, acessado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (chave, modelo, versao_prompt(prompt), resposta, tamanho, agora, agora)
+            )
+            self.conexao.commit()
+            self.total += tamanho
+            if self.tamanho_maximo and self.total > self.tamanho_maximo:
+                self._despejar()
+
+    def _despejar(self):
+        # outros processos podem ter gravado no mesmo banco: recalcula antes de remover
+        self.total = self._total()
+        excesso = self.total - self.tamanho_maximo
+        if excesso <= 0:
+            return
+        removidas = []
+        for linha in self.conexao.execute("SELECT chave, tamanho FROM respostas ORDER BY acessado_em"):
+            if excesso <= 0:
+                break
+            removidas.append((linha["chave"],))
+            excesso -= linha["tamanho"]
+            self.total -= linha["tamanho"]
+        self.conexao.executemany("DELETE FROM respostas WHERE chave = ?", removidas)
+        self.conexao.commit()
+
+    def fechar(self):
+        with self.lock:
+            self.conexao.commit()
+            self.conexao.close()
+
+
+def abrir_cache(settings):
+    """
+    Abre o cache configurado em GEMINI_CACHE_PATH, ou devolve None se estiver desabilitado.
+    Com o Gemini falso (GEMINI_FALSO) o cache real nunca é aberto, para não misturar respostas
+    sintéticas com extrações reais.
+    """
+    caminho = settings.get('GEMINI_CACHE_PATH')
+    if not caminho or os.getenv('GEMINI_FALSO'):
+        return None
+    return CacheGemini(caminho, settings.getint('GEMINI_CACHE_MAX_BYTES') or None)
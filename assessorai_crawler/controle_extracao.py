@@ -0,0 +1,109 @@
+# Arquivo: assessorai_crawler/controle_extracao.py
+
+import time
+from .armazenamento import abrir_sqlite
+
+# Situações de uma extração no controle
+EM_ANDAMENTO = 'em_andamento'
+CONCLUIDO = 'concluido'
+FALHOU = 'falhou'
+IGNORADO = 'ignorado'  # PDF criptografado, vazio ou inválido: não adianta tentar de novo
+
+
+class ControleExtracao:
+    """
+    Registro persistente das extrações de texto, por PDF (caminho_arquivo_original + SHA-256).
+    Guarda tamanho e mtime do arquivo para reconhecer PDFs inalterados sem recalcular o hash.
+    """
+
+    def __init__(self, caminho):
+        self.conexao = abrir_sqlite(caminho)
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS extracoes (
+                caminho_pdf TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                tamanho INTEGER,
+                mtime REAL,
+                caminho_md TEXT,
+                status TEXT NOT NULL,
+                situacao TEXT,
+                motor TEXT,
+                paginas INTEGER,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                ultimo_erro TEXT,
+                iniciado_em REAL,
+                concluido_em REAL,
+                duracao REAL,
+                sha256_markdown TEXT,
+                PRIMARY KEY (caminho_pdf, sha256)
+            )
+        """)
+        self.conexao.execute("CREATE INDEX IF NOT EXISTS extracoes_status ON extracoes (status)")
+        self.conexao.commit()
+
+    def obter(self, caminho_pdf, tamanho, mtime):
+        """Registro do PDF se ele não mudou desde a última execução (mesmo tamanho e mtime), ou None."""
+        linha = self.conexao.execute(
+            "SELECT * FROM extracoes WHERE caminho_pdf = ? AND tamanho = ? AND mtime = ? "
+            "ORDER BY iniciado_em DESC LIMIT 1",
+            (caminho_pdf, tamanho, mtime)
+        ).fetchone()
+        return dict(linha) if linha else None
+
+    def iniciar(self, caminho_pdf, sha256, tamanho, mtime, caminho_md):
+        self.conexao.execute(
+            """
+            INSERT INTO extracoes (caminho_pdf, sha256, tamanho, mtime, caminho_md, status, tentativas, iniciado_em)
+            VALUES (?, ?, ?, ?, ?, ?, 1, ?)
+            ON CONFLICT(caminho_pdf, sha256) DO UPDATE SET
+                tamanho = excluded.tamanho,
+                mtime = excluded.mtime,
+                caminho_md = excluded.caminho_md,
+                status = excluded.status,
+                tentativas = tentativas + 1,
+                iniciado_em = excluded.iniciado_em
+            """,
+            (caminho_pdf, sha256, tamanho, mtime, caminho_md, EM_ANDAMENTO, time.time())
+        )
+        self.conexao.commit()
+
+    def _finalizar(self, caminho_pdf, sha256, status, **campos):
+        agora = time.time()
+        campos.update(status=status, concluido_em=agora)
+        atribuicoes = ", ".join(f"{coluna} = ?" for coluna in campos)
+        self.conexao.execute(
+            f"UPDATE extracoes SET {atribuicoes}, duracao = ? - iniciado_em WHERE caminho_pdf = ? AND sha256 = ?",
+            (*campos.values(), agora, caminho_pdf, sha256)
+        )
+        self.conexao.commit()
+
+    def concluir(self, caminho_pdf, sha256, situacao, motor, paginas, sha256_markdown):
+        self._finalizar(
+            caminho_pdf, sha256, CONCLUIDO, situacao=situacao, motor=motor, paginas=paginas,
+            sha256_markdown=sha256_markdown, ultimo_erro=None
+        )
+
+    def falhar(self, caminho_pdf, sha256, erro):
+        self._finalizar(caminho_pdf, sha256, FALHOU, ultimo_erro=str(erro)[:2000])
+
+    def ignorar(self, caminho_pdf, sha256, situacao, paginas):
+        self._finalizar(caminho_pdf, sha256, IGNORADO, situacao=situacao, paginas=paginas)
+
+    def resumo(self):
+        """Contagem por status e motor, com páginas e tempo médio, para acompanhar o andamento."""
+        return [dict(linha) for linha in self.conexao.execute("""
+            SELECT status, motor, COUNT(*) AS documentos, COALESCE(SUM(paginas), 0) AS paginas,
+                   AVG(duracao) AS duracao_media
+            FROM extracoes GROUP BY status, motor ORDER BY status, motor
+        """)]
+
+    def falhas(self, limite=20):
+        return [dict(linha) for linha in self.conexao.execute(
+            "SELECT caminho_pdf, tentativas, ultimo_erro FROM extracoes WHERE status = ? "
+            "ORDER BY concluido_em DESC LIMIT ?",
+            (FALHOU, limite)
+        )]
+
+    def fechar(self):
+        self.conexao.commit()
+        self.conexao.close()
@@ -0,0 +1,124 @@
+# Arquivo: assessorai_crawler/downloads.py
+
+import hashlib
+import json
+import os
+import requests
+
+TAMANHO_BLOCO = 1 << 16
+
+
+class ErroDownload(Exception):
+    """Falha ao baixar um arquivo em fluxo."""
+
+
+def _remover(*caminhos):
+    for caminho in caminhos:
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+
+def _hash_parcial(caminho):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return h
+
+
+def baixar_em_fluxo(url, parcial, *, cabecalhos=None, validadores=None, tamanho_maximo=None,
+                    timeout=30, permitir_redirecionamentos=True, sessao=None, _retomar=True):
+    """
+    Baixa `url` gravando os blocos direto em `parcial`, sem manter o corpo na memória,
+    e calcula o SHA-256 durante a transferência.
+
+    - Se `parcial` já existir (download interrompido), retoma com Range/If-Range.
+    - Se `validadores` (etag/last_modified) forem informados, faz uma requisição condicional.
+    - Aborta se o arquivo passar de `tamanho_maximo` bytes.
+
+    Devolve {'status': 304} ou {'status': 200, 'sha256', 'tamanho', 'etag', 'last_modified', 'content_length'}.
+    Em caso de falha de rede o arquivo parcial é mantido para a próxima tentativa.
+    """
+    sessao = sessao or requests
+    cabecalhos_originais = cabecalhos
+    cabecalhos = dict(cabecalhos or {})
+    # offsets do Range se referem aos bytes transferidos, então evitamos compressão
+    cabecalhos['Accept-Encoding'] = 'identity'
+    metadados_parcial = f"{parcial}.json"
+
+    inicio = os.path.getsize(parcial) if _retomar and os.path.exists(parcial) else 0
+    if inicio:
+        cabecalhos['Range'] = f'bytes={inicio}-'
+        if os.path.exists(metadados_parcial):
+            with open(metadados_parcial, encoding='utf-8') as f:
+                anteriores = json.load(f)
+            # se o arquivo mudou no servidor, If-Range faz ele devolver o conteúdo inteiro (200)
+            validador = anteriores.get('etag') or anteriores.get('last_modified')
+            if validador:
+                cabecalhos['If-Range'] = validador
+    elif validadores:
+        if validadores.get('etag'):
+            cabecalhos['If-None-Match'] = validadores['etag']
+        if validadores.get('last_modified'):
+            cabecalhos['If-Modified-Since'] = validadores['last_modified']
+
+    try:
+        with sessao.get(url, headers=cabecalhos, stream=True, timeout=timeout,
+                        allow_redirects=permitir_redirecionamentos) as resposta:
+            if resposta.status_code == 304:
+                return {'status': 304}
+            if resposta.status_code == 416 and inicio:
+                # parcial inválido para o servidor: recomeça do zero, sem Range/If-Range mas
+                # ainda condicional, para um arquivo que não mudou continuar rendendo 304
+                _remover(parcial, metadados_parcial)
+                sem_intervalo = {
+                    nome: valor for nome, valor in (cabecalhos_originais or {}).items()
+                    if nome.lower() not in ('range', 'if-range')
+                }
+                return baixar_em_fluxo(
+                    url, parcial, cabecalhos=sem_intervalo, validadores=validadores, tamanho_maximo=tamanho_maximo,
+                    timeout=timeout, permitir_redirecionamentos=permitir_redirecionamentos,
+                    sessao=sessao, _retomar=False
+                )
+            if resposta.status_code not in (200, 206):
+                raise ErroDownload(f"HTTP {resposta.status_code} ao baixar {url}")
+
+            retomando = resposta.status_code == 206 and inicio > 0
+            if not retomando:
+                inicio = 0
+            etag = resposta.headers.get('ETag')
+            last_modified = resposta.headers.get('Last-Modified')
+            content_length = resposta.headers.get('Content-Length')
+
+            total = inicio + int(content_length) if content_length and content_length.isdigit() else None
+            if tamanho_maximo and total and total > tamanho_maximo:
+                raise ErroDownload(f"{url} tem {total} bytes, acima do limite de {tamanho_maximo}")
+
+            h = _hash_parcial(parcial) if retomando else hashlib.sha256()
+            if not retomando:
+                os.makedirs(os.path.dirname(parcial) or '.', exist_ok=True)
+                with open(metadados_parcial, 'w', encoding='utf-8') as f:
+                    json.dump({'url': url, 'etag': etag, 'last_modified': last_modified}, f)
+
+            tamanho = inicio
+            with open(parcial, 'ab' if retomando else 'wb') as f:
+                for bloco in resposta.iter_content(TAMANHO_BLOCO):
+                    tamanho += len(bloco)
+                    if tamanho_maximo and tamanho > tamanho_maximo:
+                        f.close()
+                        _remover(parcial, metadados_parcial)
+                        raise ErroDownload(f"{url} passou do limite de {tamanho_maximo} bytes")
+                    f.write(bloco)
+                    h.update(bloco)
+    except requests.RequestException as e:
+        raise ErroDownload(f"Download de {url} interrompido ({e}); será retomado na próxima tentativa") from e
+
+    _remover(metadados_parcial)
+    return {
+        'status': 200,
+        'sha256': h.hexdigest(),
+        'tamanho': tamanho,
+        'etag': etag,
+        'last_modified': last_modified,
+        'content_length': tamanho,
+    }
@@ -0,0 +1,89 @@
+# Arquivo: assessorai_crawler/extensions.py
+
+import re
+from datetime import date, datetime, timedelta
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from .armazenamento import RegistroMarcasDagua
+
+_RE_DATA_ISO = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+class MarcaDaguaExtension:
+    """
+    Coleta incremental automática para os spiders com data_inicio/data_fim.
+
+    Guarda, por spider, a data_documento mais recente dos itens padronizados. Quando o spider é
+    executado sem período (data_inicio/data_fim) e sem limite, a extensão preenche data_inicio com
+    essa marca menos MARCA_DAGUA_SOBREPOSICAO_DIAS, e os spiders param de paginar ao passar dela.
+    A marca só avança quando a execução termina normalmente ('finished') sem período nem limite
+    informados pelo usuário.
+
+    Com a marca aplicada a execução é incremental: a extensão marca spider.saida_incremental e os
+    itens vão para um .jl de delta (ver pipelines.caminho_saida_jl), sem substituir o .jl completo.
+    Isso é feito ao criar a extensão, e não em spider_opened, porque os pipelines abrem a saída antes
+    desse sinal.
+    """
+
+    def __init__(self, caminho, sobreposicao_dias, stats):
+        self.registro = RegistroMarcasDagua(caminho)
+        self.sobreposicao = timedelta(days=sobreposicao_dias)
+        self.stats = stats
+        self.avancar = False
+        self.maior_data = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("MARCA_DAGUA_ENABLED"):
+            raise NotConfigured
+        ext = cls(
+            settings.get("MARCA_DAGUA_DB", "storage/dbs/marcas_dagua.sqlite3"),
+            settings.getint("MARCA_DAGUA_SOBREPOSICAO_DIAS", 7),
+            crawler.stats,
+        )
+        if crawler.spider is not None:
+            ext.aplicar(crawler.spider)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def aplicar(self, spider):
+        # só spiders que aceitam período participam
+        if not hasattr(spider, "data_inicio"):
+            return
+        if spider.data_inicio or getattr(spider, "data_fim", None) or getattr(spider, "limite_total_itens", None):
+            spider.logger.info("Período ou limite informado: marca d'água não aplicada nem atualizada.")
+            return
+
+        self.avancar = True
+        marca = self.registro.obter(spider.name)
+        if marca:
+            inicio = datetime.strptime(marca, "%Y-%m-%d") - self.sobreposicao
+            spider.data_inicio = inicio.strftime("%Y-%m-%d")
+            spider.saida_incremental = True
+            self.stats.set_value("marca_dagua/data_inicio", spider.data_inicio)
+            spider.logger.info(f"Coleta incremental a partir de {spider.data_inicio} (marca d'água {marca}).")
+
+    def item_scraped(self, item, spider):
+        if not self.avancar:
+            return
+        padronizado = item.get("item_padronizado") if hasattr(item, "get") else None
+        data_documento = (padronizado or {}).get("data_documento")
+        if not data_documento or not _RE_DATA_ISO.match(data_documento):
+            return
+        # datas no futuro são erros de digitação na fonte e travariam a marca adiante
+        if data_documento > (date.today() + timedelta(days=1)).isoformat():
+            return
+        if self.maior_data is None or data_documento > self.maior_data:
+            self.maior_data = data_documento
+
+    def spider_closed(self, spider, reason):
+        try:
+            if self.avancar and reason == "finished" and self.maior_data:
+                self.registro.avancar(spider.name, self.maior_data)
+                self.stats.set_value("marca_dagua/nova", self.registro.obter(spider.name))
+        finally:
+            self.registro.fechar()
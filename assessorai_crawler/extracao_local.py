@@ -0,0 +1,169 @@
+# Arquivo: assessorai_crawler/extracao_local.py
+
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+from .armazenamento import sha256_arquivo
+
+# Situações possíveis de um PDF após a triagem
+DIGITAL = 'digital'
+ESCANEADO = 'escaneado'
+CRIPTOGRAFADO = 'criptografado'
+VAZIO = 'vazio'
+INVALIDO = 'invalido'
+
+MIN_CARACTERES_POR_PAGINA = 200
+MIN_PROPORCAO_PAGINAS_COM_TEXTO = 0.8
+MAX_PROPORCAO_CARACTERES_INVALIDOS = 0.02
+
+# caractere de substituição e área de uso privado aparecem quando a fonte não tem mapeamento para Unicode
+_RE_CARACTERES_INVALIDOS = re.compile('[\ufffd\ue000-\uf8ff]')
+_RE_ESPACOS = re.compile(r'[ \t]+')
+_NEGRITO = 16  # bit de negrito nas flags de span do PyMuPDF
+
+
+def _texto_do_bloco(bloco, tamanho_corpo):
+    """Converte um bloco de texto do PyMuPDF em Markdown (títulos e negrito)."""
+    linhas = []
+    maior_fonte = 0
+    for linha in bloco.get("lines", []):
+        partes = []
+        negrito_aberto = False
+        for span in linha.get("spans", []):
+            texto = span.get("text", "")
+            if not texto.strip():
+                partes.append(texto)
+                continue
+            maior_fonte = max(maior_fonte, span.get("size", 0))
+            negrito = bool(span.get("flags", 0) & _NEGRITO)
+            if negrito != negrito_aberto:
+                partes.append("**")
+                negrito_aberto = negrito
+            partes.append(texto)
+        if negrito_aberto:
+            partes.append("**")
+        texto_linha = _RE_ESPACOS.sub(" ", "".join(partes)).strip()
+        # evita marcadores vazios como "** **"
+        texto_linha = texto_linha.replace("** **", " ").replace("****", "")
+        if texto_linha:
+            linhas.append(texto_linha)
+
+    texto = " ".join(linhas)
+    if texto and tamanho_corpo and maior_fonte >= tamanho_corpo * 1.25 and len(texto) < 120:
+        return "## " + texto.replace("**", "")
+    return texto
+
+
+def _markdown_da_pagina(pagina, tamanho_corpo):
+    blocos = pagina.get_text("dict").get("blocks", [])
+    textos = (_texto_do_bloco(b, tamanho_corpo) for b in blocos if b.get("type") == 0)
+    return "\n\n".join(t for t in textos if t)
+
+
+def _tamanho_corpo(documento):
+    """Tamanho de fonte mais usado no documento, ponderado pela quantidade de caracteres."""
+    contagem = Counter()
+    for pagina in documento:
+        for bloco in pagina.get_text("dict").get("blocks", []):
+            for linha in bloco.get("lines", []):
+                for span in linha.get("spans", []):
+                    contagem[round(span.get("size", 0), 1)] += len(span.get("text", "").strip())
+    return contagem.most_common(1)[0][0] if contagem else 0
+
+
+def processar_pdf(caminho, min_caracteres_pagina=MIN_CARACTERES_POR_PAGINA, extrair=True):
+    """
+    Faz a triagem do PDF pela camada de texto e, se ele for digital, extrai o Markdown localmente.
+
+    Devolve um dict com 'situacao' (digital, escaneado, criptografado, vazio ou invalido),
+    'paginas', 'caracteres', 'proporcao_paginas_com_texto', 'proporcao_invalidos', 'sha256'
+    (chave do cache do Gemini) e, para PDFs digitais, 'markdown'.
+    """
+    resultado = {"caminho": caminho, "situacao": INVALIDO, "paginas": 0, "caracteres": 0}
+    try:
+        resultado["sha256"] = sha256_arquivo(caminho)
+        documento = fitz.open(caminho)
+    except Exception as e:
+        resultado["erro"] = str(e)
+        return resultado
+
+    with documento:
+        resultado["paginas"] = documento.page_count
+        if documento.needs_pass:
+            resultado["situacao"] = CRIPTOGRAFADO
+            return resultado
+        if documento.page_count == 0:
+            resultado["situacao"] = VAZIO
+            return resultado
+
+        caracteres = invalidos = paginas_com_texto = paginas_com_imagem = 0
+        for pagina in documento:
+            texto = pagina.get_text("text")
+            quantidade = len(texto.strip())
+            caracteres += quantidade
+            invalidos += len(_RE_CARACTERES_INVALIDOS.findall(texto))
+            if quantidade >= min_caracteres_pagina:
+                paginas_com_texto += 1
+            if pagina.get_images(full=False):
+                paginas_com_imagem += 1
+
+        resultado["caracteres"] = caracteres
+        resultado["proporcao_paginas_com_texto"] = paginas_com_texto / documento.page_count
+        resultado["proporcao_invalidos"] = invalidos / caracteres if caracteres else 0.0
+
+        if caracteres == 0 and paginas_com_imagem == 0:
+            resultado["situacao"] = VAZIO
+        elif (resultado["proporcao_paginas_com_texto"] >= MIN_PROPORCAO_PAGINAS_COM_TEXTO
+              and resultado["proporcao_invalidos"] <= MAX_PROPORCAO_CARACTERES_INVALIDOS):
+            resultado["situacao"] = DIGITAL
+        else:
+            # pouco texto ou texto de má qualidade: precisa de OCR (Gemini)
+            resultado["situacao"] = ESCANEADO
+
+        if extrair and resultado["situacao"] == DIGITAL:
+            tamanho_corpo = _tamanho_corpo(documento)
+            paginas = (_markdown_da_pagina(p, tamanho_corpo) for p in documento)
+            resultado["markdown"] = "\n\n".join(p for p in paginas if p).strip() + "\n"
+    return resultado
+
+
+def contar_paginas(caminho):
+    with fitz.open(caminho) as documento:
+        return documento.page_count
+
+
+def dividir_pdf(caminho, paginas_por_faixa, destino):
+    """
+    Divide o PDF em arquivos de até `paginas_por_faixa` páginas dentro de `destino`.
+    Devolve [(primeira_pagina, ultima_pagina, caminho)] na ordem do documento.
+    """
+    faixas = []
+    with fitz.open(caminho) as documento:
+        for inicio in range(0, documento.page_count, paginas_por_faixa):
+            fim = min(inicio + paginas_por_faixa, documento.page_count) - 1
+            caminho_faixa = os.path.join(destino, f"paginas_{inicio + 1:05d}-{fim + 1:05d}.pdf")
+            with fitz.open() as parte:
+                parte.insert_pdf(documento, from_page=inicio, to_page=fim)
+                parte.save(caminho_faixa, garbage=3, deflate=True)
+            faixas.append((inicio + 1, fim + 1, caminho_faixa))
+    return faixas
+
+
+class ExtratorLocal:
+    """Executa processar_pdf num pool de processos, para não disputar CPU com o restante do crawler."""
+
+    def __init__(self, workers=None, min_caracteres_pagina=MIN_CARACTERES_POR_PAGINA):
+        self.min_caracteres_pagina = min_caracteres_pagina
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+
+    def submeter(self, caminho, extrair=True):
+        """Devolve um Future com o resultado de processar_pdf."""
+        return self.executor.submit(processar_pdf, caminho, self.min_caracteres_pagina, extrair)
+
+    def processar(self, caminho):
+        return self.submeter(caminho).result()
+
+    def fechar(self):
+        self.executor.shutdown()
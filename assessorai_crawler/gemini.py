@@ -0,0 +1,73 @@
+# Arquivo: assessorai_crawler/gemini.py
+
+import asyncio
+import logging
+import os
+import random
+import time
+from google.api_core import exceptions as erros_api
+
+# GEMINI_FALSO=1 troca a API real pelo substituto local (benchmarks e testes de carga sem rede)
+if os.getenv('GEMINI_FALSO'):
+    from . import gemini_falso as genai
+else:
+    import google.generativeai as genai
+
+logger = logging.getLogger(__name__)
+
+# 429 (cota) e 5xx/timeout costumam passar numa nova tentativa; os demais erros são definitivos
+ERROS_TRANSITORIOS = (
+    erros_api.TooManyRequests,
+    erros_api.ServerError,
+    erros_api.DeadlineExceeded,
+)
+
+
+def erro_transitorio(erro):
+    return isinstance(erro, ERROS_TRANSITORIOS)
+
+
+def espera_com_jitter(tentativa, espera_base=2.0, espera_maxima=60.0):
+    """Backoff exponencial com jitter completo, para as retentativas não chegarem todas juntas."""
+    return random.uniform(0, min(espera_maxima, espera_base * 2 ** tentativa))
+
+
+class LimitadorTaxa:
+    """Token bucket assíncrono: libera no máximo `por_minuto` chamadas por minuto, com rajadas de até `capacidade`."""
+
+    def __init__(self, por_minuto, capacidade=1):
+        self.taxa = por_minuto / 60
+        self.capacidade = capacidade
+        self.fichas = capacidade
+        self.atualizado = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def aguardar(self):
+        async with self.lock:
+            while True:
+                agora = time.monotonic()
+                self.fichas = min(self.capacidade, self.fichas + (agora - self.atualizado) * self.taxa)
+                self.atualizado = agora
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                await asyncio.sleep((1 - self.fichas) / self.taxa)
+
+
+async def chamar_com_retentativas(funcao, *args, limitador=None, tentativas=6,
+                                  espera_base=2.0, espera_maxima=60.0, **kwargs):
+    """
+    Executa `funcao` (bloqueante) numa thread, respeitando o limitador de taxa, e repete em caso
+    de 429/5xx com backoff exponencial e jitter completo.
+    """
+    for tentativa in range(tentativas):
+        if limitador:
+            await limitador.aguardar()
+        try:
+            return await asyncio.to_thread(funcao, *args, **kwargs)
+        except Exception as e:
+            if not erro_transitorio(e) or tentativa == tentativas - 1:
+                raise
+            espera = espera_com_jitter(tentativa, espera_base, espera_maxima)
+            logger.warning(f"Erro transitório do Gemini ({e}); nova tentativa em {espera:.1f}s")
+            await asyncio.sleep(espera)
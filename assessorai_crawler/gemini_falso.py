@@ -0,0 +1,126 @@
+# Arquivo: assessorai_crawler/gemini_falso.py
+"""
+Substituto local da parte do google.generativeai usada pelo projeto (configure, upload_file,
+delete_file e GenerativeModel.generate_content), para testes de carga e benchmarks sem rede e sem cota.
+Ativado com GEMINI_FALSO=1 (ver assessorai_crawler/gemini.py). Configuração por variáveis de ambiente:
+
+- GEMINI_FALSO_LATENCIA: mediana da latência de geração, em segundos (padrão 1.0)
+- GEMINI_FALSO_DISPERSAO: sigma da distribuição log-normal da latência (padrão 0.5)
+- GEMINI_FALSO_TAXA_429: fração das chamadas que falham com 429 (padrão 0)
+- GEMINI_FALSO_TAXA_ERRO: fração das chamadas que falham com 500 (padrão 0)
+"""
+
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from google.api_core import exceptions as erros_api
+
+_RE_DOCUMENTO = re.compile(r'<documento id="(\d+)">')
+
+ASSUNTOS_FALSOS = [
+    "Administração pública", "Saúde pública", "Educação básica", "Meio ambiente",
+    "Transporte coletivo", "Segurança pública", "Cultura e lazer", "Habitação popular",
+]
+
+_lock = threading.Lock()
+_estatisticas = {}
+
+
+def reiniciar_estatisticas():
+    with _lock:
+        _estatisticas.clear()
+        _estatisticas.update(chamadas=0, uploads=0, erros_429=0, erros_500=0, em_andamento=0, max_em_andamento=0)
+
+
+reiniciar_estatisticas()
+
+
+def estatisticas():
+    with _lock:
+        return dict(_estatisticas)
+
+
+def _latencia(fator=1.0):
+    mediana = float(os.getenv("GEMINI_FALSO_LATENCIA", "1.0"))
+    dispersao = float(os.getenv("GEMINI_FALSO_DISPERSAO", "0.5"))
+    if mediana <= 0:
+        return 0
+    return random.lognormvariate(math.log(mediana), dispersao) * fator
+
+
+def _chamada(fator=1.0):
+    """Simula a latência e as falhas de uma chamada, registrando quantas estão em andamento."""
+    with _lock:
+        _estatisticas["em_andamento"] += 1
+        _estatisticas["max_em_andamento"] = max(_estatisticas["max_em_andamento"], _estatisticas["em_andamento"])
+    try:
+        time.sleep(_latencia(fator))
+        sorteio = random.random()
+        taxa_429 = float(os.getenv("GEMINI_FALSO_TAXA_429", "0"))
+        taxa_erro = float(os.getenv("GEMINI_FALSO_TAXA_ERRO", "0"))
+        if sorteio < taxa_429:
+            with _lock:
+                _estatisticas["erros_429"] += 1
+            raise erros_api.TooManyRequests("Resource has been exhausted (gemini falso)")
+        if sorteio < taxa_429 + taxa_erro:
+            with _lock:
+                _estatisticas["erros_500"] += 1
+            raise erros_api.InternalServerError("Internal error (gemini falso)")
+    finally:
+        with _lock:
+            _estatisticas["em_andamento"] -= 1
+
+
+class ArquivoFalso:
+    def __init__(self, caminho):
+        self.name = f"files/{uuid.uuid4().hex[:12]}"
+        self.display_name = os.path.basename(str(caminho))
+
+
+class RespostaFalsa:
+    def __init__(self, text):
+        self.text = text
+
+
+def configure(**kwargs):
+    pass
+
+
+def upload_file(caminho, **kwargs):
+    with _lock:
+        _estatisticas["uploads"] += 1
+    _chamada(fator=0.2)
+    return ArquivoFalso(caminho)
+
+
+def delete_file(name, **kwargs):
+    pass
+
+
+class GenerativeModel:
+    def __init__(self, model_name, **kwargs):
+        self.model_name = f"models/{model_name}"
+
+    def generate_content(self, conteudo, generation_config=None, **kwargs):
+        with _lock:
+            _estatisticas["chamadas"] += 1
+        _chamada()
+
+        if isinstance(conteudo, (list, tuple)):
+            arquivos = [parte for parte in conteudo if isinstance(parte, ArquivoFalso)]
+            nome = arquivos[0].display_name if arquivos else "documento"
+            return RespostaFalsa(f"# {nome}\n\nArt. 1º Texto extraído pelo Gemini falso.\n")
+
+        if generation_config and generation_config.get("response_mime_type") == "application/json":
+            documentos = [
+                {"id": int(indice), "assuntos": random.sample(ASSUNTOS_FALSOS, 3)}
+                for indice in _RE_DOCUMENTO.findall(conteudo)
+            ]
+            return RespostaFalsa(json.dumps({"documentos": documentos}, ensure_ascii=False))
+
+        return RespostaFalsa("\n".join(random.sample(ASSUNTOS_FALSOS, 4)))
@@ -0,0 +1,99 @@
+# Arquivo: assessorai_crawler/html_markdown.py
+
+import re
+
+# tags que começam e terminam em linha própria
+BLOCOS = frozenset({
+    "address", "article", "aside", "blockquote", "body", "center", "dd", "div", "dl", "dt", "fieldset",
+    "footer", "form", "header", "hr", "html", "main", "nav", "ol", "p", "pre", "section", "table",
+    "tbody", "tfoot", "thead", "ul",
+})
+CABECALHOS = {"h1": "# ", "h2": "## ", "h3": "### ", "h4": "#### ", "h5": "##### ", "h6": "###### "}
+# sublinhado também vira negrito, para não perder o destaque
+ENFASE = frozenset({"b", "strong", "u"})
+IGNORADAS = frozenset({"script", "style", "head", "noscript", "template"})
+
+_RE_ESPACOS = re.compile(r"\s+")
+_RE_ESPACOS_HORIZONTAIS = re.compile(r"[ \t\xa0]+")
+_RE_LINHAS_EM_BRANCO = re.compile(r"\n{3,}")
+
+
+def _texto(texto):
+    return _RE_ESPACOS.sub(" ", texto) if texto else ""
+
+
+def _inline(elemento):
+    """Conteúdo de um elemento em linha, já sem espaços sobrando nas pontas."""
+    partes = []
+    _percorrer_filhos(elemento, partes)
+    return _RE_ESPACOS.sub(" ", "".join(partes)).strip()
+
+
+def _percorrer_filhos(elemento, partes):
+    partes.append(_texto(elemento.text))
+    for filho in elemento:
+        _percorrer(filho, partes)
+        partes.append(_texto(filho.tail))
+
+
+def _percorrer(elemento, partes):
+    tag = elemento.tag
+    if not isinstance(tag, str):
+        # comentários e instruções de processamento
+        return
+    tag = tag.lower()
+
+    if tag in IGNORADAS:
+        return
+    if tag == "br":
+        partes.append("\n")
+    elif tag in ENFASE:
+        conteudo = _inline(elemento)
+        if conteudo:
+            partes.append(f"**{conteudo}**")
+    elif tag == "a":
+        conteudo = _inline(elemento)
+        href = elemento.get("href")
+        if href and not href.lower().startswith("javascript:"):
+            partes.append(f"[{conteudo}]({href})")
+        else:
+            partes.append(conteudo)
+    elif tag in CABECALHOS:
+        conteudo = _inline(elemento)
+        if conteudo:
+            partes.append(f"\n\n{CABECALHOS[tag]}{conteudo}\n\n")
+    elif tag == "li":
+        conteudo = _inline(elemento)
+        if conteudo:
+            partes.append(f"\n- {conteudo}")
+    elif tag == "tr":
+        partes.append("\n")
+        _percorrer_filhos(elemento, partes)
+    elif tag in ("td", "th"):
+        _percorrer_filhos(elemento, partes)
+        partes.append(" ")
+    elif tag in BLOCOS:
+        partes.append("\n\n")
+        _percorrer_filhos(elemento, partes)
+        partes.append("\n\n")
+    else:
+        _percorrer_filhos(elemento, partes)
+
+
+def html_para_markdown(elemento):
+    """
+    Converte uma subárvore HTML em Markdown numa única passada (negrito, cabeçalhos, listas, links e
+    quebras de linha). Aceita um Selector/SelectorList do parsel (usa o primeiro elemento) ou um elemento lxml.
+    Devolve "" se não houver elemento.
+    """
+    if isinstance(elemento, list):
+        elemento = elemento[0] if elemento else None
+    elemento = getattr(elemento, "root", elemento)
+    if elemento is None or isinstance(elemento, str):
+        return ""
+
+    partes = []
+    _percorrer(elemento, partes)
+    texto = _RE_ESPACOS_HORIZONTAIS.sub(" ", "".join(partes))
+    texto = "\n".join(linha.strip() for linha in texto.split("\n"))
+    return _RE_LINHAS_EM_BRANCO.sub("\n\n", texto).strip()
@@ -0,0 +1,268 @@
+# Arquivo: assessorai_crawler/httpcache.py
+
+import re
+import time
+
+import zstandard
+from scrapy.extensions.httpcache import DummyPolicy
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+from .armazenamento import abrir_sqlite
+
+# Validade por classe de URL (primeira expressão que casar; 0 = nunca expira). URLs que não casarem
+# com nenhuma (listagens e o restante) usam HTTPCACHE_EXPIRATION_SECS
+VALIDADES_PADRAO = [
+    # páginas de detalhe: dias
+    (r'DetailsDetalhado|Digital\.aspx|/materia/\d+|OpenDocument|/Documentos/Documento/', 86400),
+]
+
+# PDFs e arquivos de processos ficam fora do cache: já têm o armazém e a revalidação do ProposicaoFilesPipeline
+ARQUIVOS_PADRAO = r'\.pdf($|\?)|/arquivo\?Id=|/ArquivoProcesso/|/Documentos/Arquivo'
+TIPOS_ARQUIVO = (b'application/pdf', b'application/octet-stream')
+
+
+class PoliticaCache(DummyPolicy):
+    """
+    DummyPolicy que não guarda arquivos (PDFs etc.): nem as URLs de HTTPCACHE_IGNORAR_URLS,
+    nem as respostas com Content-Type de arquivo.
+    """
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.ignorar_urls = re.compile(settings.get('HTTPCACHE_IGNORAR_URLS') or ARQUIVOS_PADRAO)
+
+    def should_cache_request(self, request):
+        return super().should_cache_request(request) and not self.ignorar_urls.search(request.url)
+
+    def should_cache_response(self, response, request):
+        tipo = (response.headers.get(b'Content-Type') or b'').split(b';')[0].strip().lower()
+        return super().should_cache_response(response, request) and tipo not in TIPOS_ARQUIVO
+
+
+class SQLiteCacheStorage:
+    """
+    Armazenamento do HTTPCACHE num único arquivo SQLite, com cabeçalhos e corpo comprimidos com zstd.
+
+    - Validade por classe de URL (HTTPCACHE_SQLITE_VALIDADES: [(regex, segundos)], 0 = imutável),
+      com HTTPCACHE_EXPIRATION_SECS como padrão para URLs que não casarem com nenhuma classe.
+    - Tamanho máximo (HTTPCACHE_SQLITE_MAX_BYTES, já comprimido), com despejo das respostas
+      acessadas há mais tempo (LRU).
+    - Respostas maiores que HTTPCACHE_SQLITE_MAX_ITEM_BYTES não são guardadas.
+    Acertos, faltas e gravações já são contados pelo HttpCacheMiddleware (httpcache/*); aqui são
+    contadas as expiradas, os despejos e os bytes economizados pela compressão.
+    """
+
+    def __init__(self, settings):
+        self.caminho = settings.get('HTTPCACHE_SQLITE_PATH', 'storage/dbs/httpcache.sqlite3')
+        self.tamanho_maximo = settings.getint('HTTPCACHE_SQLITE_MAX_BYTES', 5 * 1024 * 1024 * 1024)
+        self.tamanho_maximo_item = settings.getint('HTTPCACHE_SQLITE_MAX_ITEM_BYTES', 50 * 1024 * 1024)
+        self.nivel = settings.getint('HTTPCACHE_SQLITE_ZSTD_NIVEL', 3)
+        self.validade_padrao = settings.getint('HTTPCACHE_EXPIRATION_SECS')
+        self.validades = [
+            (re.compile(padrao), segundos)
+            for padrao, segundos in (settings.getlist('HTTPCACHE_SQLITE_VALIDADES') or VALIDADES_PADRAO)
+        ]
+        self.conexao = None
+        self.stats = None
+
+    def open_spider(self, spider):
+        self.fingerprinter = spider.crawler.request_fingerprinter
+        self.stats = spider.crawler.stats
+        self.compressor = zstandard.ZstdCompressor(level=self.nivel)
+        self.descompressor = zstandard.ZstdDecompressor()
+        self.conexao = abrir_sqlite(self.caminho)
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                cabecalhos BLOB NOT NULL,
+                corpo BLOB NOT NULL,
+                tamanho INTEGER NOT NULL,
+                armazenado_em REAL NOT NULL,
+                acessado_em REAL NOT NULL
+            )
+        """)
+        self.conexao.execute("CREATE INDEX IF NOT EXISTS respostas_acessado_em ON respostas (acessado_em)")
+        self.conexao.commit()
+        self.tamanho_total = self.conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+
+    def close_spider(self, spider):
+        self.conexao.commit()
+        self.conexao.close()
+
+    def _chave(self, spider, request):
+        # as respostas de todos os spiders ficam no mesmo arquivo
+        return f"{spider.name}:{self.fingerprinter.fingerprint(request).hex()}"
+
+    def validade(self, url):
+        for padrao, segundos in self.validades:
+            if padrao.search(url):
+                return segundos
+        return self.validade_padrao
+
+    def retrieve_response(self, spider, request):
+        chave = self._chave(spider, request)
+        linha = self.conexao.execute(
+            "SELECT url, status, cabecalhos, corpo, armazenado_em FROM respostas WHERE chave = ?", (chave,)
+        ).fetchone()
+        if linha is None:
+            return None
+        validade = self.validade(request.url)
+        agora = time.time()
+        if validade and agora - linha["armazenado_em"] > validade:
+            self.stats.inc_value('httpcache/sqlite/expiradas')
+            return None
+
+        self.conexao.execute("UPDATE respostas SET acessado_em = ? WHERE chave = ?", (agora, chave))
+        cabecalhos = Headers(headers_raw_to_dict(self.descompressor.decompress(linha["cabecalhos"])))
+        corpo = self.descompressor.decompress(linha["corpo"])
+        url = linha["url"]
+        respcls = responsetypes.from_args(headers=cabecalhos, url=url, body=corpo)
+        return respcls(url=url, headers=cabecalhos, status=linha["status"], body=corpo)
+
+    def store_response(self, spider, request, response):
+        if len(response.body) > self.tamanho_maximo_item:
+            self.stats.inc_value('httpcache/sqlite/grandes_demais')
+            return
+        cabecalhos = self.compressor.compress(headers_dict_to_raw(response.headers))
+        corpo = self.compressor.compress(response.body)
+        tamanho = len(cabecalhos) + len(corpo)
+        chave = self._chave(spider, request)
+        agora = time.time()
+
+        anterior = self.conexao.execute("SELECT tamanho FROM respostas WHERE chave = ?", (chave,)).fetchone()
+        self.conexao.execute(
+            """
+            INSERT OR REPLACE INTO respostas (chave, url, status, cabecalhos, corpo, tamanho, armazenado_em, acessado_em)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (chave, response.url, response.status, cabecalhos, corpo, tamanho, agora, agora)
+        )
+        self.tamanho_total += tamanho - (anterior["tamanho"] if anterior else 0)
+        self.stats.inc_value('httpcache/sqlite/bytes_originais', len(response.body))
+        self.stats.inc_value('httpcache/sqlite/bytes_comprimidos', len(corpo))
+        if self.tamanho_total > self.tamanho_maximo:
+            self._despejar(spider)
+        self.conexao.commit()
+
+    def _despejar(self, spider):
+        """Remove as respostas acessadas há mais tempo até o cache ficar em 90% do tamanho máximo."""
+        alvo = self.tamanho_maximo * 0.9
+        while self.tamanho_total > alvo:
+            linhas = self.conexao.execute(
+                "SELECT chave, tamanho FROM respostas ORDER BY acessado_em LIMIT 500"
+            ).fetchall()
+            if not linhas:
+                self.tamanho_total = 0
+                break
+            removidas = []
+            for linha in linhas:
+                removidas.append((linha["chave"],))
+                self.tamanho_total -= linha["tamanho"]
+                if self.tamanho_total <= alvo:
+                    break
+            self.conexao.executemany("DELETE FROM respostas WHERE chave = ?", removidas)
+            self.stats.inc_value('httpcache/sqlite/despejadas', len(removidas))
+
+
+class ValidadoresHttp:
+    """
+    Última resposta 200 de cada URL com ETag/Last-Modified (cabeçalhos e corpo em zstd), usada pelo
+    RequisicaoCondicionalMiddleware para enviar requisições condicionais e repetir o corpo num 304.
+    Entradas não usadas há mais de `idade_maxima` segundos são removidas ao abrir e, acima de
+    `tamanho_maximo` bytes (comprimidos), as usadas há mais tempo são despejadas (LRU) até 90%.
+    """
+
+    COLUNAS_DESPEJO = {
+        "tamanho": "INTEGER NOT NULL DEFAULT 0",
+        "acessado_em": "REAL NOT NULL DEFAULT 0",
+    }
+
+    def __init__(self, caminho, nivel=3, tamanho_maximo=None, idade_maxima=None):
+        self.compressor = zstandard.ZstdCompressor(level=nivel)
+        self.descompressor = zstandard.ZstdDecompressor()
+        self.tamanho_maximo = tamanho_maximo
+        self.conexao = abrir_sqlite(caminho)
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS validadores (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                cabecalhos BLOB NOT NULL,
+                corpo BLOB NOT NULL,
+                atualizado_em REAL NOT NULL
+            )
+        """)
+        # bancos criados antes do despejo ganham as colunas novas
+        existentes = {linha["name"] for linha in self.conexao.execute("PRAGMA table_info(validadores)")}
+        for coluna, tipo in self.COLUNAS_DESPEJO.items():
+            if coluna not in existentes:
+                self.conexao.execute(f"ALTER TABLE validadores ADD COLUMN {coluna} {tipo}")
+        self.conexao.execute("CREATE INDEX IF NOT EXISTS validadores_acessado_em ON validadores (acessado_em)")
+        self.expiradas = 0
+        if idade_maxima:
+            self.expiradas = self.conexao.execute(
+                "DELETE FROM validadores WHERE MAX(acessado_em, atualizado_em) < ?", (time.time() - idade_maxima,)
+            ).rowcount
+        self.conexao.commit()
+        self.tamanho_total = self.conexao.execute(
+            "SELECT COALESCE(SUM(tamanho), 0) FROM validadores"
+        ).fetchone()[0]
+
+    def obter(self, url):
+        linha = self.conexao.execute(
+            "SELECT etag, last_modified FROM validadores WHERE url = ?", (url,)
+        ).fetchone()
+        return dict(linha) if linha else None
+
+    def resposta(self, url):
+        """(cabeçalhos, corpo) guardados para a URL, ou None."""
+        linha = self.conexao.execute(
+            "SELECT cabecalhos, corpo FROM validadores WHERE url = ?", (url,)
+        ).fetchone()
+        if linha is None:
+            return None
+        self.conexao.execute("UPDATE validadores SET acessado_em = ? WHERE url = ?", (time.time(), url))
+        self.conexao.commit()
+        cabecalhos = Headers(headers_raw_to_dict(self.descompressor.decompress(linha["cabecalhos"])))
+        return cabecalhos, self.descompressor.decompress(linha["corpo"])
+
+    def guardar(self, url, etag, last_modified, cabecalhos, corpo):
+        """Guarda a resposta da URL e devolve quantas entradas antigas foram despejadas."""
+        cabecalhos = self.compressor.compress(headers_dict_to_raw(cabecalhos))
+        corpo = self.compressor.compress(corpo)
+        tamanho = len(cabecalhos) + len(corpo)
+        agora = time.time()
+        anterior = self.conexao.execute("SELECT tamanho FROM validadores WHERE url = ?", (url,)).fetchone()
+        self.conexao.execute(
+            """
+            INSERT OR REPLACE INTO validadores
+                (url, etag, last_modified, cabecalhos, corpo, atualizado_em, tamanho, acessado_em)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (url, etag, last_modified, cabecalhos, corpo, agora, tamanho, agora)
+        )
+        self.tamanho_total += tamanho - (anterior["tamanho"] if anterior else 0)
+        despejadas = 0
+        if self.tamanho_maximo and self.tamanho_total > self.tamanho_maximo:
+            despejadas = self._despejar()
+        self.conexao.commit()
+        return despejadas
+
+    def _despejar(self):
+        """Remove as entradas usadas há mais tempo até o total ficar em 90% do tamanho máximo."""
+        alvo = self.tamanho_maximo * 0.9
+        removidas = []
+        for linha in self.conexao.execute("SELECT url, tamanho FROM validadores ORDER BY acessado_em"):
+            if self.tamanho_total <= alvo:
+                break
+            removidas.append((linha["url"],))
+            self.tamanho_total -= linha["tamanho"]
+        self.conexao.executemany("DELETE FROM validadores WHERE url = ?", removidas)
+        return len(removidas)
+
+    def fechar(self):
+        self.conexao.close()
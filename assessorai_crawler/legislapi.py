@@ -0,0 +1,161 @@
+# Arquivo: assessorai_crawler/legislapi.py
+
+import hashlib
+import json
+import os
+import re
+import time
+from .armazenamento import abrir_sqlite, sha256_arquivo
+from .utils import iterar_json_array
+
+_RE_SEPARADORES_TITULO = re.compile(r'[\s/]+')
+TAMANHO_LOTE_INSERCAO = 5000
+
+
+def chave_titulo(titulo):
+    """
+    Chave normalizada 'TIPO|numero|ano' de um título como 'PL 123/2020' ou 'PL 123 2020',
+    usada para ligar o texto integral aos metadados. Títulos fora desse formato usam o próprio
+    título (com espaços normalizados e em maiúsculas) como chave.
+    """
+    titulo = (titulo or '').strip().upper()
+    partes = [p for p in _RE_SEPARADORES_TITULO.split(titulo) if p]
+    if len(partes) >= 3 and partes[1].isdigit() and partes[2].isdigit():
+        return f"{partes[0].rstrip('.')}|{int(partes[1])}|{int(partes[2])}"
+    return " ".join(partes)
+
+
+def impressao_registro(entrada, metadados):
+    """SHA-256 do texto integral e dos metadados de uma proposição, para detectar mudanças no dump."""
+    conteudo = json.dumps([entrada, metadados], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+class IndiceMetadados:
+    """
+    Índice em disco (SQLite) dos metadados de um dump do Legislapi, por chave_titulo.
+    É construído uma vez a partir do arquivo de metadados e reaproveitado nas execuções
+    seguintes enquanto o arquivo não mudar (tamanho/mtime e, se preciso, SHA-256).
+    """
+
+    def __init__(self, caminho, arquivo_metadados):
+        self.arquivo_metadados = arquivo_metadados
+        self.conexao = abrir_sqlite(caminho)
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS fonte (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                caminho TEXT,
+                tamanho INTEGER,
+                mtime REAL,
+                sha256 TEXT,
+                entradas INTEGER,
+                construido_em REAL
+            )
+        """)
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS metadados (
+                chave TEXT PRIMARY KEY,
+                dados TEXT NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self.conexao.commit()
+
+    def atualizar(self):
+        """Reconstrói o índice se o arquivo de metadados mudou. Devolve True se reconstruiu."""
+        estado = os.stat(self.arquivo_metadados)
+        fonte = self.conexao.execute("SELECT * FROM fonte WHERE id = 1").fetchone()
+        if fonte and fonte["caminho"] == self.arquivo_metadados and fonte["tamanho"] == estado.st_size:
+            if fonte["mtime"] == estado.st_mtime:
+                return False
+            # arquivo tocado mas com o mesmo conteúdo: só atualiza o mtime
+            sha256 = sha256_arquivo(self.arquivo_metadados)
+            if sha256 == fonte["sha256"]:
+                self.conexao.execute("UPDATE fonte SET mtime = ? WHERE id = 1", (estado.st_mtime,))
+                self.conexao.commit()
+                return False
+        else:
+            sha256 = sha256_arquivo(self.arquivo_metadados)
+        self._construir(estado, sha256)
+        return True
+
+    def _construir(self, estado, sha256):
+        # tudo numa transação: uma construção interrompida não deixa o índice pela metade
+        with self.conexao:
+            self.conexao.execute("DELETE FROM metadados")
+            entradas = 0
+            lote = []
+            for entrada in iterar_json_array(self.arquivo_metadados):
+                lote.append((chave_titulo(entrada.get('Titulo')), json.dumps(entrada, ensure_ascii=False)))
+                if len(lote) >= TAMANHO_LOTE_INSERCAO:
+                    entradas += self._inserir(lote)
+                    lote = []
+            entradas += self._inserir(lote)
+            self.conexao.execute(
+                """
+                INSERT OR REPLACE INTO fonte (id, caminho, tamanho, mtime, sha256, entradas, construido_em)
+                VALUES (1, ?, ?, ?, ?, ?, ?)
+                """,
+                (self.arquivo_metadados, estado.st_size, estado.st_mtime, sha256, entradas, time.time())
+            )
+
+    def _inserir(self, lote):
+        # títulos repetidos: vale a última entrada, como no dict usado antes
+        self.conexao.executemany("INSERT OR REPLACE INTO metadados (chave, dados) VALUES (?, ?)", lote)
+        return len(lote)
+
+    def obter(self, titulo):
+        """Metadados da proposição com esse título (em qualquer formato aceito por chave_titulo), ou {}."""
+        linha = self.conexao.execute(
+            "SELECT dados FROM metadados WHERE chave = ?", (chave_titulo(titulo),)
+        ).fetchone()
+        return json.loads(linha["dados"]) if linha else {}
+
+    def fechar(self):
+        self.conexao.close()
+
+
+class RegistroImpressoes:
+    """
+    Registro por estado das impressões (chave_titulo → impressao_registro) das proposições já
+    emitidas, para que as execuções seguintes emitam só o que mudou no dump.
+    A comparação (impressao) não altera o registro: a impressão só é registrada depois que o item
+    passou por todos os pipelines (sinal item_scraped no spider), para que um item descartado ou
+    com erro seja emitido de novo na próxima execução. As impressões registradas ficam numa
+    transação aberta e só são gravadas por confirmar(), ao fim de uma execução completa;
+    descartar() as desfaz, e a próxima execução emite tudo de novo.
+    """
+
+    def __init__(self, caminho):
+        self.conexao = abrir_sqlite(caminho)
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS impressoes (
+                chave TEXT PRIMARY KEY,
+                impressao TEXT NOT NULL,
+                atualizado_em REAL
+            ) WITHOUT ROWID
+        """)
+        self.conexao.commit()
+
+    def vazio(self):
+        return self.conexao.execute("SELECT 1 FROM impressoes LIMIT 1").fetchone() is None
+
+    def impressao(self, chave):
+        """Impressão registrada para a chave (ou None), sem alterar o registro."""
+        linha = self.conexao.execute("SELECT impressao FROM impressoes WHERE chave = ?", (chave,)).fetchone()
+        return linha["impressao"] if linha else None
+
+    def registrar(self, chave, impressao):
+        """Registra a impressão de uma proposição emitida (gravada só em confirmar())."""
+        self.conexao.execute(
+            "INSERT OR REPLACE INTO impressoes (chave, impressao, atualizado_em) VALUES (?, ?, ?)",
+            (chave, impressao, time.time())
+        )
+
+    def confirmar(self):
+        self.conexao.commit()
+
+    def descartar(self):
+        self.conexao.rollback()
+
+    def fechar(self):
+        self.conexao.close()
@@ -3,11 +3,19 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
-from scrapy import signals
+import re
+import time
+
+from scrapy import Request, signals
+from scrapy.exceptions import NotConfigured
+from scrapy.responsetypes import responsetypes
 
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
 
+from .armazenamento import RegistroVistos
+from .httpcache import ValidadoresHttp
+
 
 class AssessoraiCrawlerSpiderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
@@ -53,48 +61,201 @@ class AssessoraiCrawlerSpiderMiddleware:
         spider.logger.info("Spider opened: %s" % spider.name)
 
 
-class AssessoraiCrawlerDownloaderMiddleware:
-    # Not all methods need to be defined. If a method is not defined,
-    # scrapy acts as if the downloader middleware does not modify the
-    # passed objects.
+class RequisicaoCondicionalMiddleware:
+    """
+    GET condicional para as páginas de detalhe (URLs que casam com CONDICIONAL_URLS).
+
+    Guarda o ETag/Last-Modified e o corpo da última resposta 200 de cada URL e, nas execuções
+    seguintes, envia If-None-Match/If-Modified-Since. Num 304 a resposta guardada é devolvida
+    ao spider como 200 (com a flag 'condicional'), sem baixar o corpo de novo; se o corpo tiver
+    sido despejado nesse meio-tempo, a requisição é refeita sem os validadores.
+    Fica depois do HttpCacheMiddleware (900): num acerto do cache, process_request não é chamado
+    aqui, mas process_response é, e as respostas com a flag 'cached' não são guardadas de novo; o
+    corpo repetido num 304 é guardado pelo cache como uma resposta comum.
+    As respostas guardadas (CONDICIONAL_DB) sem uso há mais de CONDICIONAL_IDADE_MAXIMA_DIAS são
+    removidas, e acima de CONDICIONAL_MAX_BYTES as usadas há mais tempo são despejadas.
+    """
+
+    def __init__(self, caminho, padroes, stats, tamanho_maximo=None, idade_maxima_dias=None):
+        self.validadores = ValidadoresHttp(
+            caminho,
+            tamanho_maximo=tamanho_maximo,
+            idade_maxima=idade_maxima_dias * 86400 if idade_maxima_dias else None,
+        )
+        self.padroes = [re.compile(padrao) for padrao in padroes]
+        self.stats = stats
+        if self.validadores.expiradas:
+            self.stats.inc_value("condicional/expiradas", self.validadores.expiradas)
 
     @classmethod
     def from_crawler(cls, crawler):
-        # This method is used by Scrapy to create your spiders.
-        s = cls()
-        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        settings = crawler.settings
+        if not settings.getbool("CONDICIONAL_ENABLED"):
+            raise NotConfigured
+        s = cls(
+            settings.get("CONDICIONAL_DB", "storage/dbs/condicional.sqlite3"),
+            settings.getlist("CONDICIONAL_URLS"),
+            crawler.stats,
+            tamanho_maximo=settings.getint("CONDICIONAL_MAX_BYTES") or None,
+            idade_maxima_dias=settings.getfloat("CONDICIONAL_IDADE_MAXIMA_DIAS") or None,
+        )
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
         return s
 
+    def _aplicavel(self, request):
+        return (
+            request.method == "GET"
+            and not request.meta.get("dont_condicional")
+            and any(padrao.search(request.url) for padrao in self.padroes)
+        )
+
     def process_request(self, request, spider):
-        # Called for each request that goes through the downloader
-        # middleware.
-
-        # Must either:
-        # - return None: continue processing this request
-        # - or return a Response object
-        # - or return a Request object
-        # - or raise IgnoreRequest: process_exception() methods of
-        #   installed downloader middleware will be called
+        if not self._aplicavel(request):
+            return None
+        anterior = self.validadores.obter(request.url)
+        if anterior is None:
+            return None
+        if anterior["etag"] and b"If-None-Match" not in request.headers:
+            request.headers[b"If-None-Match"] = anterior["etag"]
+        if anterior["last_modified"] and b"If-Modified-Since" not in request.headers:
+            request.headers[b"If-Modified-Since"] = anterior["last_modified"]
+        request.meta["_condicional"] = True
+        self.stats.inc_value("condicional/requisicoes")
         return None
 
     def process_response(self, request, response, spider):
-        # Called with the response returned from the downloader.
+        if not self._aplicavel(request):
+            return response
+
+        if response.status == 304 and request.meta.get("_condicional"):
+            guardada = self.validadores.resposta(request.url)
+            if guardada is None:
+                # corpo despejado entre process_request e a resposta: um 304 sem corpo seria
+                # descartado pelo HttpErrorMiddleware, então a página é pedida de novo, sem validadores
+                self.stats.inc_value("condicional/reenviadas")
+                cabecalhos = request.headers.copy()
+                cabecalhos.pop(b"If-None-Match", None)
+                cabecalhos.pop(b"If-Modified-Since", None)
+                meta = {**request.meta, "dont_condicional": True}
+                meta.pop("_condicional", None)
+                return request.replace(headers=cabecalhos, meta=meta, dont_filter=True)
+            cabecalhos, corpo = guardada
+            self.stats.inc_value("condicional/304")
+            self.stats.inc_value("condicional/bytes_economizados", len(corpo))
+            respcls = responsetypes.from_args(headers=cabecalhos, url=request.url, body=corpo)
+            return respcls(url=request.url, headers=cabecalhos, status=200, body=corpo,
+                           flags=response.flags + ["condicional"], request=request)
 
-        # Must either;
-        # - return a Response object
-        # - return a Request object
-        # - or raise IgnoreRequest
+        if response.status == 200 and "cached" not in response.flags:
+            etag = response.headers.get(b"ETag")
+            last_modified = response.headers.get(b"Last-Modified")
+            if etag or last_modified:
+                despejadas = self.validadores.guardar(
+                    request.url,
+                    etag.decode("latin-1") if etag else None,
+                    last_modified.decode("latin-1") if last_modified else None,
+                    response.headers,
+                    response.body,
+                )
+                self.stats.inc_value("condicional/guardadas")
+                if despejadas:
+                    self.stats.inc_value("condicional/despejadas", despejadas)
+            else:
+                self.stats.inc_value("condicional/sem_validadores")
         return response
 
-    def process_exception(self, request, exception, spider):
-        # Called when a download handler or a process_request()
-        # (from other downloader middleware) raises an exception.
+    def spider_closed(self, spider):
+        self.validadores.fechar()
 
-        # Must either:
-        # - return None: continue processing this exception
-        # - return a Response object: stops process_exception() chain
-        # - return a Request object: stops process_exception() chain
-        pass
 
-    def spider_opened(self, spider):
-        spider.logger.info("Spider opened: %s" % spider.name)
+class VistosSpiderMiddleware:
+    """
+    Evita baixar de novo as páginas de detalhe de proposições que não mudaram.
+
+    Os spiders marcam a requisição de detalhe feita a partir de uma linha da listagem com
+    meta['vistos'] = {'uuid': ..., 'impressao': ...}, onde a impressão resume o conteúdo da linha.
+    Nas execuções incrementais (sem período nem limite), a requisição é descartada se a mesma
+    impressão foi registrada há menos de VISTOS_IDADE_MAXIMA_DIAS.
+    A marca passa para as requisições seguintes da mesma proposição (ex.: página de peças) e a
+    impressão só é registrada quando o item passa por todas as pipelines (sinal item_scraped):
+    itens descartados (DropItem) voltam a ser coletados na próxima execução.
+    """
+
+    def __init__(self, caminho, idade_maxima_dias, stats):
+        self.registro = RegistroVistos(caminho)
+        self.idade_maxima = idade_maxima_dias * 86400
+        self.stats = stats
+        self.pendentes = 0
+        # só execuções incrementais deixam de baixar o detalhe do que não mudou
+        self.incremental = False
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("VISTOS_ENABLED"):
+            raise NotConfigured
+        s = cls(
+            settings.get("VISTOS_DB", "storage/dbs/vistos.sqlite3"),
+            settings.getfloat("VISTOS_IDADE_MAXIMA_DIAS", 7),
+            crawler.stats,
+        )
+        # com proposições já vistas, uma execução sem período nem limite só emite as novas ou
+        # alteradas, num .jl de delta; execuções com período ou limite coletam tudo e geram o .jl completo
+        spider = crawler.spider
+        if spider is not None and not s.registro.vazio(spider.name) and not (
+            getattr(spider, "data_inicio", None) or getattr(spider, "data_fim", None)
+            or getattr(spider, "limite_total_itens", None)
+        ):
+            s.incremental = spider.saida_incremental = True
+        crawler.signals.connect(s.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def process_spider_output(self, response, result, spider):
+        for objeto in result:
+            objeto = self._filtrar(response, objeto, spider)
+            if objeto is not None:
+                yield objeto
+
+    async def process_spider_output_async(self, response, result, spider):
+        async for objeto in result:
+            objeto = self._filtrar(response, objeto, spider)
+            if objeto is not None:
+                yield objeto
+
+    def _filtrar(self, response, objeto, spider):
+        vistos_resposta = response.meta.get("vistos") if response is not None else None
+
+        if isinstance(objeto, Request):
+            if vistos_resposta and "vistos" not in objeto.meta:
+                # requisição seguinte da mesma proposição: já foi liberada na página anterior
+                objeto.meta["vistos"] = vistos_resposta
+                return objeto
+            vistos = objeto.meta.get("vistos")
+            if not vistos or not vistos.get("uuid") or vistos is vistos_resposta or not self.incremental:
+                return objeto
+            anterior = self.registro.obter(spider.name, vistos["uuid"])
+            if anterior is None or anterior["impressao"] != vistos["impressao"]:
+                self.stats.inc_value("vistos/novos_ou_alterados")
+                return objeto
+            if time.time() - anterior["visto_em"] >= self.idade_maxima:
+                self.stats.inc_value("vistos/expirados")
+                return objeto
+            self.stats.inc_value("vistos/ignorados")
+            return None
+
+        return objeto
+
+    def item_scraped(self, item, response, spider):
+        vistos = response.meta.get("vistos") if response is not None else None
+        if not vistos or not vistos.get("uuid"):
+            return
+        self.registro.registrar(spider.name, vistos["uuid"], vistos["impressao"])
+        self.stats.inc_value("vistos/registrados")
+        self.pendentes += 1
+        if self.pendentes >= 100:
+            self.registro.confirmar()
+            self.pendentes = 0
+
+    def spider_closed(self, spider):
+        self.registro.fechar()
@@ -0,0 +1,192 @@
+# Arquivo: assessorai_crawler/padronizacao.py
+
+import hashlib
+import logging
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+from unidecode import unidecode
+
+MESES = {
+    'janeiro': 1, 'fevereiro': 2, 'março': 3, 'abril': 4,
+    'maio': 5, 'junho': 6, 'julho': 7, 'agosto': 8,
+    'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12
+}
+
+# Formatos aceitos, despachados pelo "formato" do texto em vez de tentativa e erro com strptime
+_RE_DATA_BR = re.compile(r'^(\d{1,2})/(\d{1,2})/(\d{4})(?:\s+(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?)?$')
+_RE_DATA_ISO = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})$')
+_RE_DATA_EXTENSO = re.compile(r'(\d{1,2})\s+de\s+(\w+)\s+de\s+(\d{4})', re.IGNORECASE)
+
+_RE_PARTIDO = re.compile(r'\((.*?)\)')
+_RE_PREFIXO_VEREADOR = re.compile(r'^\s*Ver\.\s*')
+_RE_SLUG = re.compile(r'[\s\W_]+')
+
+logger = logging.getLogger(__name__)
+
+
+def _criar_data(ano, mes, dia, hora=0, minuto=0, segundo=0):
+    try:
+        return datetime(int(ano), int(mes), int(dia), int(hora or 0), int(minuto or 0), int(segundo or 0))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=65536)
+def converter_data(data_texto, aceitar_invertida=False):
+    """
+    Converte uma data em texto para datetime, ou None se não reconhecer o formato.
+    Aceita dd/mm/yyyy (com hora opcional), yyyy-mm-dd e "27 de outubro de 2025". Com
+    aceitar_invertida, uma dd/mm/yyyy inválida é lida como mm/dd/yyyy (só na padronização da saída;
+    os filtros de período dos spiders não devem usar essa tentativa).
+    """
+    if not data_texto:
+        return None
+    texto = data_texto.strip()
+
+    match = _RE_DATA_BR.match(texto)
+    if match:
+        dia, mes, ano, hora, minuto, segundo = match.groups()
+        data = _criar_data(ano, mes, dia, hora, minuto, segundo)
+        if data is None and hora is None and aceitar_invertida:
+            # caso venha invertido (mm/dd/yyyy); o aviso sai uma vez por texto (lru_cache)
+            data = _criar_data(ano, dia, mes)
+            if data is not None:
+                logger.warning(f"Data {texto!r} inválida como dd/mm/yyyy; lida como mm/dd/yyyy.")
+        return data
+
+    match = _RE_DATA_ISO.match(texto)
+    if match:
+        return _criar_data(*match.groups())
+
+    match = _RE_DATA_EXTENSO.search(texto)
+    if match:
+        dia, mes_nome, ano = match.groups()
+        mes = MESES.get(mes_nome.lower())
+        if mes:
+            return _criar_data(ano, mes, dia)
+    return None
+
+
+@lru_cache(maxsize=65536)
+def formatar_data(data_texto):
+    """Converte a data para YYYY-MM-DD; se não reconhecer o formato, devolve o texto original."""
+    if not data_texto:
+        return None
+    data = converter_data(data_texto, aceitar_invertida=True)
+    if data:
+        return data.strftime('%Y-%m-%d')
+    return data_texto
+
+
+@lru_cache(maxsize=16384)
+def extrair_nome_partido(texto_autor):
+    """Separa "Ver. Fulano (PT)" em ("Fulano", "PT")."""
+    match = _RE_PARTIDO.search(texto_autor)
+    if match:
+        partido = match.group(1).strip().upper()
+        nome = _RE_PREFIXO_VEREADOR.sub('', texto_autor).replace(f"({match.group(1)})", "").strip()
+        return nome, partido
+    return texto_autor.strip(), None
+
+
+@lru_cache(maxsize=1024)
+def slugify(text):
+    """Converte um texto como "São Paulo" para "sao-paulo"."""
+    if not text:
+        return ""
+    text = unidecode(str(text)).lower()
+    return _RE_SLUG.sub('-', text).strip('-')
+
+
+def contexto_spider(spider):
+    """
+    Calcula uma única vez os dados constantes de um spider usados na padronização.
+    O resultado é um dict simples, para poder ser serializado e enviado a outros processos.
+    """
+    uf = getattr(spider, 'uf', None)
+    municipio = getattr(spider, 'municipio', None)
+    partes = [slugify(uf), slugify(municipio), spider.slug]
+    return {
+        "slug": spider.slug,
+        "esfera": getattr(spider, 'esfera', None),
+        "uf": uf,
+        "municipio": municipio,
+        "casa_legislativa": getattr(spider, 'casa_legislativa', None),
+        "prefixo_caminho": "/".join(p for p in partes if p),
+    }
+
+
+def caminho_arquivo_adicional(caminho, posicao):
+    """
+    Caminho do arquivo na `posicao` de file_urls: o primeiro fica com o caminho_arquivo_original
+    do item, os demais ganham o sufixo -N (N = posição + 1).
+    """
+    if not posicao:
+        return caminho
+    raiz, extensao = os.path.splitext(caminho)
+    return f"{raiz}-{posicao + 1}{extensao or '.pdf'}"
+
+
+def padronizar_item(item, contexto):
+    """Recebe o item bruto e devolve {'item_bruto', 'item_padronizado'}."""
+    autores_final = []
+    for autor_raw in item.get('autores_bruto') or []:
+        nome, partido = extrair_nome_partido(autor_raw)
+        autores_final.append({"nome": nome, "partido": partido})
+
+    numero = item.get("numero_bruto")
+    ano = item.get("ano_bruto")
+    tipo = (item.get("tipo_bruto") or "projeto-de-lei").lower().replace(" ", "-")
+
+    urls_arquivos = item.get("file_urls") or []
+    url_arquivo = urls_arquivos[0] if urls_arquivos else item.get("url_documento_original")
+    if numero and ano:
+        nome_arquivo = f"{tipo}-{numero}-{ano}"
+    elif url_arquivo:
+        # nomes genéricos colidiriam entre itens diferentes: o hash da URL os separa
+        nome_arquivo = f"arquivo-sem-nome-{hashlib.sha1(url_arquivo.encode('utf-8')).hexdigest()[:10]}"
+    else:
+        nome_arquivo = "arquivo-sem-nome"
+
+    caminho_base = f"{contexto['prefixo_caminho']}/{nome_arquivo}"
+
+    # só define caminho do PDF se realmente houver PDF
+    tem_pdf = bool(item.get("url_documento_original")) or bool(item.get("file_urls"))
+    caminho_pdf = (
+        item.get("caminho_arquivo_original")
+        if item.get("caminho_arquivo_original") and tem_pdf
+        else (f"{caminho_base}.pdf" if tem_pdf else None)
+    )
+
+    caminho_md = item.get("caminho_arquivo_texto") or f"{caminho_base}.md"
+
+    item_padronizado = {
+        "localidade": {
+            "esfera": contexto["esfera"],
+            "municipio": contexto["municipio"],
+            "estado": contexto["uf"],
+        },
+        "casa_legislativa": contexto["casa_legislativa"],
+        "tipo_documento": item.get('tipo_bruto'),
+        "numero_documento": str(item.get('numero_bruto')),
+        "data_documento": formatar_data(item.get('data_documento_bruto')),
+        "autores": autores_final,
+        "ementa": item.get('ementa_bruto'),
+        "assuntos": item.get('assuntos_bruto', []),
+        "status_tramitacao": [
+            {
+                "descricao": s.get("descricao"),
+                "data": formatar_data(s.get("data"))
+            }
+            for s in item.get('status_bruto') or []
+        ],
+        "url_documento_original": item.get("url_documento_original"),
+        "caminho_arquivo_original": caminho_pdf,
+        "caminho_arquivo_texto": caminho_md,
+
+        "data_raspagem": item.get('data_raspagem_bruto')
+    }
+
+    return {'item_bruto': item, 'item_padronizado': item_padronizado}
@@ -1,146 +1,313 @@
 # Arquivo: assessorai_crawler/pipelines.py
 
+import gzip
+import hashlib
 import json
 import os
 import re
-import google.generativeai as genai
-from unidecode import unidecode
+import tempfile
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
 from scrapy import Request
 from scrapy.exceptions import DropItem
-from scrapy.pipelines.files import FilesPipeline
-from datetime import datetime
+from scrapy.pipelines.files import FileException, FilesPipeline
 from scrapy.utils.project import get_project_settings
+from twisted.internet.defer import Deferred, DeferredList, maybeDeferred, succeed
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
+from .armazenamento import ArmazemConteudo, IndiceArquivos, sha256_arquivo
+from .cache_gemini import abrir_cache
+from .downloads import ErroDownload, baixar_em_fluxo
+from .extracao_local import DIGITAL, ESCANEADO, ExtratorLocal, contar_paginas, dividir_pdf
+from .gemini import espera_com_jitter, genai
+from .padronizacao import caminho_arquivo_adicional, contexto_spider, padronizar_item
+
+class ArquivoBrutoPipeline:
+    """
+    Guarda cada item bruto, comprimido, em ARQUIVO_BRUTO_DIR/<slug>/<data-hora>.jl.gz (um arquivo por execução).
+    Permite reprocessar a padronização offline (scripts/replay.py) sem refazer a raspagem.
+    """
+
+    def open_spider(self, spider):
+        output_dir = os.path.join(spider.settings.get('ARQUIVO_BRUTO_DIR', 'storage/arquivo_bruto'), spider.slug)
+        os.makedirs(output_dir, exist_ok=True)
+        self.contexto = contexto_spider(spider)
+        # um arquivo por execução: uma execução interrompida só trunca o próprio arquivo
+        file_path = os.path.join(output_dir, f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.jl.gz")
+        self.file = gzip.open(file_path, 'wt', encoding='utf-8', compresslevel=6)
+
+    def process_item(self, item, spider):
+        registro = {
+            "uuid": item.get('uuid'),
+            "tipo": type(item).__name__,
+            "contexto": self.contexto,
+            "item": dict(item),
+        }
+        self.file.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+        return item
+
+    def close_spider(self, spider):
+        self.file.close()
 
 class PipelinePadronizacao:
     """
     Recebe o item bruto, padroniza os dados e gera os caminhos dos arquivos.
+    O contexto constante do spider (UF, município, slug) é calculado uma única vez em open_spider.
     """
 
-    def _slugify(self, text):
-        """Converte um texto como "São Paulo" para "sao-paulo"."""
-        if not text: return ""
-        text = unidecode(str(text))
-        text = text.lower()
-        text = re.sub(r'[\s\W_]+', '-', text)
-        return text.strip('-')
+    def __init__(self):
+        self.contexto = None
 
-    def process_item(self, item, spider):
-        autores_final = []
-        for autor_raw in item.get('autores_bruto', []):
-            nome, partido = self._extrair_nome_partido(autor_raw)
-            autores_final.append({"nome": nome, "partido": partido})
+    def open_spider(self, spider):
+        self.contexto = contexto_spider(spider)
 
-        data_formatada = self._formatar_data(item.get('data_documento_bruto'))
-        
-        numero = item.get("numero_bruto")
-        ano = item.get("ano_bruto")
-        tipo = item.get("tipo_bruto", "projeto-de-lei").lower().replace(" ", "-")
+    def process_item(self, item, spider):
+        if self.contexto is None:
+            self.contexto = contexto_spider(spider)
+        return padronizar_item(item, self.contexto)
 
-        if numero and ano:
-            nome_arquivo = f"{tipo}-{numero}-{ano}"
-        else:
-            nome_arquivo = "arquivo-sem-nome"
-
-        uf_slug = self._slugify(spider.uf)
-        municipio_slug = self._slugify(spider.municipio)
-        caminho_base = f"{uf_slug}/{municipio_slug}/{spider.slug}/{nome_arquivo}"
-
-        # só define caminho do PDF se realmente houver PDF
-        tem_pdf = bool(item.get("url_documento_original")) or bool(item.get("file_urls"))
-        caminho_pdf = (
-            item.get("caminho_arquivo_original")
-            if item.get("caminho_arquivo_original") and tem_pdf
-            else (f"{caminho_base}.pdf" if tem_pdf else None)
-        )
 
-        caminho_md = item.get("caminho_arquivo_texto") or f"{caminho_base}.md"
-
-
-        item_padronizado = {
-            "localidade": {"esfera": spider.esfera, "municipio": spider.municipio, "estado": spider.uf},
-            "casa_legislativa": spider.casa_legislativa,
-            "tipo_documento": item.get('tipo_bruto'),
-            "numero_documento": str(item.get('numero_bruto')),
-            "data_documento": data_formatada,
-            "autores": autores_final,
-            "ementa": item.get('ementa_bruto'),
-            "assuntos": item.get('assuntos_bruto', []),
-            "status_tramitacao": [
-                {
-                    "descricao": s.get("descricao"),
-                    "data": self._formatar_data(s.get("data"))
-                }
-                for s in item.get('status_bruto', [])
-            ],
-            "url_documento_original": item.get("url_documento_original"),
-            "caminho_arquivo_original": caminho_pdf,
-            "caminho_arquivo_texto": caminho_md,
-
-            "data_raspagem": item.get('data_raspagem_bruto')
-        }
-        
-        return {'item_bruto': item, 'item_padronizado': item_padronizado}
-
-    def _extrair_nome_partido(self, texto_autor):
-        match = re.search(r'\((.*?)\)', texto_autor)
-        if match:
-            partido = match.group(1).strip().upper()
-            nome = re.sub(r'^\s*Ver\.\s*', '', texto_autor).replace(f"({match.group(1)})", "").strip()
-            return nome, partido
-        return texto_autor.strip(), None
-
-    def _formatar_data(self, data_texto):
-        if not data_texto:
-            return None
-        formatos = [
-            '%d/%m/%Y %H:%M:%S',
-            '%d/%m/%Y %H:%M',
-            '%d/%m/%Y',
-            '%Y-%m-%d',   # já normalizado no spider
-            '%m/%d/%Y'    # caso venha invertido
-        ]
-        for fmt in formatos:
-            try:
-                return datetime.strptime(data_texto.strip(), fmt).strftime('%Y-%m-%d')
-            except ValueError:
-                continue
-        # tenta "27 de outubro de 2025"
-        match = re.search(r'(\d{1,2})\s+de\s+(\w+)\s+de\s+(\d{4})', data_texto, re.IGNORECASE)
-        if match:
-            dia, mes_nome, ano = match.groups()
-            meses = {
-                'janeiro': '01','fevereiro': '02','março': '03','abril': '04',
-                'maio': '05','junho': '06','julho': '07','agosto': '08',
-                'setembro': '09','outubro': '10','novembro': '11','dezembro': '12'
-            }
-            mes = meses.get(mes_nome.lower())
-            if mes:
-                return f"{ano}-{mes}-{int(dia):02d}"
-        return data_texto
 
+class ProposicaoFilesPipeline(FilesPipeline):
+    """
+    Baixa e salva os PDFs dentro de FILES_STORE/pdf/...
+
+    O conteúdo fica num armazém endereçado por SHA-256 (FILES_BLOBS_DIR) e os caminhos
+    em pdf/ são hardlinks para ele, então documentos idênticos ocupam espaço uma única vez.
+    O índice FILES_INDICE_DB guarda o hash e os validadores HTTP de cada URL baixada: quando
+    um arquivo expira (FILES_EXPIRES), ele é revalidado com uma requisição condicional e só é
+    baixado de novo se o servidor não responder 304.
+
+    Com FILES_STREAMING (desligado por padrão), os arquivos são baixados fora do downloader do
+    Scrapy, em fluxo direto para o disco (ver downloads.baixar_em_fluxo), respeitando FILES_MAX_SIZE
+    e retomando transferências interrompidas a partir de FILES_PARTIAL_DIR. Nesse modo não valem
+    robots.txt, atrasos, limites por domínio, retry, proxies nem cookies do Scrapy.
+    """
 
+    def open_spider(self, spider):
+        super().open_spider(spider)
+        settings = spider.settings
+        self.armazem = None
+        self.indice = None
+        basedir = getattr(self.store, "basedir", None)
+        if basedir:
+            # armazém só funciona com FILES_STORE local (hardlinks)
+            self.armazem = ArmazemConteudo(settings.get("FILES_BLOBS_DIR") or os.path.join(basedir, "blobs"))
+            self.indice = IndiceArquivos(settings.get("FILES_INDICE_DB", "storage/dbs/indice_arquivos.sqlite3"))
+
+        self.tamanho_maximo = settings.getint("FILES_MAX_SIZE", 0) or None
+        self.fluxo = settings.getbool("FILES_STREAMING", False) and self.armazem is not None
+        self.pool_fluxo = None
+        if self.fluxo:
+            self.dir_parciais = settings.get("FILES_PARTIAL_DIR") or os.path.join(basedir, "parciais")
+            self.cabecalhos_fluxo = {"User-Agent": settings.get("USER_AGENT")}
+            self.cabecalhos_fluxo.update(settings.getdict("DEFAULT_REQUEST_HEADERS"))
+            self.timeout_fluxo = settings.getint("DOWNLOAD_TIMEOUT", 30)
+            self.sessoes = threading.local()
+            # pool próprio para não ocupar o threadpool do reactor (usado também pela resolução de DNS)
+            self.pool_fluxo = ThreadPool(minthreads=0, maxthreads=settings.getint("FILES_STREAMING_THREADS", 8))
+            self.pool_fluxo.start()
 
-class ProposicaoFilesPipeline(FilesPipeline):
-    """Baixa e salva os PDFs dentro de FILES_STORE/pdf/..."""
+    def close_spider(self, spider):
+        if self.pool_fluxo is not None:
+            self.pool_fluxo.stop()
+        if self.indice is not None:
+            self.indice.fechar()
 
     def get_media_requests(self, item, info):
         item_bruto = item.get("item_bruto", {})
         urls = item_bruto.get("file_urls", [])
         for url in urls:
-            yield Request(url, meta={"item": item})
+            meta = {"item": item}
+            if self.tamanho_maximo:
+                meta["download_maxsize"] = self.tamanho_maximo
+            yield Request(url, meta=meta)
 
     def file_path(self, request, response=None, info=None, *, item=None):
+        item = item or {}
         item_padronizado = item.get("item_padronizado", {})
         caminho_relativo = item_padronizado.get("caminho_arquivo_original")
+        if not caminho_relativo:
+            hash_url = hashlib.sha1(request.url.encode("utf-8")).hexdigest()
+            return os.path.join("pdf", "sem-caminho", f"{hash_url}.pdf")
+
+        # o nome vem pronto da padronização (o replay chega ao mesmo caminho); só os arquivos
+        # além do primeiro ganham sufixo
+        urls = item.get("item_bruto", {}).get("file_urls") or []
+        posicao = urls.index(request.url) if request.url in urls else 0
+        raiz, extensao = os.path.splitext(caminho_arquivo_adicional(caminho_relativo, posicao))
         # força salvar dentro de pdf/
-        return os.path.join("pdf", caminho_relativo)
+        return os.path.join("pdf", f"{raiz}{extensao or '.pdf'}")
+
+    def media_to_download(self, request, info, *, item=None):
+        dfd = maybeDeferred(super().media_to_download, request, info, item=item)
+        dfd.addCallback(self._preparar_revalidacao, request, info, item)
+        return dfd
+
+    def _preparar_revalidacao(self, resultado, request, info, item):
+        """Se o arquivo expirou mas já é conhecido, transforma o download numa requisição condicional."""
+        if resultado is not None:
+            self._contar(info, "cache_hit")
+            return resultado
+        if self.indice is None:
+            return None
+        registro = self.indice.obter(request.url)
+        if not registro or not self.armazem.existe(registro["sha256"]):
+            registro = None
+        elif self._validado_recentemente(registro):
+            # o mtime do hardlink não é tocado na revalidação: a data do último 304 fica no índice
+            path = self.file_path(request, info=info, item=item)
+            self.armazem.materializar(registro["sha256"], os.path.join(self.store.basedir, path))
+            self._contar(info, "cache_hit")
+            return {"url": request.url, "path": path, "checksum": registro["sha256"], "status": "uptodate"}
+        elif not (registro["etag"] or registro["last_modified"]):
+            registro = None
+
+        if self.fluxo:
+            from twisted.internet import reactor
+            dfd = deferToThreadPool(reactor, self.pool_fluxo, self._baixar_em_fluxo, request, registro)
+            dfd.addCallback(self._concluir_fluxo, request, info, item, registro)
+            return dfd
+
+        if registro is None:
+            return None
+        if registro["etag"]:
+            request.headers["If-None-Match"] = registro["etag"]
+        if registro["last_modified"]:
+            request.headers["If-Modified-Since"] = registro["last_modified"]
+        request.meta["revalidacao"] = registro
+        return None
+
+    def _validado_recentemente(self, registro):
+        validado_em = registro.get("validado_em")
+        return bool(validado_em) and time.time() - validado_em < self.expires * 86400
+
+    def _baixar_em_fluxo(self, request, registro):
+        """Executado no pool de threads: só rede e disco, sem tocar no índice SQLite."""
+        if not hasattr(self.sessoes, "sessao"):
+            self.sessoes.sessao = requests.Session()
+        cabecalhos = dict(self.cabecalhos_fluxo)
+        cabecalhos.update(request.headers.to_unicode_dict())
+        parcial = os.path.join(self.dir_parciais, hashlib.sha1(request.url.encode("utf-8")).hexdigest() + ".part")
+        try:
+            resultado = baixar_em_fluxo(
+                request.url, parcial,
+                cabecalhos=cabecalhos,
+                validadores=registro,
+                tamanho_maximo=self.tamanho_maximo,
+                timeout=self.timeout_fluxo,
+                permitir_redirecionamentos=self.allow_redirects,
+                sessao=self.sessoes.sessao,
+            )
+        except ErroDownload as e:
+            raise FileException(str(e)) from e
+        resultado["parcial"] = parcial
+        return resultado
+
+    def _concluir_fluxo(self, resultado, request, info, item, registro):
+        if resultado["status"] == 304:
+            return self._revalidado(request, info, item, registro)
+        path = self.file_path(request, info=info, item=item)
+        sha256 = self.armazem.adotar(resultado["parcial"], resultado["sha256"])
+        self.armazem.materializar(sha256, os.path.join(self.store.basedir, path))
+        self.indice.registrar(
+            request.url, sha256, path, resultado["tamanho"],
+            etag=resultado["etag"],
+            last_modified=resultado["last_modified"],
+            content_length=resultado["content_length"],
+        )
+        self._contar(info, "baixado")
+        self._contar(info, "bytes_baixados", resultado["tamanho"])
+        return {"url": request.url, "path": path, "checksum": sha256, "status": "downloaded"}
+
+    def _revalidado(self, request, info, item, registro):
+        path = self.file_path(request, info=info, item=item)
+        destino = os.path.join(self.store.basedir, path)
+        self.armazem.materializar(registro["sha256"], destino)
+        # reinicia a contagem de FILES_EXPIRES pelo índice: tocar no hardlink mudaria o mtime do blob
+        # e de todos os outros caminhos ligados a ele
+        self.indice.marcar_validado(request.url)
+        self._contar(info, "revalidado")
+        self._contar(info, "bytes_economizados", registro["tamanho"] or 0)
+        return {"url": request.url, "path": path, "checksum": registro["sha256"], "status": "revalidated"}
+
+    def media_downloaded(self, response, request, info, *, item=None):
+        registro = request.meta.get("revalidacao")
+        if registro and response.status == 304:
+            return self._revalidado(request, info, item, registro)
+        return super().media_downloaded(response, request, info, item=item)
+
+    def file_downloaded(self, response, request, info, *, item=None):
+        if self.armazem is None:
+            return super().file_downloaded(response, request, info, item=item)
+        path = self.file_path(request, response=response, info=info, item=item)
+        sha256 = self.armazem.guardar(response.body)
+        self.armazem.materializar(sha256, os.path.join(self.store.basedir, path))
+        self.indice.registrar(
+            request.url, sha256, path, len(response.body),
+            etag=self._cabecalho(response, "ETag"),
+            last_modified=self._cabecalho(response, "Last-Modified"),
+            content_length=self._cabecalho(response, "Content-Length"),
+        )
+        self._contar(info, "baixado")
+        self._contar(info, "bytes_baixados", len(response.body))
+        return sha256
+
+    def _cabecalho(self, response, nome):
+        valor = response.headers.get(nome)
+        return valor.decode("latin-1") if valor else None
+
+    def _contar(self, info, chave, valor=1):
+        info.spider.crawler.stats.inc_value(f"arquivos/{chave}", valor)
+
+    def item_completed(self, results, item, info):
+        item = super().item_completed(results, item, info)
+        if "item_padronizado" not in item:
+            return item
+        self._atualizar_caminhos(item)
+        if self.indice is None:
+            return item
+        # expõe o hash do conteúdo para que as etapas seguintes possam pular o que já foi processado
+        for arquivo in item.get("files") or []:
+            registro = self.indice.obter(arquivo.get("url"))
+            if registro:
+                item["item_padronizado"]["sha256_arquivo_original"] = registro["sha256"]
+                break
+        return item
+
+    def _atualizar_caminhos(self, item):
+        """Faz o item apontar para o caminho em que o primeiro arquivo foi salvo de fato (ver file_path)."""
+        arquivos = item.get("files") or []
+        if not arquivos:
+            return
+        item_padronizado = item["item_padronizado"]
+        anterior = item_padronizado.get("caminho_arquivo_original")
+        caminho = os.path.relpath(arquivos[0]["path"], "pdf")
+        item_padronizado["caminho_arquivo_original"] = caminho
+        # o Markdown derivado do nome do PDF acompanha o novo nome
+        caminho_md = item_padronizado.get("caminho_arquivo_texto")
+        if anterior and caminho_md and os.path.splitext(caminho_md)[0] == os.path.splitext(anterior)[0]:
+            item_padronizado["caminho_arquivo_texto"] = f"{os.path.splitext(caminho)[0]}.md"
+
+def caminho_saida_jl(diretorio, slug, incremental=False):
+    """
+    Caminho do .jl de uma execução: <slug>_proposicoes.jl numa execução completa; numa incremental,
+    um delta próprio (<slug>_proposicoes_delta_<data-hora>.jl) só com as proposições novas ou
+    alteradas, para o .jl completo não acumular versões repetidas da mesma proposição.
+    """
+    if incremental:
+        return os.path.join(diretorio, f"{slug}_proposicoes_delta_{time.strftime('%Y%m%dT%H%M%S')}.jl")
+    return os.path.join(diretorio, f"{slug}_proposicoes.jl")
 
 class JsonWriterSinglePipeline:
     """Salva cada item padronizado como uma linha em um arquivo .jl."""
     def open_spider(self, spider):
         output_dir = f'output'
         os.makedirs(output_dir, exist_ok=True)
-        file_path = os.path.join(output_dir, f'{spider.slug}_proposicoes.jl')
+        file_path = caminho_saida_jl(output_dir, spider.slug, getattr(spider, 'saida_incremental', False))
+        spider.logger.info(f"Itens padronizados em {file_path}")
         self.file = open(file_path, 'w', encoding='utf-8')
 
     def process_item(self, item, spider):
@@ -164,15 +331,30 @@ class ValidationPipeline:
         return item
 
 class GeminiPDFExtractionPipeline:
-    """Pipeline que usa Google Gemini para extrair texto de PDFs"""
+    """
+    Pipeline que extrai o texto dos PDFs. PDFs digitais (com camada de texto) são convertidos
+    localmente com PyMuPDF; apenas os escaneados ou com texto de má qualidade vão para o Gemini.
+    """
     
-    def __init__(self):
+    def __init__(self, workers_extracao=None):
         # Configurar API do Gemini
         api_key = os.getenv('GEMINI_API_KEY')
         if not api_key:
             raise ValueError("GEMINI_API_KEY não encontrada no arquivo .env")
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-pro')
+        self.nome_modelo = 'gemini-2.5-pro'
+        self.model = genai.GenerativeModel(self.nome_modelo)
+
+        settings = get_project_settings()
+        self.cache = abrir_cache(settings)
+        self.extrator = ExtratorLocal(
+            workers=workers_extracao or settings.getint('EXTRACAO_LOCAL_WORKERS') or None,
+            min_caracteres_pagina=settings.getint('EXTRACAO_LOCAL_MIN_CARACTERES_PAGINA', 200),
+        )
+        # PDFs grandes são divididos em faixas de páginas extraídas em paralelo (0 desliga)
+        self.paginas_por_faixa = settings.getint('GEMINI_PAGINAS_POR_FAIXA', 20)
+        self.faixas_workers = settings.getint('GEMINI_FAIXAS_WORKERS', 4)
+        self.faixas_tentativas = settings.getint('GEMINI_FAIXAS_TENTATIVAS', 3)
         
         # Prompt para extração de texto legislativo
         self.extraction_prompt = """
@@ -186,9 +368,86 @@ Extraia o texto completo deste documento PDF, preservando:
 Retorne apenas o texto extraído em formato markdown, sem comentários adicionais.
 Organize o texto de forma clara e estruturada.
 """
+
+    def close_spider(self, spider):
+        self.fechar()
+
+    def fechar(self):
+        self.extrator.fechar()
+        if self.cache:
+            self.cache.fechar()
+
+    def extrair_com_gemini(self, caminho, logger, sha256=None, paginas=None):
+        """Envia o PDF ao Gemini e devolve o Markdown extraído (ou a resposta em cache para os mesmos bytes)."""
+        if self.cache:
+            sha256 = sha256 or sha256_arquivo(caminho)
+            texto = self.cache.obter(sha256, self.extraction_prompt, self.nome_modelo)
+            if texto is not None:
+                return texto
+
+        if paginas is None:
+            paginas = contar_paginas(caminho)
+        if self.paginas_por_faixa and paginas > self.paginas_por_faixa:
+            texto = self._extrair_por_faixas(caminho, logger)
+        else:
+            texto = self.extrair_arquivo(caminho)
+
+        if self.cache:
+            self.cache.guardar(sha256, self.extraction_prompt, self.nome_modelo, texto)
+        return texto
+
+    def extrair_arquivo(self, caminho):
+        """Uma única extração no Gemini: upload, geração e remoção do arquivo enviado."""
+        uploaded_file = genai.upload_file(caminho)
+        try:
+            response = self.model.generate_content([
+                self.extraction_prompt,
+                uploaded_file
+            ])
+            return response.text
+        finally:
+            # Limpar arquivo do Gemini
+            genai.delete_file(uploaded_file.name)
+
+    def _extrair_por_faixas(self, caminho, logger):
+        """Divide o PDF em faixas de páginas, extrai as faixas em paralelo e junta o Markdown na ordem original."""
+        with tempfile.TemporaryDirectory(prefix="faixas_") as diretorio:
+            faixas = dividir_pdf(caminho, self.paginas_por_faixa, diretorio)
+            logger.info(f"{caminho}: {len(faixas)} faixas de até {self.paginas_por_faixa} páginas")
+            with ThreadPoolExecutor(max_workers=self.faixas_workers) as executor:
+                textos = list(executor.map(lambda faixa: self._extrair_faixa(faixa, logger), faixas))
+        return "\n\n".join(texto.strip() for texto in textos) + "\n"
+
+    def _extrair_faixa(self, faixa, logger):
+        """Extrai uma faixa, repetindo só ela em caso de falha."""
+        primeira, ultima, caminho = faixa
+        for tentativa in range(self.faixas_tentativas):
+            try:
+                return self.extrair_arquivo(caminho)
+            except Exception as e:
+                if tentativa == self.faixas_tentativas - 1:
+                    raise
+                espera = espera_com_jitter(tentativa)
+                logger.warning(f"Falha nas páginas {primeira}-{ultima} ({e}); nova tentativa em {espera:.1f}s")
+                time.sleep(espera)
+
+    def extrair_texto(self, caminho, triagem, logger):
+        """
+        Devolve o Markdown do PDF a partir do resultado da triagem local (processar_pdf),
+        ou None se o arquivo não puder ser processado.
+        """
+        situacao = triagem['situacao']
+        if situacao == DIGITAL:
+            logger.info(f"Texto extraído localmente de {caminho} ({triagem['paginas']} páginas)")
+            return triagem['markdown']
+        if situacao == ESCANEADO:
+            logger.info(f"PDF sem camada de texto utilizável, enviando ao Gemini: {caminho}")
+            return self.extrair_com_gemini(caminho, logger, triagem.get('sha256'), triagem.get('paginas'))
+        logger.warning(f"PDF ignorado ({situacao}): {caminho} {triagem.get('erro', '')}".rstrip())
+        return None
     
     def process_item(self, item, spider):
-        """Processa PDFs baixados e extrai texto usando Gemini"""
+        """Processa PDFs baixados e extrai o texto (localmente ou com Gemini)"""
         files = item.get('files', [])
         
         if not files:
@@ -197,35 +456,29 @@ Organize o texto de forma clara e estruturada.
         
         extracted_texts = []
         files_dir = spider.settings.get('FILES_STORE', 'downloads')
-        
-        for file_path in files:
-            full_path = os.path.join(files_dir, file_path)
-            
-            if not os.path.exists(full_path):
+
+        # o FilesPipeline preenche 'files' com dicts (url, path, checksum...)
+        caminhos = [f['path'] if isinstance(f, dict) else f for f in files]
+        caminhos = [os.path.join(files_dir, c) for c in caminhos if c]
+        existentes = []
+        for full_path in caminhos:
+            if os.path.exists(full_path):
+                existentes.append(full_path)
+            else:
                 spider.logger.warning(f"Arquivo não encontrado: {full_path}")
-                continue
-            
+
+        # a triagem de todos os arquivos do item roda em paralelo no pool de processos
+        triagens = [(c, self.extrator.submeter(c)) for c in existentes]
+        for full_path, futuro in triagens:
             try:
-                # Upload do arquivo para o Gemini
-                spider.logger.info(f"Processando PDF: {file_path}")
-                uploaded_file = genai.upload_file(full_path)
-                
-                # Extrair texto usando o modelo
-                response = self.model.generate_content([
-                    self.extraction_prompt,
-                    uploaded_file
-                ])
-                
-                extracted_text = response.text
+                extracted_text = self.extrair_texto(full_path, futuro.result(), spider.logger)
+                if extracted_text is None:
+                    continue
                 extracted_texts.append(extracted_text)
-                
-                spider.logger.info(f"Texto extraído com sucesso de {file_path} ({len(extracted_text)} caracteres)")
-                
-                # Limpar arquivo do Gemini
-                genai.delete_file(uploaded_file.name)
+                spider.logger.info(f"Texto extraído com sucesso de {full_path} ({len(extracted_text)} caracteres)")
                 
             except Exception as e:
-                spider.logger.error(f"Erro ao processar {file_path}: {str(e)}")
+                spider.logger.error(f"Erro ao processar {full_path}: {str(e)}")
                 continue
         
         # Combinar todos os textos extraídos
@@ -251,7 +504,9 @@ class GeminiAssuntosPipeline:
 
         genai.configure(api_key=api_key)
         # Use o modelo mais estável disponível
-        self.model = genai.GenerativeModel("gemini-2.5-pro")
+        self.nome_modelo = "gemini-2.5-pro"
+        self.model = genai.GenerativeModel(self.nome_modelo)
+        self.cache = abrir_cache(get_project_settings())
 
         # Prompt mais rígido para forçar JSON puro
         self.prompt_assuntos = """
@@ -286,91 +541,233 @@ Exemplo de saída:
  "Administração pública"]
  """
 
+    # Prompt do modo em lote: vários documentos numa única chamada, resposta em JSON
+    prompt_lote = """
+Você é um assistente especializado em análise legislativa.
+
+Receberá vários projetos de lei em formato Markdown, cada um delimitado por <documento id="N"> e </documento>.
+Para cada documento, identifique os principais assuntos/temas tratados.
+
+Regras:
+- Liste de 3 a 8 assuntos principais por documento.
+- Cada assunto deve ser curto (1 a 5 palavras).
+- Apenas a primeira letra da primeira palavra é maiúscula.
+- Use substantivos claros, sem frases longas.
+- Analise cada documento isoladamente.
+
+Responda apenas com JSON no formato:
+{"documentos": [{"id": 0, "assuntos": ["Trânsito de caminhões", "Infraestrutura urbana", "Segurança viária"]}]}
+"""
+
+    def open_spider(self, spider):
+        settings = spider.settings
+        # pool próprio: as chamadas ao modelo (vários segundos cada) não podem parar o reactor
+        self.pool = ThreadPool(minthreads=0, maxthreads=settings.getint("GEMINI_ASSUNTOS_CONCURRENCY", 4))
+        self.pool.start()
+        self.stats = spider.crawler.stats
+        self.logger = spider.logger
+
+        # modo em lote: desligado com GEMINI_ASSUNTOS_LOTE_MAX_DOCUMENTOS = 1
+        self.lote_max_documentos = settings.getint("GEMINI_ASSUNTOS_LOTE_MAX_DOCUMENTOS", 1)
+        self.lote_max_tokens = settings.getint("GEMINI_ASSUNTOS_LOTE_MAX_TOKENS", 30000)
+        self.lote_espera_maxima = settings.getfloat("GEMINI_ASSUNTOS_LOTE_ESPERA_MAXIMA", 5.0)
+        self.lote = []
+        self.tokens_lote = 0
+        self.temporizador = None
+
+    def close_spider(self, spider):
+        def encerrar(_):
+            self.pool.stop()
+            if self.cache:
+                self.cache.fechar()
+
+        pendentes = self._enviar_lote()
+        return DeferredList(pendentes).addBoth(encerrar)
+
+    def _consultar_modelo(self, texto_md):
+        """Executado no pool de threads: apenas a chamada ao modelo."""
+        resposta = self.model.generate_content(f"{self.prompt_assuntos}\n\n{texto_md}")
+        return getattr(resposta, "text", None) or str(resposta)
+
+    def _parsear_assuntos(self, raw, spider):
+        # Parser para linhas simples (sem JSON)
+        lines = [ln.strip() for ln in raw.splitlines()]
+        # remove linhas vazias e lixo
+        linhas_validas = [
+            re.sub(r'^[\-\*\d\.\)\s]+', '', ln).strip(' "\'')
+            for ln in lines
+            if ln and not ln.lower().startswith("exemplo")
+        ]
+
+        # Normalização: primeira letra maiúscula, resto minúsculo; limita tamanho e quantidade
+        def norm(s):
+            s = re.sub(r'\s+', ' ', s).strip()
+            # apenas primeira letra da primeira palavra maiúscula
+            words = s.split()
+            if not words:
+                return ""
+            words[0] = words[0][:1].upper() + words[0][1:].lower()
+            for i in range(1, len(words)):
+                words[i] = words[i].lower()
+            s = " ".join(words)
+            # até 7 palavras por assunto
+            return " ".join(s.split()[:7])
+
+        assuntos = [norm(a) for a in linhas_validas if a]
+        # mantém entre 3 e 8 itens
+        if len(assuntos) < 3:
+            spider.logger.warning("[GeminiAssuntosPipeline] Poucos assuntos gerados; mantendo lista vazia.")
+            return []
+        return assuntos[:8]
+
     def process_item(self, item, spider):
         # Só roda para o spider do Rio
         if spider.name != "proposicoescidrj":
             return item
         
-        if "item_padronizado" in item:
-            texto_md = item.get("item_bruto", {}).get("conteudo_markdown", "")
-            if not texto_md:
-                item["item_padronizado"]["assuntos"] = []
-                return item
-
-            try:
-                resposta = self.model.generate_content(f"{self.prompt_assuntos}\n\n{texto_md}")
-                raw = getattr(resposta, "text", None) or str(resposta)
-
-                # Parser para linhas simples (sem JSON)
-                lines = [ln.strip() for ln in raw.splitlines()]
-                # remove linhas vazias e lixo
-                linhas_validas = [
-                    re.sub(r'^[\-\*\d\.\)\s]+', '', ln).strip(' "\'')
-                    for ln in lines
-                    if ln and not ln.lower().startswith("exemplo")
-                ]
-
-                # Normalização: primeira letra maiúscula, resto minúsculo; limita tamanho e quantidade
-                def norm(s):
-                    s = re.sub(r'\s+', ' ', s).strip()
-                    # apenas primeira letra da primeira palavra maiúscula
-                    words = s.split()
-                    if not words:
-                        return ""
-                    words[0] = words[0][:1].upper() + words[0][1:].lower()
-                    for i in range(1, len(words)):
-                        words[i] = words[i].lower()
-                    s = " ".join(words)
-                    # até 7 palavras por assunto
-                    return " ".join(s.split()[:7])
-
-                assuntos = [norm(a) for a in linhas_validas if a]
-                # mantém entre 3 e 8 itens
-                if len(assuntos) < 3:
-                    spider.logger.warning("[GeminiAssuntosPipeline] Poucos assuntos gerados; mantendo lista vazia.")
-                    assuntos = []
-                else:
-                    assuntos = assuntos[:8]
-
-                item["item_padronizado"]["assuntos"] = assuntos
+        if "item_padronizado" not in item:
+            return item
 
-            except Exception as e:
-                spider.logger.error(f"[GeminiAssuntosPipeline] Erro ao gerar/parsear assuntos: {e}", exc_info=True)
-                item["item_padronizado"]["assuntos"] = []
+        texto_md = item.get("item_bruto", {}).get("conteudo_markdown", "")
+        if not texto_md:
+            item["item_padronizado"]["assuntos"] = []
+            return item
 
-        return item
+        hash_texto = hashlib.sha256(texto_md.encode("utf-8")).hexdigest()
+        raw = self._assuntos_em_cache(hash_texto)
+        if raw is not None:
+            dfd = succeed(raw)
+        elif self.lote_max_documentos > 1 and self._estimar_tokens(texto_md) <= self.lote_max_tokens:
+            dfd = self._adicionar_ao_lote(hash_texto, texto_md)
+        else:
+            dfd = self._consultar_individual(hash_texto, texto_md)
 
+        def concluir(raw):
+            item["item_padronizado"]["assuntos"] = self._parsear_assuntos(raw, spider)
+            return item
 
+        def falhou(failure):
+            spider.logger.error(
+                f"[GeminiAssuntosPipeline] Erro ao gerar/parsear assuntos: {failure.value}",
+                exc_info=(failure.type, failure.value, failure.getTracebackObject())
+            )
+            item["item_padronizado"]["assuntos"] = []
+            return item
 
+        # parsing e escrita no item acontecem no reactor; o Scrapy segue processando outros itens
+        dfd.addCallback(concluir)
+        dfd.addErrback(falhou)
+        return dfd
 
-    def _formatar_data(self, data_texto):
-        if not data_texto:
+    def _assuntos_em_cache(self, hash_texto):
+        if not self.cache:
             return None
+        raw = self.cache.obter(hash_texto, self.prompt_assuntos, self.nome_modelo)
+        if raw is None:
+            raw = self.cache.obter(hash_texto, self.prompt_lote, self.nome_modelo)
+        return raw
+
+    def _consultar_individual(self, hash_texto, texto_md):
+        from twisted.internet import reactor
+        self.stats.inc_value("gemini_assuntos/chamadas_individuais")
+        dfd = deferToThreadPool(reactor, self.pool, self._consultar_modelo, texto_md)
+        if self.cache:
+            dfd.addCallback(self._guardar_no_cache, hash_texto, self.prompt_assuntos)
+        return dfd
+
+    def _guardar_no_cache(self, raw, hash_texto, prompt):
+        self.cache.guardar(hash_texto, prompt, self.nome_modelo, raw)
+        return raw
+
+    @staticmethod
+    def _estimar_tokens(texto):
+        # aproximação suficiente para limitar o tamanho do lote (~4 caracteres por token)
+        return len(texto) // 4 + 1
+
+    def _adicionar_ao_lote(self, hash_texto, texto_md):
+        """Acumula o documento no lote atual; o lote é enviado ao encher ou após a espera máxima."""
+        tokens = self._estimar_tokens(texto_md)
+        if self.lote and self.tokens_lote + tokens > self.lote_max_tokens:
+            self._enviar_lote()
+
+        dfd = Deferred()
+        self.lote.append((hash_texto, texto_md, dfd))
+        self.tokens_lote += tokens
+        if len(self.lote) >= self.lote_max_documentos:
+            self._enviar_lote()
+        elif self.temporizador is None:
+            from twisted.internet import reactor
+            self.temporizador = reactor.callLater(self.lote_espera_maxima, self._enviar_lote)
+        return dfd
+
+    def _enviar_lote(self):
+        """Envia o lote pendente numa única chamada e devolve os Deferreds dos seus itens."""
+        if self.temporizador is not None and self.temporizador.active():
+            self.temporizador.cancel()
+        self.temporizador = None
+        lote, self.lote, self.tokens_lote = self.lote, [], 0
+        if not lote:
+            return []
+
+        if len(lote) == 1:
+            hash_texto, texto_md, dfd = lote[0]
+            self._consultar_individual(hash_texto, texto_md).chainDeferred(dfd)
+            return [dfd]
+
+        from twisted.internet import reactor
+        self.stats.inc_value("gemini_assuntos/lotes")
+        self.stats.inc_value("gemini_assuntos/documentos_em_lote", len(lote))
+        consulta = deferToThreadPool(reactor, self.pool, self._consultar_lote, [texto for _, texto, _ in lote])
+        consulta.addCallbacks(
+            self._distribuir_lote, self._lote_falhou,
+            callbackArgs=(lote,), errbackArgs=(lote,)
+        )
+        return [dfd for _, _, dfd in lote]
+
+    def _consultar_lote(self, textos):
+        """Executado no pool de threads: uma chamada estruturada (JSON) para todos os documentos do lote."""
+        documentos = "\n\n".join(
+            f'<documento id="{indice}">\n{texto}\n</documento>' for indice, texto in enumerate(textos)
+        )
+        resposta = self.model.generate_content(
+            f"{self.prompt_lote}\n\n{documentos}",
+            generation_config={"response_mime_type": "application/json"}
+        )
+        return resposta.text
+
+    def _distribuir_lote(self, raw, lote):
         try:
-            return datetime.strptime(data_texto.strip(), '%d/%m/%Y %H:%M:%S').strftime('%Y-%m-%d')
-        except ValueError:
-            pass
-        try:
-            return datetime.strptime(data_texto.strip(), '%d/%m/%Y %H:%M').strftime('%Y-%m-%d')
-        except ValueError:
-            pass
-        try:
-            return datetime.strptime(data_texto.strip(), '%d/%m/%Y').strftime('%Y-%m-%d')
-        except ValueError:
-            pass
-        match = re.search(r'(\d{1,2})\s+de\s+(\w+)\s+de\s+(\d{4})', data_texto or "", re.IGNORECASE)
-        if match:
-            dia, mes_nome, ano = match.groups()
-            meses = {
-                'janeiro': '01', 'fevereiro': '02', 'março': '03', 'abril': '04',
-                'maio': '05', 'junho': '06', 'julho': '07', 'agosto': '08',
-                'setembro': '09', 'outubro': '10', 'novembro': '11', 'dezembro': '12'
+            dados = json.loads(raw)
+            por_documento = {
+                int(doc["id"]): doc.get("assuntos") for doc in dados.get("documentos", [])
+                if isinstance(doc, dict) and "id" in doc
             }
-            mes = meses.get(mes_nome.lower())
-            if mes:
-                return f"{ano}-{mes}-{int(dia):02d}"
-        return data_texto
-        
+        except (ValueError, TypeError, AttributeError) as e:
+            self.logger.warning(f"[GeminiAssuntosPipeline] Resposta do lote inválida ({e}); consultando um a um.")
+            por_documento = {}
+
+        for indice, (hash_texto, texto_md, dfd) in enumerate(lote):
+            assuntos = por_documento.get(indice)
+            if isinstance(assuntos, list) and len([a for a in assuntos if isinstance(a, str) and a.strip()]) >= 3:
+                # grava no mesmo formato da resposta individual (um assunto por linha)
+                raw_documento = "\n".join(a for a in assuntos if isinstance(a, str))
+                if self.cache:
+                    self._guardar_no_cache(raw_documento, hash_texto, self.prompt_lote)
+                dfd.callback(raw_documento)
+            else:
+                # documento ausente ou incompleto na resposta do lote
+                self.stats.inc_value("gemini_assuntos/fallback_individual")
+                self._consultar_individual(hash_texto, texto_md).chainDeferred(dfd)
+
+    def _lote_falhou(self, failure, lote):
+        self.logger.warning(
+            f"[GeminiAssuntosPipeline] Falha no lote de {len(lote)} documentos ({failure.value}); consultando um a um."
+        )
+        self.stats.inc_value("gemini_assuntos/fallback_individual", len(lote))
+        for hash_texto, texto_md, dfd in lote:
+            self._consultar_individual(hash_texto, texto_md).chainDeferred(dfd)
+
+
 class SalvarMarkdownPipeline:
     """Salva o conteúdo em Markdown dentro de FILES_STORE/md/..."""
 
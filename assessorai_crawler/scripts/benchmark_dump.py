@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import random
+import argparse
+import logging
+import tempfile
+
+from scrapy.exceptions import DropItem
+from scrapy.utils.project import get_project_settings
+from assessorai_crawler.padronizacao import contexto_spider, padronizar_item
+from assessorai_crawler.pipelines import ValidationPipeline
+from assessorai_crawler.scripts.processar_dump import criar_spider, processar_dump
+from assessorai_crawler.utils import iterar_json_array
+
+PARAGRAFO = (
+    "Art. {n}º Fica instituído, no âmbito do Estado, o programa de incentivo à mobilidade urbana "
+    "sustentável, com o objetivo de ampliar o uso do transporte coletivo e das ciclovias.\x0c\n"
+)
+TIPOS = ["PL", "PLC", "PEC", "IND", "MOC"]
+
+
+def gerar_dump(pasta, uf, quantidade, paragrafos, semente=42):
+    """Gera os dois arquivos de um dump do Legislapi (texto integral e metadados), com caracteres de controle."""
+    rnd = random.Random(semente)
+    os.makedirs(os.path.join(pasta, uf), exist_ok=True)
+    caminho_texto = os.path.join(pasta, uf, f"ProjetoInteiroTeor{uf.upper()}.json")
+    caminho_metadados = os.path.join(pasta, uf, f"Proposicoes{uf.upper()}.json")
+    with open(caminho_texto, "w", encoding="utf-8") as texto, \
+            open(caminho_metadados, "w", encoding="utf-8") as metadados:
+        texto.write("[")
+        metadados.write("[")
+        for i in range(quantidade):
+            titulo = f"{TIPOS[i % len(TIPOS)]} {i // len(TIPOS) + 1}/{rnd.randint(2000, 2025)}"
+            separador = "," if i else ""
+            corpo = "".join(PARAGRAFO.format(n=n + 1) for n in range(rnd.randint(1, paragrafos * 2)))
+            # os dumps reais trazem caracteres de controle crus dentro das strings
+            # IdProposicaoOrigem começa em 1: sem id o build_url não monta a url_bruto e o item é descartado
+            texto.write(separador + json.dumps({"Titulo": titulo, "IdProposicaoOrigem": i + 1, "Texto": corpo},
+                                               ensure_ascii=False).replace("\\f", "\x0c"))
+            metadados.write(separador + json.dumps({
+                "Titulo": titulo,
+                "Autoria": "Deputado Fulano (PT), Deputada Beltrana (PSOL)",
+                "Ementa": "Dispõe sobre o programa estadual de mobilidade urbana sustentável.",
+                "DataApresentacao": f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/{rnd.randint(2000, 2025)}",
+            }, ensure_ascii=False))
+        texto.write("]")
+        metadados.write("]")
+    return caminho_texto
+
+
+def medir_serial(spider_nome, settings, pasta):
+    """Referência: o caminho do spider (leitura em fluxo + build_item + padronização) num único processo."""
+    spider = criar_spider(spider_nome, settings, atualizacao_completa=True, folder=pasta)
+    spider.metadata = spider.load_metadata()
+    contexto = contexto_spider(spider)
+    validacao = ValidationPipeline()
+    inicio = time.perf_counter()
+    quantidade = 0
+    try:
+        for entry in iterar_json_array(spider.get_text_file()):
+            _, _, meta = spider.preparar_entrada(entry)
+            quantidade += 1
+            try:
+                item = validacao.process_item(padronizar_item(spider.build_item(entry, meta), contexto), None)
+            except DropItem:
+                continue
+            json.dumps(dict(item["item_padronizado"]), ensure_ascii=False)
+    finally:
+        spider.metadata.fechar()
+    return quantidade, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark do processamento paralelo dos dumps locais (scripts/processar_dump.py), de 1 a N processos."
+    )
+    parser.add_argument("--proposicoes", type=int, default=50000, help="Proposições no dump sintético")
+    parser.add_argument("--paragrafos", type=int, default=20, help="Média de parágrafos do texto de cada proposição")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Máximo de processos")
+    parser.add_argument("--tamanho-fatia", type=int, default=8, help="MB por tarefa enviada aos processos")
+    parser.add_argument("--spider", default="proposicoessp", help="Spider do Legislapi usado no benchmark")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+
+    with tempfile.TemporaryDirectory(prefix="benchmark_dump_") as diretorio:
+        settings = get_project_settings()
+        settings.set("LEGISLAPI_INDICE_DIR", os.path.join(diretorio, "indices"))
+        pasta = os.path.join(diretorio, "datasets")
+        uf = criar_spider(args.spider, settings).uf
+        caminho_texto = gerar_dump(pasta, uf, args.proposicoes, args.paragrafos, args.semente)
+        print(f"Dump sintético: {args.proposicoes} proposições, {os.path.getsize(caminho_texto) / 2**20:.0f} MB de texto")
+
+        quantidade, duracao = medir_serial(args.spider, settings, pasta)
+        base = quantidade / duracao
+        print(f"{'serial':<12} {quantidade} itens em {duracao:.2f}s -> {base:,.0f} itens/s")
+
+        workers = 1
+        while True:
+            contagem = processar_dump(
+                args.spider, settings, workers, saida=os.path.join(diretorio, "saida"),
+                tamanho_fatia=args.tamanho_fatia * 1024 * 1024, atualizacao_completa=True, folder=pasta
+            )
+            taxa = contagem["elementos"] / contagem["duracao"]
+            print(
+                f"{f'{workers} processo(s)':<12} {contagem['gravados']} itens em {contagem['duracao']:.2f}s "
+                f"(varredura {contagem['duracao_varredura']:.2f}s) -> {taxa:,.0f} itens/s ({taxa / base:.1f}x)"
+            )
+            if workers >= args.workers:
+                break
+            workers = min(workers * 2, args.workers)
+
+
+if __name__ == "__main__":
+    main()
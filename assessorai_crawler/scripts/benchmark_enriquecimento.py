@@ -0,0 +1,204 @@
+import os
+
+# o benchmark roda contra o Gemini falso: sem rede e sem gastar cota
+os.environ.setdefault("GEMINI_FALSO", "1")
+os.environ.setdefault("GEMINI_API_KEY", "falso")
+
+import time
+import random
+import asyncio
+import argparse
+import logging
+import tempfile
+from types import SimpleNamespace
+
+import fitz  # PyMuPDF
+from scrapy.settings import Settings
+
+from assessorai_crawler import gemini_falso
+from assessorai_crawler.cache_gemini import CacheGemini
+from assessorai_crawler.controle_extracao import ControleExtracao
+from assessorai_crawler.pipelines import GeminiAssuntosPipeline, GeminiPDFExtractionPipeline
+from assessorai_crawler.scripts.extrair_textos_gemini import Extracao
+
+PARAGRAFO = (
+    "Art. {n}º Fica instituído, no âmbito do Município, o programa de incentivo à mobilidade urbana "
+    "sustentável, com o objetivo de ampliar o uso do transporte coletivo e das ciclovias. "
+)
+
+
+class Estatisticas(dict):
+    def inc_value(self, chave, valor=1):
+        self[chave] = self.get(chave, 0) + valor
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def relatorio(etapa, latencias, duracao):
+    estatisticas = gemini_falso.estatisticas()
+    print(
+        f"{etapa}: {len(latencias)} docs em {duracao:.1f}s = {len(latencias) / duracao:.2f} docs/s | "
+        f"latência p50 {percentil(latencias, 50):.2f}s, p95 {percentil(latencias, 95):.2f}s | "
+        f"chamadas ao modelo {estatisticas['chamadas']}, uploads {estatisticas['uploads']}, "
+        f"429 {estatisticas['erros_429']}, 500 {estatisticas['erros_500']}, "
+        f"máximo em andamento {estatisticas['max_em_andamento']}"
+    )
+
+
+def gerar_pdfs(diretorio, quantidade, paginas, proporcao_escaneados):
+    """PDFs sintéticos: digitais (com texto) ou escaneados (só imagem), para exercitar a triagem."""
+    caminhos = []
+    imagem = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 200, 280), False)
+    imagem.clear_with(230)
+    for indice in range(quantidade):
+        escaneado = random.random() < proporcao_escaneados
+        with fitz.open() as documento:
+            for pagina_numero in range(paginas):
+                pagina = documento.new_page()
+                if escaneado:
+                    pagina.insert_image(pagina.rect, pixmap=imagem)
+                else:
+                    texto = "".join(PARAGRAFO.format(n=pagina_numero * 10 + n) for n in range(1, 8))
+                    pagina.insert_textbox(fitz.Rect(56, 56, 540, 780), texto, fontsize=10)
+            caminho = os.path.join(diretorio, f"documento-{indice}.pdf")
+            documento.save(caminho)
+        caminhos.append(caminho)
+    return caminhos
+
+
+def benchmark_extracao(args, diretorio):
+    pdfs = gerar_pdfs(diretorio, args.documentos, args.paginas, args.proporcao_escaneados)
+    pipeline = GeminiPDFExtractionPipeline(workers_extracao=args.workers)
+    pipeline.cache = abrir_cache_temporario(args, diretorio)
+    controle = ControleExtracao(os.path.join(diretorio, "controle.sqlite3"))
+    extracao = Extracao(pipeline, controle, args.concurrency, args.rpm, sem_extracao_local=False)
+
+    latencias = []
+    processar = extracao.processar
+
+    async def processar_medindo(*tarefa):
+        inicio = time.perf_counter()
+        await processar(*tarefa)
+        latencias.append(time.perf_counter() - inicio)
+
+    extracao.processar = processar_medindo
+    itens = []
+    for indice, caminho in enumerate(pdfs):
+        estado = os.stat(caminho)
+        md_path = os.path.join(diretorio, "md", f"documento-{indice}.md")
+        itens.append((f"PL {indice}", caminho, caminho, md_path, estado.st_size, estado.st_mtime))
+
+    gemini_falso.reiniciar_estatisticas()
+    inicio = time.perf_counter()
+    try:
+        asyncio.run(extracao.executar(iter(itens)))
+    finally:
+        pipeline.fechar()
+        controle.fechar()
+    relatorio("extração", latencias, time.perf_counter() - inicio)
+    print(f"  triagem: {extracao.contagem}")
+
+
+def abrir_cache_temporario(args, diretorio):
+    """Com --cache, um cache do Gemini descartável no diretório do benchmark (nunca o GEMINI_CACHE_PATH real)."""
+    if not args.cache:
+        return None
+    return CacheGemini(os.path.join(diretorio, "cache_gemini.sqlite3"))
+
+
+def benchmark_assuntos(args, diretorio):
+    from twisted.internet import defer, reactor
+
+    settings = Settings({
+        "GEMINI_ASSUNTOS_CONCURRENCY": args.assuntos_concorrencia,
+        "GEMINI_ASSUNTOS_LOTE_MAX_DOCUMENTOS": args.lote,
+        "GEMINI_ASSUNTOS_LOTE_ESPERA_MAXIMA": 0.5,
+    })
+    spider = SimpleNamespace(
+        name="proposicoescidrj", settings=settings, logger=logging.getLogger("benchmark"),
+        crawler=SimpleNamespace(stats=Estatisticas())
+    )
+    pipeline = GeminiAssuntosPipeline()
+    pipeline.cache = abrir_cache_temporario(args, diretorio)
+
+    itens = [
+        {
+            "item_bruto": {"conteudo_markdown": "".join(PARAGRAFO.format(n=n) for n in range(random.randint(2, 30)))
+                           + f"\n\nProposição {indice}"},
+            "item_padronizado": {},
+        }
+        for indice in range(args.documentos)
+    ]
+    latencias = []
+    # o Scrapy processa até CONCURRENT_ITEMS itens ao mesmo tempo nas pipelines
+    semaforo = defer.DeferredSemaphore(args.itens_simultaneos)
+
+    def processar(item):
+        inicio = time.perf_counter()
+        dfd = defer.maybeDeferred(pipeline.process_item, item, spider)
+        dfd.addCallback(lambda _: latencias.append(time.perf_counter() - inicio))
+        return dfd
+
+    @defer.inlineCallbacks
+    def executar():
+        try:
+            pipeline.open_spider(spider)
+            gemini_falso.reiniciar_estatisticas()
+            inicio = time.perf_counter()
+            yield defer.DeferredList([semaforo.run(processar, item) for item in itens])
+            yield pipeline.close_spider(spider)
+            relatorio("assuntos", latencias, time.perf_counter() - inicio)
+            print(f"  {dict(spider.crawler.stats)}")
+        finally:
+            reactor.stop()
+
+    reactor.callWhenRunning(executar)
+    reactor.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark das etapas de enriquecimento (extração de texto e assuntos) contra o Gemini falso."
+    )
+    parser.add_argument("--etapa", choices=["extracao", "assuntos", "todas"], default="todas")
+    parser.add_argument("--documentos", type=int, default=200, help="Documentos sintéticos por etapa")
+    parser.add_argument("--paginas", type=int, default=3, help="Páginas por PDF")
+    parser.add_argument("--proporcao-escaneados", type=float, default=0.3, help="Fração de PDFs só com imagem")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processos da extração local")
+    parser.add_argument("--concurrency", type=int, default=8, help="Documentos simultâneos na extração")
+    parser.add_argument("--rpm", type=float, default=0, help="Limite de chamadas por minuto (0 = sem limite)")
+    parser.add_argument("--assuntos-concorrencia", type=int, default=4, help="GEMINI_ASSUNTOS_CONCURRENCY")
+    parser.add_argument("--lote", type=int, default=1, help="GEMINI_ASSUNTOS_LOTE_MAX_DOCUMENTOS")
+    parser.add_argument("--itens-simultaneos", type=int, default=100, help="Equivale a CONCURRENT_ITEMS")
+    parser.add_argument("--cache", action="store_true", help="Usa um cache do Gemini temporário (o GEMINI_CACHE_PATH real não é tocado)")
+    parser.add_argument("--latencia", type=float, help="Mediana da latência do Gemini falso, em segundos")
+    parser.add_argument("--taxa-429", type=float, help="Fração de respostas 429")
+    parser.add_argument("--taxa-erro", type=float, help="Fração de respostas 500")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    if not os.getenv("GEMINI_FALSO"):
+        raise SystemExit("O benchmark precisa do Gemini falso (GEMINI_FALSO=1).")
+    for opcao, variavel in (("latencia", "GEMINI_FALSO_LATENCIA"), ("taxa_429", "GEMINI_FALSO_TAXA_429"),
+                            ("taxa_erro", "GEMINI_FALSO_TAXA_ERRO")):
+        if getattr(args, opcao) is not None:
+            os.environ[variavel] = str(getattr(args, opcao))
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+    random.seed(args.semente)
+
+    if args.etapa in ("extracao", "todas"):
+        with tempfile.TemporaryDirectory(prefix="benchmark_enriquecimento_") as diretorio:
+            benchmark_extracao(args, diretorio)
+    if args.etapa in ("assuntos", "todas"):
+        with tempfile.TemporaryDirectory(prefix="benchmark_enriquecimento_") as diretorio:
+            benchmark_assuntos(args, diretorio)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import re
+import time
+import random
+import argparse
+from bs4 import BeautifulSoup
+from parsel import Selector
+
+from assessorai_crawler.html_markdown import html_para_markdown
+
+
+def markdown_legado(html):
+    """Cópia da implementação anterior (ProposicoesCIDRJSpider._limpar_html_para_markdown), usada como referência."""
+    soup = BeautifulSoup(html, "html.parser")
+    div_conteudo = soup.find("div", id="xSec2")
+    if not div_conteudo:
+        return "Conteúdo não encontrado."
+
+    for br in div_conteudo.find_all("br"):
+        br.replace_with("\n")
+
+    for tag in div_conteudo.find_all(["b", "strong"]):
+        content = tag.get_text(strip=True)
+        if content:
+            tag.replace_with(f"**{content}**")
+
+    for tag in div_conteudo.find_all("u"):
+        content = tag.get_text(strip=True)
+        if content:
+            tag.replace_with(f"**{content}**")
+
+    for h_tag, prefix in [("h1", "# "), ("h2", "## "), ("h3", "### ")]:
+        for tag in div_conteudo.find_all(h_tag):
+            content = tag.get_text(strip=True)
+            if content:
+                tag.replace_with(f"{prefix}{content}\n")
+
+    for li in div_conteudo.find_all("li"):
+        content = li.get_text(" ", strip=True)
+        if content:
+            li.replace_with(f"- {content}\n")
+
+    for a in div_conteudo.find_all("a"):
+        text = a.get_text(strip=True)
+        href = a.get("href")
+        if href and not href.lower().startswith("javascript:"):
+            a.replace_with(f"[{text}]({href})")
+        else:
+            a.replace_with(text)
+
+    for tag in div_conteudo.find_all(["script", "style"]):
+        tag.decompose()
+
+    texto = div_conteudo.get_text(separator="\n", strip=True)
+    texto = re.sub(r"[ \t]+", " ", texto)
+    texto = re.sub(r"\n{3,}", "\n\n", texto)
+    texto = re.sub(r"\s+\n", "\n", texto)
+    texto = re.sub(r"\n\s+", "\n", texto)
+    return texto.strip()
+
+
+def markdown_novo(html):
+    div = Selector(text=html).css("div#xSec2")
+    return html_para_markdown(div) if div else "Conteúdo não encontrado."
+
+
+def gerar_pagina(artigos):
+    """Página no formato das páginas de detalhe da CMRJ (Lotus Notes), com o texto do projeto em div#xSec2."""
+    partes = ['<html><head><script>var x = 1;</script></head><body><table><tr><td>cabeçalho</td></tr></table>',
+              '<div id="xSec2"><font face="Arial"><b><u>PROJETO DE LEI</u></b><br><br>']
+    for n in range(1, artigos + 1):
+        partes.append(
+            f'<font size="2"><b>Art. {n}º</b> Fica instituído o <u>programa municipal</u> de incentivo, '
+            f'conforme a <a href="/lei/{n}">Lei nº {random.randint(1000, 9999)}</a>.</font><br>'
+        )
+        if n % 5 == 0:
+            partes.append("<ul>" + "".join(f"<li>inciso {i} do artigo</li>" for i in range(1, 4)) + "</ul>")
+    partes.append('<h3>JUSTIFICATIVA</h3><p>' + "Texto da justificativa. " * 40 + '</p></font></div></body></html>')
+    return "".join(partes)
+
+
+def medir(nome, funcao, paginas):
+    inicio = time.process_time()
+    for pagina in paginas:
+        funcao(pagina)
+    duracao = time.process_time() - inicio
+    print(f"{nome}: {duracao / len(paginas) * 1000:.2f} ms de CPU por página")
+    return duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark da conversão HTML → Markdown (bs4 x lxml).")
+    parser.add_argument("arquivos", nargs="*", help="Páginas HTML salvas (padrão: páginas sintéticas)")
+    parser.add_argument("--paginas", type=int, default=500, help="Quantidade de páginas sintéticas")
+    parser.add_argument("--artigos", type=int, default=40, help="Artigos por página sintética")
+    args = parser.parse_args()
+
+    if args.arquivos:
+        paginas = []
+        for caminho in args.arquivos:
+            with open(caminho, "rb") as f:
+                paginas.append(f.read().decode("utf-8", errors="replace"))
+    else:
+        random.seed(42)
+        paginas = [gerar_pagina(args.artigos) for _ in range(args.paginas)]
+
+    print("Exemplo (novo):\n" + markdown_novo(paginas[0])[:400] + "\n")
+    antes = medir("antes (BeautifulSoup, várias passadas)", markdown_legado, paginas)
+    depois = medir("depois (lxml, passada única)", markdown_novo, paginas)
+    print(f"Ganho: {antes / depois:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
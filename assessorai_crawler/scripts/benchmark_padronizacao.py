@@ -0,0 +1,164 @@
+import argparse
+import random
+import re
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from unidecode import unidecode
+
+from assessorai_crawler.padronizacao import contexto_spider, padronizar_item
+
+
+class PadronizacaoLegada:
+    """Cópia da implementação anterior de PipelinePadronizacao, usada apenas como referência."""
+
+    def _slugify(self, text):
+        if not text: return ""
+        text = unidecode(str(text))
+        text = text.lower()
+        text = re.sub(r'[\s\W_]+', '-', text)
+        return text.strip('-')
+
+    def process_item(self, item, spider):
+        autores_final = []
+        for autor_raw in item.get('autores_bruto', []):
+            nome, partido = self._extrair_nome_partido(autor_raw)
+            autores_final.append({"nome": nome, "partido": partido})
+
+        data_formatada = self._formatar_data(item.get('data_documento_bruto'))
+        numero = item.get("numero_bruto")
+        ano = item.get("ano_bruto")
+        tipo = item.get("tipo_bruto", "projeto-de-lei").lower().replace(" ", "-")
+        nome_arquivo = f"{tipo}-{numero}-{ano}" if numero and ano else "arquivo-sem-nome"
+
+        uf_slug = self._slugify(spider.uf)
+        municipio_slug = self._slugify(spider.municipio)
+        caminho_base = f"{uf_slug}/{municipio_slug}/{spider.slug}/{nome_arquivo}"
+        tem_pdf = bool(item.get("url_documento_original")) or bool(item.get("file_urls"))
+        caminho_pdf = (
+            item.get("caminho_arquivo_original")
+            if item.get("caminho_arquivo_original") and tem_pdf
+            else (f"{caminho_base}.pdf" if tem_pdf else None)
+        )
+        caminho_md = item.get("caminho_arquivo_texto") or f"{caminho_base}.md"
+
+        item_padronizado = {
+            "localidade": {"esfera": spider.esfera, "municipio": spider.municipio, "estado": spider.uf},
+            "casa_legislativa": spider.casa_legislativa,
+            "tipo_documento": item.get('tipo_bruto'),
+            "numero_documento": str(item.get('numero_bruto')),
+            "data_documento": data_formatada,
+            "autores": autores_final,
+            "ementa": item.get('ementa_bruto'),
+            "assuntos": item.get('assuntos_bruto', []),
+            "status_tramitacao": [
+                {"descricao": s.get("descricao"), "data": self._formatar_data(s.get("data"))}
+                for s in item.get('status_bruto', [])
+            ],
+            "url_documento_original": item.get("url_documento_original"),
+            "caminho_arquivo_original": caminho_pdf,
+            "caminho_arquivo_texto": caminho_md,
+            "data_raspagem": item.get('data_raspagem_bruto')
+        }
+        return {'item_bruto': item, 'item_padronizado': item_padronizado}
+
+    def _extrair_nome_partido(self, texto_autor):
+        match = re.search(r'\((.*?)\)', texto_autor)
+        if match:
+            partido = match.group(1).strip().upper()
+            nome = re.sub(r'^\s*Ver\.\s*', '', texto_autor).replace(f"({match.group(1)})", "").strip()
+            return nome, partido
+        return texto_autor.strip(), None
+
+    def _formatar_data(self, data_texto):
+        if not data_texto:
+            return None
+        formatos = ['%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y', '%Y-%m-%d', '%m/%d/%Y']
+        for fmt in formatos:
+            try:
+                return datetime.strptime(data_texto.strip(), fmt).strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+        match = re.search(r'(\d{1,2})\s+de\s+(\w+)\s+de\s+(\d{4})', data_texto, re.IGNORECASE)
+        if match:
+            dia, mes_nome, ano = match.groups()
+            meses = {
+                'janeiro': '01', 'fevereiro': '02', 'março': '03', 'abril': '04',
+                'maio': '05', 'junho': '06', 'julho': '07', 'agosto': '08',
+                'setembro': '09', 'outubro': '10', 'novembro': '11', 'dezembro': '12'
+            }
+            mes = meses.get(mes_nome.lower())
+            if mes:
+                return f"{ano}-{mes}-{int(dia):02d}"
+        return data_texto
+
+
+def gerar_itens(quantidade, semente=42):
+    """Gera itens brutos sintéticos com a mistura de formatos de data vista nos spiders."""
+    rnd = random.Random(semente)
+    autores = ["Ver. Fulano de Tal (pt)", "Beltrana Silva (PSOL)", "Comissão de Finanças", "Ver. Ciclano (MDB)"]
+    meses = ["janeiro", "março", "junho", "outubro", "dezembro"]
+    itens = []
+    for i in range(quantidade):
+        dia, mes, ano = rnd.randint(1, 28), rnd.randint(1, 12), rnd.randint(2015, 2025)
+        formato = i % 4
+        if formato == 0:
+            data = f"{dia:02d}/{mes:02d}/{ano} 10:{dia:02d}:00"
+        elif formato == 1:
+            data = f"{dia:02d}/{mes:02d}/{ano}"
+        elif formato == 2:
+            data = f"{ano}-{mes:02d}-{dia:02d}"
+        else:
+            data = f"{dia} de {rnd.choice(meses)} de {ano}"
+        itens.append({
+            "tipo_bruto": "Projeto de Lei",
+            "numero_bruto": str(rnd.randint(1, 999)),
+            "ano_bruto": str(ano),
+            "autores_bruto": rnd.sample(autores, 2),
+            "ementa_bruto": "Dispõe sobre a criação do programa municipal.",
+            "data_documento_bruto": data,
+            "status_bruto": [{"descricao": "Aprovado", "data": f"{dia:02d}/{mes:02d}/{ano}"}],
+            "file_urls": ["https://exemplo.leg.br/arquivo.pdf"],
+            "data_raspagem_bruto": datetime.now().isoformat(),
+        })
+    return itens
+
+
+def medir(nome, funcao, itens):
+    inicio = time.perf_counter()
+    for item in itens:
+        funcao(item)
+    duracao = time.perf_counter() - inicio
+    taxa = len(itens) / duracao if duracao else float('inf')
+    print(f"{nome:<10} {len(itens)} itens em {duracao:.3f}s -> {taxa:,.0f} itens/s")
+    return taxa
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark da padronização de itens (antes x depois).")
+    parser.add_argument("--itens", type=int, default=200000, help="Quantidade de itens sintéticos")
+    args = parser.parse_args()
+
+    spider = SimpleNamespace(
+        slug="proposicoesbenchmark", uf="SP", municipio="São José dos Campos",
+        esfera="MUNICIPAL", casa_legislativa="Câmara Municipal de Benchmark"
+    )
+    itens = gerar_itens(args.itens)
+
+    legada = PadronizacaoLegada()
+    contexto = contexto_spider(spider)
+
+    # confere se as duas implementações produzem o mesmo resultado
+    for item in itens[:1000]:
+        antes = legada.process_item(item, spider)['item_padronizado']
+        depois = padronizar_item(item, contexto)['item_padronizado']
+        if antes != depois:
+            raise SystemExit(f"Resultados divergentes:\n{antes}\n{depois}")
+
+    taxa_antes = medir("antes", lambda item: legada.process_item(item, spider), itens)
+    taxa_depois = medir("depois", lambda item: padronizar_item(item, contexto), itens)
+    print(f"Ganho: {taxa_depois / taxa_antes:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,82 +1,277 @@
 import os
 import json
+import hashlib
+import time
+import tempfile
+import asyncio
 import argparse
 import logging
+from scrapy.utils.project import get_project_settings
+from assessorai_crawler.armazenamento import sha256_arquivo
 from assessorai_crawler.pipelines import GeminiPDFExtractionPipeline
-import google.generativeai as genai
+from assessorai_crawler.controle_extracao import CONCLUIDO, FALHOU, IGNORADO, ControleExtracao
+from assessorai_crawler.extracao_local import DIGITAL, ESCANEADO, dividir_pdf
+from assessorai_crawler.gemini import LimitadorTaxa, chamar_com_retentativas, espera_com_jitter, genai
 
 from dotenv import load_dotenv
 load_dotenv()
 
-def main():
-    parser = argparse.ArgumentParser(description="Extrai texto de PDFs usando Gemini e salva como Markdown.")
-    parser.add_argument("--jl", required=True, help="Caminho para o arquivo .jl com os itens padronizados")
-    parser.add_argument("--limite", type=int, default=None, help="Limite máximo de arquivos a processar")
-    parser.add_argument("--log", help="Caminho para o arquivo de log")
-    args = parser.parse_args()
 
-    logging.basicConfig(
-        filename=args.log,
-        level=logging.INFO,
-        format="%(levelname)s: %(message)s"
-    )
+class Extracao:
+    """Processa os PDFs pendentes com várias tarefas simultâneas e limite de requisições por minuto ao Gemini."""
 
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    pipeline = GeminiPDFExtractionPipeline()
+    def __init__(self, pipeline, controle, concorrencia, rpm, sem_extracao_local, max_tentativas=3):
+        self.pipeline = pipeline
+        self.controle = controle
+        self.max_tentativas = max_tentativas
+        self.concorrencia = concorrencia
+        self.limitador = LimitadorTaxa(rpm) if rpm else None
+        self.sem_extracao_local = sem_extracao_local
+        self.documentos = 0
+        self.paginas = 0
+        self.contagem = {}
+
+    def pendentes(self, caminho_jl):
+        """
+        Percorre o .jl sob demanda e devolve os itens a processar. O que já foi concluído, ignorado
+        ou falhou muitas vezes é pulado pelo controle, sem verificar o Markdown em disco.
+        """
+        with open(caminho_jl, "r", encoding="utf-8") as f:
+            for linha in f:
+                item = json.loads(linha)
+                tipo = item.get("tipo_documento")
+                numero = item.get("numero_documento")
+                rotulo = f"{tipo} {numero}"
 
-    with open(args.jl, "r", encoding="utf-8") as f:
-        itens = [json.loads(linha) for linha in f]
+                caminho_pdf = item.get("caminho_arquivo_original")
+                caminho_md = item.get("caminho_arquivo_texto")
 
-    processados = 0
-    for item in itens:
-        if args.limite and processados >= args.limite:
-            break
+                if not caminho_pdf:
+                    logging.warning(f"[{rotulo}] Item sem 'caminho_arquivo_original'.")
+                    continue
 
-        tipo = item.get("tipo_documento")
-        numero = item.get("numero_documento")
+                if not caminho_md:
+                    logging.warning(f"[{rotulo}] Item sem 'caminho_arquivo_texto'.")
+                    continue
 
-        caminho_pdf = item.get("caminho_arquivo_original")
-        caminho_md = item.get("caminho_arquivo_texto")
+                pdf_path = os.path.normpath(os.path.join("storage", "downloads", "pdf", caminho_pdf))
+                md_path = os.path.normpath(os.path.join("storage", "downloads", "md", caminho_md))
 
-        if not caminho_pdf:
-            logging.warning(f"[{tipo} {numero}] Item sem 'caminho_arquivo_original'.")
-            continue
+                try:
+                    estado = os.stat(pdf_path)
+                except FileNotFoundError:
+                    logging.warning(f"[{rotulo}] PDF não encontrado: {pdf_path}.")
+                    continue
 
-        if not caminho_md:
-            logging.warning(f"[{tipo} {numero}] Item sem 'caminho_arquivo_texto'.")
-            continue
+                registro = self.controle.obter(caminho_pdf, estado.st_size, estado.st_mtime)
+                if registro:
+                    if registro["status"] in (CONCLUIDO, IGNORADO):
+                        self.contar(f"pulados ({registro['status']})")
+                        continue
+                    if registro["status"] == FALHOU and registro["tentativas"] >= self.max_tentativas:
+                        self.contar("pulados (falhas)")
+                        continue
+                elif os.path.exists(md_path):
+                    # extraído antes de existir o controle
+                    self.contar("pulados (md existente)")
+                    continue
 
-        pdf_path = os.path.normpath(os.path.join("storage", "downloads", "pdf", caminho_pdf))
-        md_path = os.path.normpath(os.path.join("storage", "downloads", "md", caminho_md))
+                yield rotulo, caminho_pdf, pdf_path, md_path, estado.st_size, estado.st_mtime
 
-        if not os.path.exists(pdf_path):
-            logging.warning(f"[{tipo} {numero}] PDF não encontrado: {pdf_path}.")
-            continue
+    async def gerar_com_gemini(self, caminho, sha256, paginas):
+        pipeline = self.pipeline
+        if pipeline.cache:
+            texto = pipeline.cache.obter(sha256, pipeline.extraction_prompt, pipeline.nome_modelo)
+            if texto is not None:
+                return texto, "cache"
 
-        if os.path.exists(md_path):
-            logging.warning(f"[{tipo} {numero}] Arquivo já existe: {md_path}.")
-            continue
+        if pipeline.paginas_por_faixa and paginas > pipeline.paginas_por_faixa:
+            texto = await self.extrair_por_faixas(caminho)
+        else:
+            texto = await self.extrair_arquivo(caminho)
 
+        if pipeline.cache:
+            pipeline.cache.guardar(sha256, pipeline.extraction_prompt, pipeline.nome_modelo, texto)
+        return texto, "gemini"
+
+    async def extrair_arquivo(self, caminho):
+        uploaded = await chamar_com_retentativas(genai.upload_file, caminho)
+        try:
+            resposta = await chamar_com_retentativas(
+                self.pipeline.model.generate_content,
+                [self.pipeline.extraction_prompt, uploaded],
+                limitador=self.limitador
+            )
+            return resposta.text
+        finally:
+            try:
+                await asyncio.to_thread(genai.delete_file, uploaded.name)
+            except Exception as e:
+                logging.warning(f"Não foi possível remover {uploaded.name} do Gemini: {e}")
+
+    async def extrair_por_faixas(self, caminho):
+        """Extrai as faixas de páginas em paralelo e junta o Markdown na ordem do documento."""
+        por_faixa = self.pipeline.paginas_por_faixa
+        with tempfile.TemporaryDirectory(prefix="faixas_") as diretorio:
+            faixas = await asyncio.to_thread(dividir_pdf, caminho, por_faixa, diretorio)
+            logging.info(f"{caminho}: {len(faixas)} faixas de até {por_faixa} páginas")
+            semaforo = asyncio.Semaphore(self.pipeline.faixas_workers)
+            textos = await asyncio.gather(*(self.extrair_faixa(faixa, semaforo) for faixa in faixas))
+        return "\n\n".join(texto.strip() for texto in textos) + "\n"
+
+    async def extrair_faixa(self, faixa, semaforo):
+        """Extrai uma faixa, repetindo só ela em caso de falha."""
+        primeira, ultima, caminho = faixa
+        tentativas = self.pipeline.faixas_tentativas
+        async with semaforo:
+            for tentativa in range(tentativas):
+                try:
+                    return await self.extrair_arquivo(caminho)
+                except Exception as e:
+                    if tentativa == tentativas - 1:
+                        raise
+                    espera = espera_com_jitter(tentativa)
+                    logging.warning(f"Falha nas páginas {primeira}-{ultima} ({e}); nova tentativa em {espera:.1f}s")
+                    await asyncio.sleep(espera)
+
+    def contar(self, chave):
+        self.contagem[chave] = self.contagem.get(chave, 0) + 1
+
+    async def processar(self, rotulo, caminho_pdf, pdf_path, md_path, tamanho, mtime, triagem):
+        sha256 = None
         try:
-            logging.info(f"[{tipo} {numero}] Processando: {pdf_path}")
-            uploaded = genai.upload_file(pdf_path)
-            resposta = pipeline.model.generate_content([
-                pipeline.extraction_prompt,
-                uploaded
-            ])
-            texto = resposta.text
-            genai.delete_file(uploaded.name)
+            logging.info(f"[{rotulo}] Processando: {pdf_path}")
+            triagem = await asyncio.wrap_future(triagem)
+            sha256 = triagem.get("sha256", "")
+            self.controle.iniciar(caminho_pdf, sha256, tamanho, mtime, md_path)
+            situacao = triagem["situacao"]
+            if self.sem_extracao_local and situacao == DIGITAL:
+                situacao = ESCANEADO
+            self.contar(situacao)
+
+            if situacao == DIGITAL:
+                texto, motor = triagem["markdown"], "local"
+            elif situacao == ESCANEADO:
+                texto, motor = await self.gerar_com_gemini(pdf_path, sha256, triagem["paginas"])
+            else:
+                logging.warning(f"[{rotulo}] PDF ignorado ({situacao}): {pdf_path}")
+                self.controle.ignorar(caminho_pdf, sha256, situacao, triagem["paginas"])
+                return
 
             os.makedirs(os.path.dirname(md_path), exist_ok=True)
             with open(md_path, "w", encoding="utf-8") as f:
                 f.write(texto)
 
-            logging.info(f"[{tipo} {numero}] Texto salvo em: {md_path}")
-            processados += 1
+            self.controle.concluir(
+                caminho_pdf, sha256, situacao, motor, triagem["paginas"],
+                hashlib.sha256(texto.encode("utf-8")).hexdigest()
+            )
+            logging.info(f"[{rotulo}] Texto salvo em: {md_path}")
+            self.documentos += 1
+            self.paginas += triagem["paginas"]
 
         except Exception as e:
-            logging.error(f"[{tipo} {numero}] Erro ao processar {pdf_path}: {e}")
-            continue
+            logging.error(f"[{rotulo}] Erro ao processar {pdf_path}: {e}")
+            await self.registrar_falha(caminho_pdf, pdf_path, sha256, md_path, tamanho, mtime, e)
+
+    async def registrar_falha(self, caminho_pdf, pdf_path, sha256, md_path, tamanho, mtime, erro):
+        """Conta a falha no controle, inclusive as da triagem local, que acontecem antes de haver o hash."""
+        try:
+            if sha256 is None:
+                sha256 = await asyncio.to_thread(sha256_arquivo, pdf_path)
+                self.controle.iniciar(caminho_pdf, sha256, tamanho, mtime, md_path)
+            self.controle.falhar(caminho_pdf, sha256, erro)
+        except Exception as e:
+            logging.error(f"Não foi possível registrar a falha de {caminho_pdf} no controle: {e}")
+
+    async def trabalhador(self, fila):
+        while True:
+            tarefa = await fila.get()
+            try:
+                if tarefa is None:
+                    return
+                await self.processar(*tarefa)
+            finally:
+                fila.task_done()
+
+    async def executar(self, itens, limite=None):
+        # a fila limitada mantém a leitura do .jl e a triagem local só um pouco à frente dos envios
+        fila = asyncio.Queue(maxsize=self.concorrencia * 2)
+        trabalhadores = [asyncio.create_task(self.trabalhador(fila)) for _ in range(self.concorrencia)]
+        enfileirados = 0
+        for rotulo, caminho_pdf, pdf_path, md_path, tamanho, mtime in itens:
+            if limite and enfileirados >= limite:
+                break
+            triagem = self.pipeline.extrator.submeter(pdf_path, extrair=not self.sem_extracao_local)
+            await fila.put((rotulo, caminho_pdf, pdf_path, md_path, tamanho, mtime, triagem))
+            enfileirados += 1
+        for _ in trabalhadores:
+            await fila.put(None)
+        await asyncio.gather(*trabalhadores)
+
+
+def mostrar_status(controle):
+    print(f"{'status':<14} {'motor':<8} {'documentos':>10} {'páginas':>10} {'tempo médio':>12}")
+    for linha in controle.resumo():
+        duracao = f"{linha['duracao_media']:.1f}s" if linha["duracao_media"] is not None else "-"
+        print(f"{linha['status']:<14} {linha['motor'] or '-':<8} {linha['documentos']:>10} "
+              f"{linha['paginas']:>10} {duracao:>12}")
+    falhas = controle.falhas()
+    if falhas:
+        print("\nÚltimas falhas:")
+        for falha in falhas:
+            print(f"- {falha['caminho_pdf']} ({falha['tentativas']} tentativas): {falha['ultimo_erro']}")
+
+
+def main():
+    settings = get_project_settings()
+    parser = argparse.ArgumentParser(description="Extrai texto de PDFs (localmente ou com Gemini) e salva como Markdown.")
+    parser.add_argument("--jl", help="Caminho para o arquivo .jl com os itens padronizados")
+    parser.add_argument("--limite", type=int, default=None, help="Limite máximo de arquivos a processar")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processos da extração local")
+    parser.add_argument("--concurrency", type=int, default=8, help="Documentos processados simultaneamente")
+    parser.add_argument("--rpm", type=float, default=60, help="Máximo de chamadas ao modelo por minuto (0 = sem limite)")
+    parser.add_argument("--sem-extracao-local", action="store_true", help="Envia todos os PDFs ao Gemini")
+    parser.add_argument("--max-tentativas", type=int, default=3, help="Tentativas antes de desistir de um PDF")
+    parser.add_argument("--controle", default=settings.get("EXTRACAO_CONTROLE_DB", "storage/dbs/controle_extracao.sqlite3"),
+                        help="Banco SQLite com o controle das extrações")
+    parser.add_argument("--status", action="store_true", help="Mostra o andamento registrado no controle e sai")
+    parser.add_argument("--log", help="Caminho para o arquivo de log")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        filename=args.log,
+        level=logging.INFO,
+        format="%(levelname)s: %(message)s"
+    )
+
+    controle = ControleExtracao(args.controle)
+    if args.status:
+        mostrar_status(controle)
+        controle.fechar()
+        return
+    if not args.jl:
+        parser.error("--jl é obrigatório (exceto com --status)")
+
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    pipeline = GeminiPDFExtractionPipeline(workers_extracao=args.workers)
+    extracao = Extracao(
+        pipeline, controle, max(1, args.concurrency), args.rpm, args.sem_extracao_local, args.max_tentativas
+    )
+
+    inicio = time.perf_counter()
+    try:
+        asyncio.run(extracao.executar(extracao.pendentes(args.jl), args.limite))
+    finally:
+        pipeline.fechar()
+        controle.fechar()
+
+    minutos = (time.perf_counter() - inicio) / 60
+    logging.info(
+        f"{extracao.documentos} documentos ({extracao.paginas} páginas) em {minutos:.1f} min: "
+        f"{extracao.documentos / minutos if minutos else 0:.1f} docs/min, "
+        f"{extracao.paginas / minutos if minutos else 0:.1f} páginas/min; triagem: {extracao.contagem}"
+    )
 
 if __name__ == "__main__":
     main()
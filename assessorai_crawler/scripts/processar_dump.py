@@ -0,0 +1,189 @@
+import os
+import json
+import mmap
+import time
+import argparse
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from scrapy.exceptions import DropItem
+from scrapy.settings import Settings
+from scrapy.spiderloader import SpiderLoader
+from scrapy.utils.project import get_project_settings
+from assessorai_crawler.legislapi import RegistroImpressoes
+from assessorai_crawler.padronizacao import contexto_spider, padronizar_item
+from assessorai_crawler.pipelines import ValidationPipeline, caminho_saida_jl
+from assessorai_crawler.utils import ler_elemento_json, offsets_json_array
+
+TAMANHO_FATIA = 32 * 1024 * 1024  # bytes do arquivo de texto por tarefa enviada aos processos
+
+# estado de cada processo filho, preparado uma única vez por inicializar_processo
+_processo = {}
+
+
+def criar_spider(nome, settings, **kwargs):
+    """Instancia o spider fora do Scrapy (sem crawler), só para usar build_item e os bancos de estado."""
+    spider = SpiderLoader.from_settings(settings).load(nome)(**kwargs)
+    spider.settings = settings
+    return spider
+
+
+def dividir_em_fatias(offsets, tamanho_fatia):
+    """Agrupa os offsets dos elementos em fatias contíguas de aproximadamente `tamanho_fatia` bytes."""
+    fatia = []
+    inicio_fatia = None
+    for inicio, fim in offsets:
+        if inicio_fatia is None:
+            inicio_fatia = inicio
+        fatia.append((inicio, fim))
+        if fim - inicio_fatia >= tamanho_fatia:
+            yield fatia
+            fatia, inicio_fatia = [], None
+    if fatia:
+        yield fatia
+
+
+def inicializar_processo(nome_spider, valores_settings, caminho_impressoes, atualizacao_completa, spider_kwargs):
+    """Executado uma vez em cada processo filho: abre o spider, os índices (só leitura) e o arquivo de texto."""
+    spider = criar_spider(nome_spider, Settings(valores_settings),
+                          atualizacao_completa=atualizacao_completa, **spider_kwargs)
+    # o índice já foi (re)construído pelo processo principal
+    spider.metadata = spider.load_metadata(reconstruir=False)
+    arquivo = open(spider.get_text_file(), 'rb')
+    _processo.update(
+        spider=spider,
+        contexto=contexto_spider(spider),
+        validacao=ValidationPipeline(),
+        impressoes=RegistroImpressoes(caminho_impressoes),
+        mapa=mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ),
+    )
+
+
+def processar_fatia(offsets):
+    """
+    Executado nos processos filhos: lê, monta e padroniza os itens de uma fatia do arquivo de texto.
+    Devolve ([(chave, impressao, linha)], inalterados); linha é None para itens descartados na validação.
+    """
+    spider = _processo["spider"]
+    impressoes = _processo["impressoes"]
+    resultado = []
+    inalterados = 0
+    for inicio, fim in offsets:
+        entry = ler_elemento_json(_processo["mapa"], inicio, fim)
+        chave, impressao, meta = spider.preparar_entrada(entry)
+        if not spider.atualizacao_completa and impressoes.impressao(chave) == impressao:
+            inalterados += 1
+            continue
+        item = padronizar_item(spider.build_item(entry, meta), _processo["contexto"])
+        try:
+            item = _processo["validacao"].process_item(item, None)
+        except DropItem:
+            resultado.append((chave, impressao, None))
+            continue
+        linha = json.dumps(dict(item["item_padronizado"]), ensure_ascii=False) + "\n"
+        resultado.append((chave, impressao, linha))
+    return resultado, inalterados
+
+
+def processar_dump(nome_spider, settings, workers, saida="output", tamanho_fatia=TAMANHO_FATIA,
+                   atualizacao_completa=False, **spider_kwargs):
+    """
+    Processa o dump local de um spider do Legislapi (ou do proposicoescn) em paralelo: o arquivo de
+    texto é varrido uma vez para achar os offsets dos elementos e as fatias são montadas e padronizadas
+    num pool de processos. As linhas vão, na ordem do arquivo, para <saida>/<slug>_proposicoes.jl
+    (num delta próprio nas execuções incrementais, ver caminho_saida_jl), e as impressões das proposições emitidas são gravadas ao final, como numa execução do spider.
+    """
+    spider = criar_spider(nome_spider, settings, atualizacao_completa=atualizacao_completa, **spider_kwargs)
+    metadata = spider.load_metadata()
+    if metadata is not None:
+        metadata.fechar()
+    incremental = spider.saida_incremental
+
+    inicio = time.perf_counter()
+    offsets = offsets_json_array(spider.get_text_file())
+    duracao_varredura = time.perf_counter() - inicio
+    logging.info(f"{len(offsets)} elementos encontrados em {spider.get_text_file()} ({duracao_varredura:.1f}s)")
+
+    os.makedirs(saida, exist_ok=True)
+    caminho_saida = caminho_saida_jl(saida, spider.slug, incremental)
+    contagem = {"gravados": 0, "inalterados": 0, "descartados": 0}
+
+    def gravar(resultado):
+        itens, inalterados = resultado
+        contagem["inalterados"] += inalterados
+        for chave, impressao, linha in itens:
+            if linha is None:
+                # descartados não são registrados, como no spider: voltam na próxima execução
+                contagem["descartados"] += 1
+                continue
+            arquivo_saida.write(linha)
+            spider.impressoes.registrar(chave, impressao)
+            contagem["gravados"] += 1
+
+    argumentos = (nome_spider, settings.copy_to_dict(), spider.caminho_estado('impressoes'),
+                  atualizacao_completa, spider_kwargs)
+    try:
+        with open(caminho_saida, "w", encoding="utf-8") as arquivo_saida, \
+                ProcessPoolExecutor(max_workers=workers, initializer=inicializar_processo,
+                                    initargs=argumentos) as executor:
+            # limita as tarefas em andamento para manter a memória constante
+            pendentes = deque()
+            for fatia in dividir_em_fatias(offsets, tamanho_fatia):
+                pendentes.append(executor.submit(processar_fatia, fatia))
+                if len(pendentes) >= workers * 2:
+                    gravar(pendentes.popleft().result())
+            while pendentes:
+                gravar(pendentes.popleft().result())
+    except BaseException:
+        spider.impressoes.descartar()
+        raise
+    else:
+        spider.impressoes.confirmar()
+    finally:
+        spider.impressoes.fechar()
+
+    duracao = time.perf_counter() - inicio
+    contagem.update(elementos=len(offsets), duracao=duracao, duracao_varredura=duracao_varredura,
+                    saida=caminho_saida)
+    return contagem
+
+
+def main():
+    settings = get_project_settings()
+    parser = argparse.ArgumentParser(
+        description="Processa em paralelo o dump local de um spider do Legislapi (ou proposicoescn), gerando o .jl padronizado."
+    )
+    parser.add_argument("spider", help="Nome do spider (ex.: proposicoessp, proposicoescn)")
+    parser.add_argument("--saida", default="output", help="Diretório do .jl gerado")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Número de processos")
+    parser.add_argument("--tamanho-fatia", type=int, default=TAMANHO_FATIA // (1024 * 1024),
+                        help="MB do arquivo de texto por tarefa enviada aos processos")
+    parser.add_argument("--atualizacao-completa", action="store_true",
+                        help="Emite todas as proposições, mesmo as que não mudaram desde a última execução")
+    parser.add_argument("--pasta", help="Pasta dos datasets (padrão: a do spider)")
+    parser.add_argument("--log", help="Caminho para o arquivo de log")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        filename=args.log,
+        level=logging.INFO,
+        format="%(levelname)s: %(message)s"
+    )
+
+    spider_kwargs = {"folder": args.pasta} if args.pasta else {}
+    contagem = processar_dump(
+        args.spider, settings, args.workers, saida=args.saida,
+        tamanho_fatia=args.tamanho_fatia * 1024 * 1024,
+        atualizacao_completa=args.atualizacao_completa, **spider_kwargs
+    )
+    taxa = contagem["elementos"] / contagem["duracao"] if contagem["duracao"] else 0
+    logging.info(
+        f"{args.spider}: {contagem['gravados']} itens gravados, {contagem['inalterados']} inalterados, "
+        f"{contagem['descartados']} descartados em {contagem['duracao']:.1f}s ({taxa:,.0f} elementos/s) "
+        f"-> {contagem['saida']}."
+    )
+
+
+if __name__ == "__main__":
+    main()
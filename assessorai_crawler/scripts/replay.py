@@ -0,0 +1,190 @@
+import os
+import re
+import json
+import glob
+import gzip
+import time
+import zlib
+import argparse
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from scrapy.utils.project import get_project_settings
+from assessorai_crawler.armazenamento import IndiceArquivos
+from assessorai_crawler.items import ProposicaoItem
+from assessorai_crawler.padronizacao import padronizar_item
+
+_RE_UUID = re.compile(r'^\{"uuid": (?:"([^"]*)"|null)')
+
+
+def ler_linhas(caminho):
+    """Lê as linhas de um arquivo bruto, tolerando o final truncado de uma execução interrompida."""
+    try:
+        with gzip.open(caminho, 'rt', encoding='utf-8') as f:
+            for linha in f:
+                if linha.endswith("\n"):
+                    yield linha
+    except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+        logging.warning(f"{caminho}: arquivo truncado ({e}); registros seguintes ignorados.")
+
+
+def ler_execucoes(caminhos):
+    """Lê, em ordem, as linhas dos arquivos de várias execuções de um mesmo spider."""
+    for caminho in caminhos:
+        yield from ler_linhas(caminho)
+
+
+def linhas_mais_recentes(caminhos):
+    """Mantém apenas o último registro de cada uuid entre todas as execuções."""
+    ultima_ocorrencia = {}
+    for ordem, linha in enumerate(ler_execucoes(caminhos)):
+        match = _RE_UUID.match(linha)
+        if match and match.group(1):
+            ultima_ocorrencia[match.group(1)] = ordem
+
+    for ordem, linha in enumerate(ler_execucoes(caminhos)):
+        match = _RE_UUID.match(linha)
+        if match and match.group(1) and ultima_ocorrencia.get(match.group(1)) != ordem:
+            continue
+        yield linha
+
+
+def slug_do_arquivo(caminho):
+    """Slug de um arquivo bruto: <slug>/<data-hora>.jl.gz ou o antigo <slug>.jl.gz."""
+    nome = os.path.basename(caminho)
+    if nome[:1].isdigit():
+        return os.path.basename(os.path.dirname(os.path.abspath(caminho)))
+    return nome[:-len(".jl.gz")]
+
+
+def agrupar_por_spider(diretorio, arquivos=None):
+    """
+    {slug: [arquivos em ordem cronológica]}: os informados ou, por padrão, todos os de `diretorio`
+    (um .jl.gz por execução em <slug>/; o antigo <slug>.jl.gz único, se existir, vem primeiro).
+    """
+    if not arquivos:
+        arquivos = sorted(glob.glob(os.path.join(diretorio, "*.jl.gz")))
+        arquivos += sorted(glob.glob(os.path.join(diretorio, "*", "*.jl.gz")))
+    grupos = {}
+    for caminho in sorted(arquivos):
+        grupos.setdefault(slug_do_arquivo(caminho), []).append(caminho)
+    return grupos
+
+
+def lotes(linhas, tamanho):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+# índice dos arquivos baixados, aberto uma vez em cada processo filho
+_indices = {}
+
+
+def sha256_arquivo_original(caminho_indice, item_bruto):
+    """SHA-256 do primeiro arquivo do item segundo o índice dos downloads, como o FilesPipeline expõe."""
+    urls = item_bruto.get("file_urls") or []
+    if not urls or not caminho_indice or not os.path.exists(caminho_indice):
+        return None
+    if caminho_indice not in _indices:
+        _indices[caminho_indice] = IndiceArquivos(caminho_indice)
+    registro = _indices[caminho_indice].obter(urls[0])
+    return registro["sha256"] if registro else None
+
+
+def padronizar_lote(linhas, caminho_indice=None):
+    """Executado nos processos filhos: padroniza um lote de registros brutos."""
+    resultado = []
+    for linha in linhas:
+        registro = json.loads(linha)
+        contexto = registro["contexto"]
+        item = registro["item"]
+        if registro.get("tipo") == "ProposicaoItem":
+            item = ProposicaoItem(**item)
+        item_padronizado = padronizar_item(item, contexto)["item_padronizado"]
+        sha256 = sha256_arquivo_original(caminho_indice, item)
+        if sha256:
+            item_padronizado["sha256_arquivo_original"] = sha256
+        resultado.append((contexto["slug"], json.dumps(item_padronizado, ensure_ascii=False) + "\n"))
+    return resultado
+
+
+def main():
+    settings = get_project_settings()
+    parser = argparse.ArgumentParser(
+        description="Reprocessa offline os itens brutos arquivados, gerando novos .jl padronizados."
+    )
+    parser.add_argument("arquivos", nargs="*", help="Arquivos .jl.gz (padrão: todos em ARQUIVO_BRUTO_DIR, agrupados por spider)")
+    parser.add_argument("--saida", default=os.path.join("output", "replay"), help="Diretório dos .jl gerados")
+    parser.add_argument("--sobrescrever", action="store_true", help="Substitui .jl que já existam em --saida")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Número de processos")
+    parser.add_argument("--lote", type=int, default=2000, help="Registros por tarefa enviada aos processos")
+    parser.add_argument("--log", help="Caminho para o arquivo de log")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        filename=args.log,
+        level=logging.INFO,
+        format="%(levelname)s: %(message)s"
+    )
+
+    grupos = agrupar_por_spider(settings.get("ARQUIVO_BRUTO_DIR", "storage/arquivo_bruto"), args.arquivos)
+    if not grupos:
+        logging.warning("Nenhum arquivo bruto encontrado.")
+        return
+
+    if not args.sobrescrever:
+        existentes = [
+            caminho for caminho in (os.path.join(args.saida, f"{slug}_proposicoes.jl") for slug in grupos)
+            if os.path.exists(caminho)
+        ]
+        if existentes:
+            logging.error(f"Arquivos de saída já existem (use --sobrescrever): {', '.join(existentes)}")
+            raise SystemExit(1)
+
+    os.makedirs(args.saida, exist_ok=True)
+    processar = partial(padronizar_lote, caminho_indice=settings.get("FILES_INDICE_DB", "storage/dbs/indice_arquivos.sqlite3"))
+    saidas = {}
+    gravados = 0
+    inicio = time.perf_counter()
+
+    def gravar(resultado):
+        nonlocal gravados
+        for slug, linha in resultado:
+            if slug not in saidas:
+                saidas[slug] = open(os.path.join(args.saida, f"{slug}_proposicoes.jl"), "w", encoding="utf-8")
+            saidas[slug].write(linha)
+            gravados += 1
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for slug, caminhos in grupos.items():
+                logging.info(f"Reprocessando {slug} ({len(caminhos)} arquivo(s))")
+                # limita as tarefas em andamento para manter a memória constante
+                pendentes = deque()
+                for lote in lotes(linhas_mais_recentes(caminhos), args.lote):
+                    pendentes.append(executor.submit(processar, lote))
+                    if len(pendentes) >= args.workers * 2:
+                        gravar(pendentes.popleft().result())
+                while pendentes:
+                    gravar(pendentes.popleft().result())
+    finally:
+        for f in saidas.values():
+            f.close()
+
+    duracao = time.perf_counter() - inicio
+    taxa = gravados / duracao if duracao else 0
+    logging.info(
+        f"Replay concluído: {gravados} itens gravados em {duracao:.1f}s ({taxa:,.0f} itens/s)."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -53,25 +53,54 @@ ROBOTSTXT_OBEY = True
 
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-#SPIDER_MIDDLEWARES = {
-#    "assessorai_crawler.middlewares.AssessoraiCrawlerSpiderMiddleware": 543,
-#}
+SPIDER_MIDDLEWARES = {
+    "assessorai_crawler.middlewares.VistosSpiderMiddleware": 543,
+}
+
+# Proposições já coletadas (uuid → impressão da linha da listagem): os spiders municipais não baixam
+# de novo o detalhe das que não mudaram, salvo se a última coleta tiver mais de VISTOS_IDADE_MAXIMA_DIAS
+VISTOS_ENABLED = True
+VISTOS_DB = 'storage/dbs/vistos.sqlite3'
+VISTOS_IDADE_MAXIMA_DIAS = 7
+
+# Listagens ASP.NET (Câmara Sem Papel): ponto de retomada da paginação por postback, válido por algumas horas
+PAGINACAO_RETOMADA_ENABLED = True
+PAGINACAO_DB = 'storage/dbs/paginacao.sqlite3'
+PAGINACAO_RETOMADA_HORAS = 12
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
-#    "assessorai_crawler.middlewares.AssessoraiCrawlerDownloaderMiddleware": 543,
-#}
+DOWNLOADER_MIDDLEWARES = {
+    "assessorai_crawler.middlewares.RequisicaoCondicionalMiddleware": 950,
+}
+
+# GET condicional (ETag/Last-Modified) nas páginas de detalhe: num 304 o corpo guardado é repetido
+CONDICIONAL_ENABLED = True
+CONDICIONAL_DB = 'storage/dbs/condicional.sqlite3'
+CONDICIONAL_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB (comprimido), com despejo LRU
+CONDICIONAL_IDADE_MAXIMA_DIAS = 180  # respostas sem uso há mais tempo são removidas
+CONDICIONAL_URLS = [
+    r'Digital\.aspx',                          # Linhares e São José dos Campos (Câmara Sem Papel)
+    r'DetailsDetalhado',                       # São Paulo
+    r'siscam\.com\.br/Documentos/Documento/',  # Poços de Caldas
+]
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
-#    "scrapy.extensions.telnet.TelnetConsole": None,
-#}
+EXTENSIONS = {
+    "assessorai_crawler.extensions.MarcaDaguaExtension": 500,
+}
+
+# Coleta incremental: sem -a data_inicio/data_fim/limite, os spiders com período começam da data_documento
+# mais recente da última execução completa, menos alguns dias de sobreposição
+MARCA_DAGUA_ENABLED = True
+MARCA_DAGUA_DB = 'storage/dbs/marcas_dagua.sqlite3'
+MARCA_DAGUA_SOBREPOSICAO_DIAS = 7
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 ITEM_PIPELINES = {
+    'assessorai_crawler.pipelines.ArquivoBrutoPipeline': 50,
     'assessorai_crawler.pipelines.PipelinePadronizacao': 100,
     'assessorai_crawler.pipelines.ProposicaoFilesPipeline': 200,
     'assessorai_crawler.pipelines.SalvarMarkdownPipeline': 250,
@@ -80,10 +109,52 @@ ITEM_PIPELINES = {
     #'assessorai_crawler.pipelines.GeminiPDFExtractionPipeline': 500,
 }
 
+# Arquivo append-only dos itens brutos, usado por scripts/replay.py para reprocessar a padronização
+ARQUIVO_BRUTO_DIR = 'storage/arquivo_bruto'
+
+# Índices em disco dos metadados dos dumps do Legislapi (reconstruídos quando o arquivo muda)
+LEGISLAPI_INDICE_DIR = 'storage/dbs/legislapi'
+
 # Configurações do FilesPipeline
 FILES_STORE = 'storage/downloads'  # Pasta onde os arquivos serão salvos
-FILES_EXPIRES = 90  # Dias para expiração do cache de arquivos
+FILES_EXPIRES = 90  # Dias até revalidar o arquivo (requisição condicional; 304 não baixa de novo)
 MEDIA_ALLOW_REDIRECTS = True
+# Armazém endereçado por conteúdo (SHA-256); os arquivos em FILES_STORE/pdf/ são hardlinks para ele
+FILES_BLOBS_DIR = 'storage/downloads/blobs'
+FILES_INDICE_DB = 'storage/dbs/indice_arquivos.sqlite3'
+# Downloads em fluxo direto para o disco (sem manter o PDF inteiro na memória), com limite de
+# tamanho e retomada via Range dos downloads interrompidos.
+# Atenção: em fluxo, os downloads são feitos com requests num pool próprio (FILES_STREAMING_THREADS
+# conexões), fora do downloader do Scrapy: ROBOTSTXT_OBEY, DOWNLOAD_DELAY/AutoThrottle,
+# CONCURRENT_REQUESTS_PER_DOMAIN, retry, proxies e cookies NÃO se aplicam. Só ligue para fontes
+# que aguentem a carga extra (ex.: -s FILES_STREAMING=True -s FILES_STREAMING_THREADS=2).
+FILES_STREAMING = False
+FILES_STREAMING_THREADS = 8
+FILES_MAX_SIZE = 1024 * 1024 * 1024  # 1 GB
+FILES_PARTIAL_DIR = 'storage/downloads/parciais'
+
+# Extração local (PyMuPDF) dos PDFs digitais; só os escaneados vão para o Gemini
+EXTRACAO_LOCAL_WORKERS = 4
+EXTRACAO_LOCAL_MIN_CARACTERES_PAGINA = 200  # abaixo disso a página é tratada como imagem
+# Controle das extrações do scripts/extrair_textos_gemini.py (retomada e consulta com --status)
+EXTRACAO_CONTROLE_DB = 'storage/dbs/controle_extracao.sqlite3'
+
+# PDFs com mais páginas que isso são divididos em faixas extraídas em paralelo pelo Gemini (0 desliga)
+GEMINI_PAGINAS_POR_FAIXA = 20
+GEMINI_FAIXAS_WORKERS = 4
+GEMINI_FAIXAS_TENTATIVAS = 3  # tentativas por faixa
+
+# Cache das respostas do Gemini (hash do conteúdo + versão do prompt + modelo), com despejo LRU por tamanho
+GEMINI_CACHE_PATH = 'storage/dbs/cache_gemini.sqlite3'
+GEMINI_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2 GB
+
+# Chamadas simultâneas ao Gemini no GeminiAssuntosPipeline (executadas fora do reactor).
+# Os itens aguardando o modelo contam em CONCURRENT_ITEMS (padrão 100).
+GEMINI_ASSUNTOS_CONCURRENCY = 4
+# Modo em lote: agrupa documentos curtos numa única chamada estruturada (1 desliga o modo em lote)
+GEMINI_ASSUNTOS_LOTE_MAX_DOCUMENTOS = 10
+GEMINI_ASSUNTOS_LOTE_MAX_TOKENS = 30000  # orçamento estimado de tokens dos textos de um lote
+GEMINI_ASSUNTOS_LOTE_ESPERA_MAXIMA = 5  # segundos até enviar um lote incompleto
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
@@ -100,11 +171,21 @@ MEDIA_ALLOW_REDIRECTS = True
 
 # Enable and configure HTTP caching (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
-#HTTPCACHE_ENABLED = True
-#HTTPCACHE_EXPIRATION_SECS = 0
-#HTTPCACHE_DIR = "httpcache"
-#HTTPCACHE_IGNORE_HTTP_CODES = []
-#HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+# Cache num único SQLite com corpo comprimido em zstd e validade por classe de URL (detalhes: dias;
+# listagens e o restante: HTTPCACHE_EXPIRATION_SECS); ver assessorai_crawler/httpcache.py.
+# Desligado por padrão: é uma ferramenta de desenvolvimento e replay (-s HTTPCACHE_ENABLED=True).
+# PDFs e arquivos nunca entram no cache (PoliticaCache), para não duplicar o armazém do FilesPipeline
+# nem responder no lugar da revalidação condicional dos arquivos
+HTTPCACHE_ENABLED = False
+HTTPCACHE_EXPIRATION_SECS = 30 * 60  # URLs fora das classes de HTTPCACHE_SQLITE_VALIDADES
+HTTPCACHE_IGNORE_HTTP_CODES = [429, 500, 502, 503, 504]
+HTTPCACHE_POLICY = "assessorai_crawler.httpcache.PoliticaCache"
+HTTPCACHE_STORAGE = "assessorai_crawler.httpcache.SQLiteCacheStorage"
+HTTPCACHE_SQLITE_PATH = 'storage/dbs/httpcache.sqlite3'
+HTTPCACHE_SQLITE_MAX_BYTES = 5 * 1024 * 1024 * 1024  # 5 GB (comprimido), com despejo LRU
+HTTPCACHE_SQLITE_MAX_ITEM_BYTES = 50 * 1024 * 1024
+#HTTPCACHE_SQLITE_VALIDADES = [(r'Digital\.aspx', 86400), (r'/consulta-producao', 600)]
+#HTTPCACHE_IGNORAR_URLS = r'\.pdf($|\?)'
 
 # Set settings whose default value is deprecated to a future-proof value
 FEED_EXPORT_ENCODING = "utf-8"
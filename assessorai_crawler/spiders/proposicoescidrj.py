@@ -2,8 +2,10 @@ import scrapy
 import re
 import hashlib
 from datetime import datetime
-from bs4 import BeautifulSoup
+from ..html_markdown import html_para_markdown
 from ..items import ProposicaoItem
+from ..padronizacao import converter_data, formatar_data
+from ..utils import impressao_linha, seletor_html, texto_limpo
 
 
 class ProposicoesCIDRJSpider(scrapy.Spider):
@@ -31,37 +33,45 @@ class ProposicoesCIDRJSpider(scrapy.Spider):
         self.data_fim = self._validar_data(data_fim)
         self.limite_total_itens = int(limite) if limite else None
         self.itens_processados = 0
+        # a view do Notes não aceita filtro por data: verificamos se as datas vêm em ordem decrescente
+        # para parar a paginação quando uma página inteira ficar antes de data_inicio
+        self.pares_datas = 0
+        self.pares_decrescentes = 0
+        self.ultima_data = None
 
     def parse(self, response):
-        soup = BeautifulSoup(response.text, "html.parser")
-        linhas = soup.select('table[cellpadding="2"] tr[valign="top"]')
+        seletor = seletor_html(response)
+        linhas = seletor.css('table[cellpadding="2"] tr[valign="top"]')
+        datas_pagina = []
 
         for linha in linhas:
             if self.limite_total_itens and self.itens_processados >= self.limite_total_itens:
                 return
 
-            cols = linha.find_all("td")
+            cols = linha.xpath(".//td")
             if len(cols) < 6:
                 continue
 
-            link_tag = cols[0].find("a")
+            link_tag = cols[0].xpath(".//a")
             if not link_tag:
                 continue
 
-            url_detalhes = response.urljoin(link_tag["href"])
-            numero_ano = link_tag.get_text(strip=True)
+            url_detalhes = response.urljoin(link_tag[0].attrib["href"])
+            numero_ano = texto_limpo(link_tag[0])
             try:
                 numero, ano = numero_ano.split("/")
             except ValueError:
                 continue
 
-            ementa_bruta = cols[3].get_text(strip=True)
-            data_publicacao = cols[4].get_text(strip=True)
-            autores_bruto = cols[5].get_text(strip=True)
+            ementa_bruta = texto_limpo(cols[3])
+            data_publicacao = texto_limpo(cols[4])
+            autores_bruto = texto_limpo(cols[5])
 
             # Normaliza a data já no spider
-            data_obj = self._parse_data(data_publicacao)  # datetime ou None
+            data_obj = converter_data(data_publicacao)  # datetime ou None
             data_fmt = data_obj.strftime("%Y-%m-%d") if data_obj else None
+            if data_obj:
+                datas_pagina.append(data_obj)
 
             # Filtro de datas
             if data_obj and (self.data_inicio or self.data_fim):
@@ -88,7 +98,11 @@ class ProposicoesCIDRJSpider(scrapy.Spider):
             item["uuid"] = hashlib.md5(url_detalhes.encode("utf-8")).hexdigest()
 
             self.itens_processados += 1
-            yield scrapy.Request(url_detalhes, callback=self.parse_detalhes, meta={"item": item})
+            vistos = {
+                "uuid": item["uuid"],
+                "impressao": impressao_linha(numero_ano, ementa_bruta, data_publicacao, autores_bruto),
+            }
+            yield scrapy.Request(url_detalhes, callback=self.parse_detalhes, meta={"item": item, "vistos": vistos})
 
         match = re.search(r"Start=(\d+)", response.url)
         if match:
@@ -99,17 +113,21 @@ class ProposicoesCIDRJSpider(scrapy.Spider):
         next_start = start_val + 100
         next_url = f"https://aplicnt.camara.rj.gov.br/APL/Legislativos/scpro.nsf/Internet/LeiInt?OpenForm&Start={next_start}"
 
+        if self._pagina_anterior_ao_periodo(datas_pagina):
+            self.logger.info(f"Página {start_val} inteira anterior a {self.data_inicio}. Parando paginação.")
+            return
+
         # Só continua se ainda houver linhas (evita loop infinito)
         if linhas:
             yield scrapy.Request(next_url, callback=self.parse)
 
     def parse_detalhes(self, response):
         item = response.meta["item"]
-        soup = BeautifulSoup(response.text, "html.parser")
+        seletor = seletor_html(response)
 
         # --- CAPTURA DA DATA NO DETALHE ---
         if not item.get("data_documento_bruto"):
-            data_detalhe = soup.find(string=re.compile(r"\d{1,2}/\d{1,2}/\d{4}"))
+            data_detalhe = seletor.xpath(r'//text()[re:test(., "\d{1,2}/\d{1,2}/\d{4}")]').get()
             if data_detalhe:
                 item["data_documento_bruto"] = data_detalhe.strip()
 
@@ -130,9 +148,9 @@ class ProposicoesCIDRJSpider(scrapy.Spider):
         caminho_base = f"rj/rio-de-janeiro/{self.slug}/{nome_arquivo}"
 
         # PDF (se existir)
-        pdf_link_tag = soup.find("a", href=lambda href: href and ".pdf" in href.lower())
-        if pdf_link_tag:
-            url_pdf = response.urljoin(pdf_link_tag["href"])
+        pdf_href = seletor.xpath('//a[re:test(@href, "\\.pdf", "i")]/@href').get()
+        if pdf_href:
+            url_pdf = response.urljoin(pdf_href)
             item_dict["url_documento_original"] = url_pdf
             item_dict["file_urls"] = [url_pdf]
             item_dict["caminho_arquivo_original"] = f"{caminho_base}.pdf"
@@ -147,38 +165,52 @@ class ProposicoesCIDRJSpider(scrapy.Spider):
 
         # Tramitação
         status_bruto = []
-        tramitacao_header = soup.find("font", string=re.compile("TRAMITAÇÃO DO PROJETO"))
+        tramitacao_header = seletor.xpath('(//font[text()[contains(., "TRAMITAÇÃO DO PROJETO")]])[1]')
         if tramitacao_header:
-            tabela_tramitacao = tramitacao_header.find_next("table")
+            # primeira tabela depois do cabeçalho, em ordem de documento
+            tabela_tramitacao = tramitacao_header[0].xpath("(descendant::table | following::table)[1]")
             if tabela_tramitacao:
-                trs = tabela_tramitacao.find_all("tr")[1:]  # ignora cabeçalho
+                trs = tabela_tramitacao[0].xpath(".//tr")[1:]  # ignora cabeçalho
                 for tr in trs[-3:]:  # pega últimos 3
-                    descricao = " ".join(td.get_text(strip=True) for td in tr.find_all("td")).strip()
+                    descricao = " ".join(texto_limpo(td) for td in tr.xpath(".//td")).strip()
                     data_status = None
                     data_match = re.search(r"(\d{2}/\d{2}/\d{4})", descricao)
                     if data_match:
-                        data_status = self._formatar_data(data_match.group(1))
+                        data_status = formatar_data(data_match.group(1))
                     if descricao:
                         status_bruto.append({"descricao": descricao, "data": data_status})
         item_dict["status_bruto"] = self.limpar_status(status_bruto)
 
         # Conteúdo em Markdown
-        div_texto_inicial = soup.find("div", id="xSec2")
-        item_dict["conteudo_markdown"] = self._limpar_html_para_markdown(div_texto_inicial)
+        div_texto_inicial = seletor.css("div#xSec2")
+        item_dict["conteudo_markdown"] = (
+            html_para_markdown(div_texto_inicial) if div_texto_inicial else "Conteúdo não encontrado."
+        )
 
         # Ajusta data do documento para ISO
         item_dict["data_documento"] = item.get("data_documento_bruto")
         yield item_dict
 
     # --- FUNÇÕES AUXILIARES ---
-    def _formatar_data(self, data_texto):
-        """Converte dd/mm/yyyy para YYYY-MM-DD"""
-        if not data_texto:
-            return None
-        try:
-            return datetime.strptime(data_texto.strip(), "%d/%m/%Y").strftime("%Y-%m-%d")
-        except ValueError:
-            return None
+    def _pagina_anterior_ao_periodo(self, datas_pagina):
+        """
+        Atualiza a contagem de pares de datas consecutivos em ordem decrescente (as páginas são
+        processadas em sequência) e indica se a listagem está em ordem decrescente (ao menos 90%
+        dos pares, tolerando publicações fora de ordem) e a página inteira é anterior a data_inicio.
+        """
+        for data in datas_pagina:
+            if self.ultima_data is not None:
+                self.pares_datas += 1
+                if data <= self.ultima_data:
+                    self.pares_decrescentes += 1
+            self.ultima_data = data
+
+        if not self.data_inicio or not datas_pagina or self.pares_datas < 10:
+            return False
+        if self.pares_decrescentes < 0.9 * self.pares_datas:
+            return False
+        di = datetime.strptime(self.data_inicio, "%Y-%m-%d")
+        return max(datas_pagina) < di
 
     def _validar_data(self, data_texto):
         if not data_texto:
@@ -198,69 +230,3 @@ class ProposicoesCIDRJSpider(scrapy.Spider):
             descricao = re.sub(r"\s+", " ", descricao)
             status_list.append({"descricao": descricao, "data": data})
         return status_list
-
-    def _parse_data(self, data_texto):
-        if not data_texto:
-            return None
-        try:
-            return datetime.strptime(data_texto.strip(), "%d/%m/%Y")
-        except ValueError:
-            return None
-
-    def _limpar_html_para_markdown(self, div_conteudo):
-        if not div_conteudo:
-            return "Conteúdo não encontrado."
-
-        # Quebra de linha
-        for br in div_conteudo.find_all("br"):
-            br.replace_with("\n")
-
-        # Negrito: <b> e <strong>
-        for tag in div_conteudo.find_all(["b", "strong"]):
-            content = tag.get_text(strip=True)
-            if content:
-                tag.replace_with(f"**{content}**")
-
-        # Sublinhado vira negrito (para não perder destaque)
-        for tag in div_conteudo.find_all("u"):
-            content = tag.get_text(strip=True)
-            if content:
-                tag.replace_with(f"**{content}**")
-
-        # Cabeçalhos comuns (se existirem)
-        for h_tag, prefix in [("h1", "# "), ("h2", "## "), ("h3", "### ")]:
-            for tag in div_conteudo.find_all(h_tag):
-                content = tag.get_text(strip=True)
-                if content:
-                    tag.replace_with(f"{prefix}{content}\n")
-
-        # Listas simples (transforma <li> em linha com "- ")
-        for li in div_conteudo.find_all("li"):
-            content = li.get_text(" ", strip=True)
-            if content:
-                li.replace_with(f"- {content}\n")
-
-        # Links: [texto](url), ignorando javascript:
-        for a in div_conteudo.find_all("a"):
-            text = a.get_text(strip=True)
-            href = a.get("href")
-            if href and not href.lower().startswith("javascript:"):
-                a.replace_with(f"[{text}]({href})")
-            else:
-                a.replace_with(text)
-
-
-        # Remove scripts e estilos
-        for tag in div_conteudo.find_all(["script", "style"]):
-            tag.decompose()
-
-        # Extrai texto com quebras
-        texto = div_conteudo.get_text(separator="\n", strip=True)
-
-        # Normalizações
-        texto = re.sub(r"[ \t]+", " ", texto)         # espaços múltiplos -> 1
-        texto = re.sub(r"\n{3,}", "\n\n", texto)      # >2 quebras -> 2
-        texto = re.sub(r"\s+\n", "\n", texto)         # espaço antes de \n
-        texto = re.sub(r"\n\s+", "\n", texto)         # espaço depois de \n
-
-        return texto.strip()
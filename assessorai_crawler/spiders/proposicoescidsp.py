@@ -1,11 +1,10 @@
 import scrapy
 import hashlib
 import json
-import re
 from datetime import datetime
 from urllib.parse import urlencode
-from bs4 import BeautifulSoup
 from ..items import ProposicaoItem
+from ..utils import impressao_linha, seletor_html, texto_limpo
 
 class ProposicoescidspSpider(scrapy.Spider):
     """
@@ -92,7 +91,7 @@ class ProposicoescidspSpider(scrapy.Spider):
             yield scrapy.Request(
                 url=detalhes_url,
                 callback=self.parse_detalhes,
-                meta={'item': item}
+                meta={'item': item, 'vistos': {'uuid': item['uuid'], 'impressao': impressao_linha(ajax_data)}}
             )
 
         # Paginação
@@ -145,21 +144,21 @@ class ProposicoescidspSpider(scrapy.Spider):
     def parse_detalhes(self, response):
         """Extrai dados da página de detalhes da proposição."""
         item = response.meta['item']
-        soup = BeautifulSoup(response.text, 'html.parser')
+        seletor = seletor_html(response)
 
         # Data
-        item['data_documento_bruto'] = self._extrair_data_documento(soup)
+        item['data_documento_bruto'] = self._extrair_data_documento(seletor)
 
         # Assuntos
-        assuntos_bruto = self._extrair_assuntos(soup)
+        assuntos_bruto = self._extrair_assuntos(seletor)
         item['assuntos_bruto'] = assuntos_bruto
 
         # Status
-        status_bruto = self._extrair_status(soup)
+        status_bruto = self._extrair_status(seletor)
         item['status_bruto'] = status_bruto
 
         # PDF
-        url_pdf = self._extrair_pdf(soup, response)
+        url_pdf = self._extrair_pdf(seletor, response)
         if url_pdf:
             item['url_documento_original'] = url_pdf
             item['file_urls'] = [url_pdf]
@@ -173,51 +172,45 @@ class ProposicoescidspSpider(scrapy.Spider):
         yield item
 
     # --- MÉTODOS AUXILIARES DE EXTRAÇÃO ---
-    def _extrair_pdf(self, soup, response):
-        # procura o fieldset do processo digital principal
-        legend = soup.find('legend', string=re.compile(r'Processo Digital - Processo Principal', re.IGNORECASE))
-        if legend:
-            fieldset = legend.find_parent('fieldset')
-            if fieldset:
-                # pega o primeiro link dentro da coluna Documento
-                link = fieldset.find('a', href=True)
-                if link:
-                    return response.urljoin(link['href'])
+    def _extrair_pdf(self, seletor, response):
+        # procura o fieldset do processo digital principal e pega o primeiro link dentro da coluna Documento
+        href = seletor.xpath(
+            '(//legend[re:test(., "Processo Digital - Processo Principal", "i")])[1]'
+            '/ancestor::fieldset[1]/descendant::a[@href][1]/@href'
+        ).get()
+        if href:
+            return response.urljoin(href)
         return None
 
-    def _extrair_data_documento(self, soup):
-        td = soup.find('td', class_='negrito', string=re.compile(r'\s*Apresentado em\s*'))
+    def _extrair_data_documento(self, seletor):
+        td = seletor.xpath(
+            '//td[contains(concat(" ", normalize-space(@class), " "), " negrito ")]'
+            '[contains(., "Apresentado em")]/following-sibling::td[1]'
+        )
         if td:
-            return td.find_next_sibling('td').get_text(strip=True)
+            return texto_limpo(td[0])
         return None
 
-    def _extrair_assuntos(self, soup):
-        legend = soup.find('legend', string='Palavras-Chave')
-        if legend:
-            spans = legend.find_parent('fieldset').find_all('span')
-            return [span.get_text(strip=True) for span in spans]
-        return []
-
-    def _extrair_status(self, soup):
-        legend = soup.find('legend', string=re.compile(r'Histórico.*Tramitações', re.IGNORECASE))
-        if not legend:
-            #self.logger.info("Historico de tramitações não encontrado.")
-            return []
+    def _extrair_assuntos(self, seletor):
+        spans = seletor.xpath('(//legend[normalize-space(.)="Palavras-Chave"])[1]/ancestor::fieldset[1]//span')
+        return [texto_limpo(span) for span in spans]
 
-        fieldset = legend.find_parent('fieldset')
-        tabela = fieldset.find('table') if fieldset else None
+    def _extrair_status(self, seletor):
+        tabela = seletor.xpath(
+            '(//legend[re:test(., "Histórico.*Tramitações", "i")])[1]/ancestor::fieldset[1]/descendant::table[1]'
+        )
         if not tabela:
             #self.logger.info("Tabela de tramitações não encontrada.")
             return []
 
-        linhas = tabela.find_all('tr')[1:]  # Ignora cabeçalho
+        linhas = tabela[0].xpath('.//tr')[1:]  # Ignora cabeçalho
         status_list = []
 
         for tr in linhas[:3]:  # Pega até 3 últimas
-            cols = tr.find_all('td')
+            cols = tr.xpath('.//td')
             if len(cols) >= 2:
-                data = cols[0].get_text(strip=True)
-                descricao = cols[1].get_text(strip=True)
+                data = texto_limpo(cols[0])
+                descricao = texto_limpo(cols[1])
                 status_list.append({"data": data, "descricao": descricao})
         return status_list
 
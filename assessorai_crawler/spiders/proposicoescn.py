@@ -1,65 +1,72 @@
-import scrapy
 import json
 import hashlib
 from datetime import datetime
 from ..items import ProposicaoItem
+from .proposicoeslegislapi import ProposicoesLegislapi
 
 import urllib.parse
-class ProposicoesCNSpider(scrapy.Spider):
+class ProposicoesCNSpider(ProposicoesLegislapi):
     name = 'proposicoescn'
+    house = "Câmara dos Deputados"
+    uf = None
+    esfera = 'FEDERAL'
     slug = name.replace(' ', '_').lower()
     slug = slug.encode('ascii', 'ignore').decode('ascii')
 
-    # Read local JSON file
-    start_urls = ['file:///home/markun/devel/datasets/legisla/cn/ProposicaoComEmentas.json']
+    def get_metadata_file(self):
+        """Autoria e ementa já vêm no próprio arquivo de texto: não há arquivo de metadados"""
+        return None
 
-    def parse(self, response):
-        data = json.loads(response.text)
-        for entry in data:
-            item = ProposicaoItem()
-            raw_title = entry.get('Titulo', '')
-            item['title'] = raw_title.strip()
+    def get_text_file(self):
+        return f'{self.folder}/cn/ProposicaoComEmentas.json'
 
-            # Parse type, number, year from title
-            parts = raw_title.split()
-            item['type'] = parts[0] if parts else ''
-            num_year = parts[1] if len(parts) > 1 else ''
-            if '/' in num_year:
-                num, yr = num_year.split('/')
-                try:
-                    item['number'] = int(num)
-                    item['year'] = int(yr)
-                except ValueError:
-                    item['number'] = None
-                    item['year'] = None
-            else:
-                item['number'] = None
-                item['year'] = None
+    def build_item(self, entry, meta=None):
+        item = ProposicaoItem()
+        raw_title = entry.get('Titulo', '').strip()
+        item['titulo_bruto'] = raw_title
 
-            # Other fields
-            item['house'] = "Câmara dos Deputados"
-            authors = entry.get('Autoria', '')
-            item['author'] = [a.strip() for a in authors.split(',')] if authors else []
-            item['subject'] = entry.get('ementa', '')
-            item['full_text'] = entry.get('Texto', '')
-            item['presentation_date'] =  f"{item['year']}-01-01" if item['year'] else None
-            item['length'] = len(item['full_text'] or '')
-            #item['chunks'] = self.chunk_text(item['full_text'] or '')
+        # Parse type, number, year from title
+        parts = raw_title.split()
+        tipo = parts[0] if parts else ''
+        number = year = None
+        num_year = parts[1] if len(parts) > 1 else ''
+        if '/' in num_year:
+            num, yr = num_year.split('/', 1)
+            try:
+                number = int(num)
+                year = int(yr)
+            except ValueError:
+                number = year = None
+        item['tipo_bruto'] = tipo
+        item['numero_bruto'] = number
+        item['ano_bruto'] = year
 
-            # Encode filters for URL
-            filters = json.dumps([
-                {"numero": str(item['number'])},
-                {"ano": str(item['year'])}
-            ])
-            encoded_filters = urllib.parse.quote(filters)
-            item['url'] = f'https://www.camara.leg.br/busca-portal?contextoBusca=BuscaProposicoes&filtros={encoded_filters}&tipos={item["type"]}&pagina=1'
+        # Other fields
+        item['casa_legislativa_bruto'] = self.house
+        authors = entry.get('Autoria', '')
+        item['autores_bruto'] = [a.strip() for a in authors.split(',')] if authors else []
+        item['ementa_bruto'] = entry.get('ementa', '')
+        item['conteudo_markdown'] = entry.get('Texto', '')
+        item['data_documento_bruto'] = f"{year}-01-01" if year else None
+        item['meta_bruto'] = meta or {}
 
-            # UUID based on house_type_number_year
-            uid_src = f"{item['house']}_{item['type']}_{item['number']}_{item['year']}"
-            item['uuid'] = hashlib.md5(uid_src.encode('utf-8')).hexdigest()
-            item['scraped_at'] = datetime.utcnow().date().isoformat()
+        # Encode filters for URL
+        filters = json.dumps([
+            {"numero": str(number)},
+            {"ano": str(year)}
+        ])
+        encoded_filters = urllib.parse.quote(filters)
+        item['url_bruto'] = f'https://www.camara.leg.br/busca-portal?contextoBusca=BuscaProposicoes&filtros={encoded_filters}&tipos={tipo}&pagina=1'
 
-            yield item
+        # UUID based on house_type_number_year
+        uid_src = f"{self.house}_{tipo}_{number}_{year}"
+        item['uuid'] = hashlib.md5(uid_src.encode('utf-8')).hexdigest()
+
+        item['uf_bruto'] = self.uf
+        item['municipio_bruto'] = self.municipio
+        item['slug_bruto'] = self.slug
+        item['data_raspagem_bruto'] = datetime.now().isoformat()
+        return item
 
     def chunk_text(self, text, max_tokens=5000, overlap_tokens=50):
         words = text.split()
@@ -2,7 +2,9 @@ import scrapy
 import hashlib
 import re
 from datetime import datetime
+from urllib.parse import urlencode
 from ..items import ProposicaoItem
+from ..padronizacao import converter_data
 
 class ProposicoesFortalezaSpider(scrapy.Spider):
     """
@@ -61,9 +63,24 @@ class ProposicoesFortalezaSpider(scrapy.Spider):
     def start_requests(self):
         base_url = "https://sapl.fortaleza.ce.leg.br/materia/pesquisar-materia"
         for tipo in self.TIPOS_DOCUMENTO.keys():
-            url = f"{base_url}?page=1&tipo={tipo}"
+            params = {'page': 1, 'tipo': tipo, **self._filtro_data_apresentacao()}
+            url = f"{base_url}?{urlencode(params)}"
             yield scrapy.Request(url, callback=self.parse)
 
+    def _filtro_data_apresentacao(self):
+        """
+        Filtro de período do SAPL (data_apresentacao_0/_1, em dd/mm/aaaa), para o servidor devolver
+        só as matérias do período. Os links de paginação do SAPL preservam os filtros.
+        """
+        if not (self.data_inicio or self.data_fim):
+            return {}
+        inicio = datetime.strptime(self.data_inicio, '%Y-%m-%d') if self.data_inicio else datetime(1900, 1, 1)
+        fim = datetime.strptime(self.data_fim, '%Y-%m-%d') if self.data_fim else datetime.now()
+        return {
+            'data_apresentacao_0': inicio.strftime('%d/%m/%Y'),
+            'data_apresentacao_1': fim.strftime('%d/%m/%Y'),
+        }
+
     def parse(self, response):
         linhas = response.css('table.table-striped tr')
         for linha in linhas:
@@ -71,9 +88,9 @@ class ProposicoesFortalezaSpider(scrapy.Spider):
                 return
 
             data_str = linha.xpath("string(.//strong[contains(text(), 'Apresentação:')]/following-sibling::text()[1])").get('').strip()
-            data_obj = self._extrair_data_obj(data_str)
+            data_obj = converter_data(data_str)
 
-            # Filtro manual por data
+            # Filtro manual por data (redundante com o filtro do SAPL, por segurança)
             if self.data_inicio and data_obj and data_obj < datetime.strptime(self.data_inicio, '%Y-%m-%d'):
                 continue
             if self.data_fim and data_obj and data_obj > datetime.strptime(self.data_fim, '%Y-%m-%d'):
@@ -149,17 +166,3 @@ class ProposicoesFortalezaSpider(scrapy.Spider):
             return datetime.strptime(data_texto.strip(), '%Y-%m-%d').strftime('%Y-%m-%d')
         except ValueError:
             raise ValueError(f"Formato de data inválido: '{data_texto}'. Use o formato YYYY-MM-DD.")
-
-    def _extrair_data_obj(self, data_str):
-        if not data_str:
-            return None
-        try:
-            meses = {
-                'janeiro': '01', 'fevereiro': '02', 'março': '03', 'abril': '04',
-                'maio': '05', 'junho': '06', 'julho': '07', 'agosto': '08',
-                'setembro': '09', 'outubro': '10', 'novembro': '11', 'dezembro': '12'
-            }
-            dia, mes_nome, ano = data_str.split(' de ')
-            return datetime.strptime(f"{dia}/{meses[mes_nome.lower()]}/{ano}", '%d/%m/%Y')
-        except (ValueError, KeyError):
-            return None
@@ -1,16 +1,41 @@
+import os
 import scrapy
-import json
+from scrapy import signals
 import hashlib
 from datetime import datetime
 from ..items import ProposicaoItem
-from ..utils import clean_json_text
+from ..legislapi import IndiceMetadados, RegistroImpressoes, chave_titulo, impressao_registro
+from ..utils import iterar_json_array
 
 class ProposicoesLegislapi(scrapy.Spider):
     name = 'proposicoessp'
     house = 'Assembleia Legislativa de São Paulo'
     folder = '/home/markun/devel/datasets/legisla'
     uf = 'sp'
+    esfera = 'ESTADUAL'
+    municipio = None
     slug = name.replace(' ', '_').lower().encode('ascii', 'ignore').decode('ascii')
+
+    def __init__(self, atualizacao_completa=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # -a atualizacao_completa=1 emite todas as proposições, mesmo as que não mudaram no dump
+        self.atualizacao_completa = str(atualizacao_completa or '').lower() in ('1', 'true', 'sim', 's')
+        self._impressoes = None
+        self.metadata = None
+        # uuid → (chave, impressão) dos itens emitidos que ainda não passaram pelos pipelines
+        self._impressoes_pendentes = {}
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(spider.item_descartado, signal=signals.item_dropped)
+        crawler.signals.connect(spider.item_descartado, signal=signals.item_error)
+        return spider
+
+    @property
+    def casa_legislativa(self):
+        return self.house
     
     def get_metadata_file(self):
         """Retorna o caminho do arquivo de metadados"""
@@ -20,9 +45,39 @@ class ProposicoesLegislapi(scrapy.Spider):
         """Retorna o caminho do arquivo de texto completo"""
         return f'{self.folder}/{self.uf}/ProjetoInteiroTeor{self.uf.upper()}.json'
     
-    def start_requests(self):
-        # Carrega metadados primeiro
-        yield scrapy.Request(f'file://{self.get_metadata_file()}', callback=self.parse_metadata)
+    async def start(self):
+        # Os arquivos são lidos em fluxo (elemento a elemento), sem passar pelo handler file:// do Scrapy
+        self.metadata = self.load_metadata()
+        stats = self.crawler.stats
+        for entry in iterar_json_array(self.get_text_file()):
+            chave, impressao, meta = self.preparar_entrada(entry)
+            if not self.atualizacao_completa and self.impressoes.impressao(chave) == impressao:
+                stats.inc_value('legislapi/itens_inalterados')
+                continue
+            stats.inc_value('legislapi/itens_emitidos')
+            item = self.build_item(entry, meta)
+            # a impressão só é registrada quando o item sai dos pipelines (ver item_scraped)
+            self._impressoes_pendentes[item['uuid']] = (chave, impressao)
+            yield item
+
+    def _uuid_item(self, item):
+        # depois da padronização o item chega como {'item_bruto', 'item_padronizado'}
+        return (item.get('item_bruto') or item).get('uuid')
+
+    def item_scraped(self, item, response, spider):
+        pendente = self._impressoes_pendentes.pop(self._uuid_item(item), None)
+        if pendente is not None:
+            self.impressoes.registrar(*pendente)
+
+    def item_descartado(self, item, response, spider, **kwargs):
+        # sem registro: a proposição é emitida de novo na próxima execução
+        self._impressoes_pendentes.pop(self._uuid_item(item), None)
+
+    def preparar_entrada(self, entry):
+        """Chave do título, impressão (texto + metadados) e metadados de uma entrada do texto integral"""
+        raw_title = entry.get('Titulo', '').strip()
+        meta = self.obter_metadados(raw_title)
+        return chave_titulo(raw_title), impressao_registro(entry, meta), meta
 
     def build_url(self, entry, meta):
         """Constrói a URL pública da proposição"""
@@ -30,55 +85,87 @@ class ProposicoesLegislapi(scrapy.Spider):
         if id_orig:
             return f'https://www.al.sp.gov.br/propositura/?id={id_orig}'
         return ''
-    
-    def parse_metadata(self, response):
-        self.metadata = {}
-        data = clean_json_text(response.text)
-        for entry in data:
-            key = hashlib.md5(entry['Titulo'].encode('utf-8')).hexdigest()
-            self.metadata[key] = entry
-        yield scrapy.Request(f'file://{self.get_text_file()}', callback=self.parse)
-
-    def parse(self, response):
-        data = clean_json_text(response.text)
-        for entry in data:
-            item = ProposicaoItem()
-
-            # Título, Casa, Tipo
-            raw_title = entry.get('Titulo', '').strip()
-            item['title'] = raw_title
-            item['house'] = self.house
-            item['type'] = raw_title.split()[0] if raw_title else ''
-
-            # Número e Ano
-            num_year = raw_title.split()[1] if len(raw_title.split()) > 1 else ''
-            try:
-                num, yr = num_year.split('/')
-                number = int(num)
-                year = int(yr)
-            except ValueError:
-                number = None
-                year = None
-            item['number'] = number
-            item['year'] = year
-
-            # Metadados (autoria, ementa, data)
-            item['uuid'] = hashlib.md5(raw_title.encode('utf-8')).hexdigest()
-            meta = self.metadata.get(item["uuid"], {})
-            authors = meta.get('Autoria', '')
-            item['author'] = [a.strip() for a in authors.split(',')] if authors else []
-            item['subject'] = meta.get('Ementa', '')
-            item['presentation_date'] = meta.get('DataApresentacao')
-
-            # Texto e métricas
-            item['full_text'] = entry.get('Texto', '')
-            item['length'] = len(item['full_text'] or '')
-            item['meta'] = meta
-
-            # URL pública
-            item['url'] = self.build_url(entry, meta)
-
-            # UUID e timestamp
-            item['scraped_at'] = datetime.now().isoformat()
 
-            yield item
+    def caminho_estado(self, sufixo):
+        """Caminho de um banco de estado do spider (índice de metadados, impressões) em LEGISLAPI_INDICE_DIR"""
+        diretorio = self.settings.get('LEGISLAPI_INDICE_DIR', 'storage/dbs/legislapi')
+        return os.path.join(diretorio, f'{self.name}_{sufixo}.sqlite3')
+
+    def load_metadata(self, reconstruir=True):
+        """Abre o índice em disco dos metadados, reconstruindo-o se o arquivo de metadados mudou"""
+        if not self.get_metadata_file():
+            return None
+        indice = IndiceMetadados(self.caminho_estado('metadados'), self.get_metadata_file())
+        if reconstruir and indice.atualizar():
+            self.logger.info(f"Índice de metadados reconstruído a partir de {self.get_metadata_file()}")
+        return indice
+
+    def obter_metadados(self, raw_title):
+        return self.metadata.obter(raw_title) if self.metadata is not None else {}
+
+    @property
+    def impressoes(self):
+        """Registro das impressões das proposições emitidas nas execuções anteriores deste estado"""
+        if self._impressoes is None:
+            self._impressoes = RegistroImpressoes(self.caminho_estado('impressoes'))
+        return self._impressoes
+
+    @property
+    def saida_incremental(self):
+        """Em execuções incrementais só as proposições novas ou alteradas são emitidas, num .jl de delta próprio"""
+        return not self.atualizacao_completa and not self.impressoes.vazio()
+
+    def closed(self, reason):
+        if self._impressoes is not None:
+            # execução interrompida: nada é gravado e a próxima execução emite de novo o que ficou de fora
+            if reason == 'finished':
+                self.impressoes.confirmar()
+            else:
+                self.impressoes.descartar()
+            self.impressoes.fechar()
+        if self.metadata is not None:
+            self.metadata.fechar()
+
+    def build_item(self, entry, meta=None):
+        item = ProposicaoItem()
+
+        # Título, Casa, Tipo
+        raw_title = entry.get('Titulo', '').strip()
+        item['titulo_bruto'] = raw_title
+        item['casa_legislativa_bruto'] = self.house
+        item['tipo_bruto'] = raw_title.split()[0] if raw_title else ''
+
+        # Número e Ano
+        num_year = raw_title.split()[1] if len(raw_title.split()) > 1 else ''
+        try:
+            num, yr = num_year.split('/')
+            number = int(num)
+            year = int(yr)
+        except ValueError:
+            number = None
+            year = None
+        item['numero_bruto'] = number
+        item['ano_bruto'] = year
+
+        # Metadados (autoria, ementa, data)
+        item['uuid'] = hashlib.md5(raw_title.encode('utf-8')).hexdigest()
+        if meta is None:
+            meta = self.obter_metadados(raw_title)
+        authors = meta.get('Autoria', '')
+        item['autores_bruto'] = [a.strip() for a in authors.split(',')] if authors else []
+        item['ementa_bruto'] = meta.get('Ementa', '')
+        item['data_documento_bruto'] = meta.get('DataApresentacao')
+
+        # Texto integral
+        item['conteudo_markdown'] = entry.get('Texto', '')
+        item['meta_bruto'] = meta
+
+        # URL pública
+        item['url_bruto'] = self.build_url(entry, meta)
+
+        item['uf_bruto'] = self.uf
+        item['municipio_bruto'] = self.municipio
+        item['slug_bruto'] = self.slug
+        item['data_raspagem_bruto'] = datetime.now().isoformat()
+
+        return item
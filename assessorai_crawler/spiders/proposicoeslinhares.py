@@ -5,6 +5,9 @@ import re
 from datetime import datetime
 import hashlib
 from ..items import ProposicaoItem
+from ..padronizacao import converter_data
+from ..utils import impressao_linha
+from ..aspnet import PaginadorAspNet
 
 class ProposicoesLinharesSpider(scrapy.Spider):
     # --- IDENTIDADE DO SPIDER ---
@@ -35,6 +38,7 @@ class ProposicoesLinharesSpider(scrapy.Spider):
 
         # Contador de itens processados
         self.itens_processados = 0
+        self.paginador = None
 
         # Log padronizado
         log_msg = f"🕷️ Iniciando coleta para {self.casa_legislativa}"
@@ -44,6 +48,15 @@ class ProposicoesLinharesSpider(scrapy.Spider):
             log_msg += f" | Limite: {self.limite_total_itens} itens"
         self.logger.info(log_msg)
 
+    async def start(self):
+        self.paginador = PaginadorAspNet(
+            self, self.start_urls[0], self.parse,
+            alvo_proximo='ctl00$ContentPlaceHolder1$lbNext',
+            id_proximo='ContentPlaceHolder1_lbNext',
+            seletor_itens='div.kt-widget5__item',
+        )
+        yield self.paginador.inicio()
+
     def parse(self, response):
         """Processa a página de listagem, filtra por data e segue para os detalhes."""
         proposicoes = response.css("div.kt-widget5__item")
@@ -57,14 +70,7 @@ class ProposicoesLinharesSpider(scrapy.Spider):
             # --- Data da listagem ---
             data_str = prop.css("span.kt-font-info:contains('Data:') + span.kt-font-info::text").get('') or ''
             data_str = data_str.strip()
-            data_obj = None
-            if data_str:
-                for fmt in ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y'):
-                    try:
-                        data_obj = datetime.strptime(data_str, fmt)
-                        break
-                    except ValueError:
-                        continue
+            data_obj = converter_data(data_str)
 
             # --- Ano como fallback ---
             titulo = prop.css("a.kt-widget5__title::text").get('') or ''
@@ -98,23 +104,13 @@ class ProposicoesLinharesSpider(scrapy.Spider):
             link_detalhes = prop.css("a.kt-widget5__title::attr(href)").get()
             if link_detalhes:
                 self.itens_processados += 1
-                yield response.follow(link_detalhes, callback=self.parse_detalhes, meta={'item': item})
+                # a linha inteira da listagem (título, data, situação, autor) resume a proposição
+                vistos = {'uuid': item['uuid'], 'impressao': impressao_linha(prop.xpath('normalize-space(.)').get())}
+                yield response.follow(link_detalhes, callback=self.parse_detalhes, meta={'item': item, 'vistos': vistos})
 
         # --- Paginação ---
-        if continuar_paginando:
-            next_page_button = response.css('a#ContentPlaceHolder1_lbNext[href]')
-            if next_page_button:
-                self.logger.info("➡️ Paginação: indo para próxima página...")
-                form_data = {
-                    '__EVENTTARGET': 'ctl00$ContentPlaceHolder1$lbNext',
-                    '__EVENTARGUMENT': '',
-                    '__VIEWSTATE': response.css('input#__VIEWSTATE::attr(value)').get(),
-                    '__VIEWSTATEGENERATOR': response.css('input#__VIEWSTATEGENERATOR::attr(value)').get(),
-                    '__EVENTVALIDATION': response.css('input#__EVENTVALIDATION::attr(value)').get(),
-                }
-                yield scrapy.FormRequest(url=response.url, formdata=form_data, callback=self.parse)
+        yield from self.paginador.proximas(response, continuar_paginando)
 
-    
     def _criar_item_da_lista(self, prop, response):
         """Cria o item bruto inicial a partir da listagem."""
         item = ProposicaoItem()
@@ -152,14 +148,7 @@ class ProposicoesLinharesSpider(scrapy.Spider):
         item['data_documento_bruto'] = data_str
 
         # Converte a data oficial
-        data_obj = None
-        if data_str:
-            for fmt in ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y'):
-                try:
-                    data_obj = datetime.strptime(data_str, fmt)
-                    break
-                except ValueError:
-                    continue
+        data_obj = converter_data(data_str)
 
         # Filtro final
         if data_obj and (self.data_inicio or self.data_fim):
@@ -206,3 +195,7 @@ class ProposicoesLinharesSpider(scrapy.Spider):
             return datetime.strptime(data_texto.strip(), '%Y-%m-%d').strftime('%Y-%m-%d')
         except ValueError:
             raise ValueError(f"Formato de data inválido: '{data_texto}'. Use o formato YYYY-MM-DD.")
+
+    def closed(self, reason):
+        if self.paginador is not None:
+            self.paginador.fechar(reason)
@@ -5,6 +5,8 @@ import re
 from datetime import datetime
 import hashlib
 from ..items import ProposicaoItem
+from ..padronizacao import converter_data
+from ..utils import impressao_linha
 
 class ProposicoesPocosDeCaldasSpider(scrapy.Spider):
     """
@@ -75,14 +77,7 @@ class ProposicoesPocosDeCaldasSpider(scrapy.Spider):
 
             data_str = self._get_text_after_strong(prop, "Data:") or ''
             data_str = data_str.strip()
-            data_obj = None
-            if data_str:
-                for fmt in ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y'):
-                    try:
-                        data_obj = datetime.strptime(data_str, fmt)
-                        break
-                    except ValueError:
-                        continue
+            data_obj = converter_data(data_str)
 
             # --- Filtro de intervalo ---
             if data_obj and (self.data_inicio or self.data_fim):
@@ -99,7 +94,13 @@ class ProposicoesPocosDeCaldasSpider(scrapy.Spider):
             self.itens_processados += 1
             link_detalhes = prop.css("h4 a::attr(href)").get()
             if link_detalhes:
-                yield response.follow(link_detalhes, callback=self.parse_detalhes)
+                # o uuid do item é o hash da URL do detalhe
+                url_detalhes = response.urljoin(link_detalhes)
+                vistos = {
+                    'uuid': hashlib.md5(url_detalhes.encode('utf-8')).hexdigest(),
+                    'impressao': impressao_linha(prop.xpath('normalize-space(.)').get()),
+                }
+                yield scrapy.Request(url_detalhes, callback=self.parse_detalhes, meta={'vistos': vistos})
 
         if continuar_paginando:
             next_page = page_number + 1
@@ -121,14 +122,7 @@ class ProposicoesPocosDeCaldasSpider(scrapy.Spider):
         item['data_documento_bruto'] = data_str.strip()
 
         # --- Filtro final de data ---
-        data_obj = None
-        if data_str:
-            for fmt in ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y'):
-                try:
-                    data_obj = datetime.strptime(data_str, fmt)
-                    break
-                except ValueError:
-                    continue
+        data_obj = converter_data(data_str)
 
         if data_obj and (self.data_inicio or self.data_fim):
             di = datetime.strptime(self.data_inicio, '%Y-%m-%d') if self.data_inicio else None
@@ -1,7 +1,134 @@
+import codecs
+import hashlib
 import json
+import mmap
+import re
+from parsel import Selector
+from scrapy.http import HtmlResponse
+
+# bytes de controle (exceto \n e \r) removidos antes do decode, como em clean_json_text
+_CONTROLES = bytes(b for b in range(32) if b not in (10, 13))
+_ESPACOS_JSON = " \t\n\r"
+# strings JSON inteiras (com escapes) ou delimitadores de objetos/arrays; bytes de caracteres UTF-8 multibyte nunca são aspas nem barra invertida
+_RE_TOKENS_JSON = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}]', re.S)
 
 
 def clean_json_text(raw_text):
     """Remove control characters before JSON decode"""
     clean_json = ''.join(ch for ch in raw_text if ch in ('\n', '\r') or ord(ch) >= 32)
     return json.loads(clean_json)
+
+
+def iterar_json_array(caminho, tamanho_bloco=1 << 20):
+    """
+    Lê um arquivo com um array JSON e devolve os elementos um a um, com memória constante.
+    O arquivo é mapeado em memória e processado em blocos: caracteres de controle são removidos
+    direto nos bytes, o UTF-8 (com ou sem BOM) é decodificado incrementalmente e cada elemento
+    é lido com raw_decode assim que estiver completo no buffer.
+    """
+    decodificador = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+    with open(caminho, "rb") as f:
+        if not f.seek(0, 2):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            tamanho = len(mapa)
+            offset = 0
+            buffer = ""
+            pos = 0
+            inicio_array = True
+
+            def ler(quantidade):
+                nonlocal offset
+                bloco = mapa[offset:offset + quantidade]
+                offset += len(bloco)
+                return utf8.decode(bloco.translate(None, _CONTROLES), final=offset >= tamanho)
+
+            while True:
+                # pula espaços, vírgulas e o colchete de abertura
+                while pos < len(buffer) and (buffer[pos] in _ESPACOS_JSON or buffer[pos] == ","
+                                             or (inicio_array and buffer[pos] == "[")):
+                    if buffer[pos] == "[":
+                        inicio_array = False
+                    pos += 1
+                if pos >= len(buffer):
+                    if offset >= tamanho:
+                        return
+                    buffer, pos = ler(tamanho_bloco), 0
+                    continue
+                if buffer[pos] == "]":
+                    return
+
+                necessario = tamanho_bloco
+                while True:
+                    try:
+                        elemento, fim = decodificador.raw_decode(buffer, pos)
+                        break
+                    except json.JSONDecodeError:
+                        if offset >= tamanho:
+                            raise
+                        # elemento ainda incompleto: lê mais (blocos crescentes para elementos muito grandes)
+                        buffer = buffer[pos:] + ler(necessario)
+                        pos = 0
+                        necessario *= 2
+                yield elemento
+                pos = fim
+                if pos > tamanho_bloco:
+                    buffer, pos = buffer[pos:], 0
+
+
+def offsets_json_array(caminho):
+    """
+    Varre um arquivo com um array JSON de objetos e devolve [(inicio, fim)] com os offsets em bytes
+    de cada elemento, sem decodificar nem montar os objetos. Usado para dividir arquivos grandes
+    em fatias processadas em paralelo com ler_elemento_json.
+    """
+    offsets = []
+    profundidade = 0
+    inicio = None
+    with open(caminho, "rb") as f:
+        if not f.seek(0, 2):
+            return offsets
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            for match in _RE_TOKENS_JSON.finditer(mapa):
+                caractere = mapa[match.start()]
+                if caractere == 0x22:  # string: o conteúdo não altera a profundidade
+                    continue
+                if caractere in (0x7B, 0x5B):  # { ou [
+                    profundidade += 1
+                    if profundidade == 2:
+                        inicio = match.start()
+                else:
+                    if profundidade == 2:
+                        offsets.append((inicio, match.end()))
+                    profundidade -= 1
+    return offsets
+
+
+def ler_elemento_json(mapa, inicio, fim):
+    """Decodifica o elemento entre os offsets dados por offsets_json_array, removendo caracteres de controle."""
+    return json.loads(mapa[inicio:fim].translate(None, _CONTROLES).decode("utf-8"))
+
+
+def seletor_html(response):
+    """
+    Selector lxml da página. Para HtmlResponse é o próprio response.selector (criado uma única vez e
+    compartilhado com response.css/xpath); para as demais respostas é construído direto dos bytes
+    do corpo, sem decodificá-lo para str antes.
+    """
+    if isinstance(response, HtmlResponse):
+        return response.selector
+    return Selector(body=response.body, encoding=response.encoding, type="html", base_url=response.url)
+
+
+def texto_limpo(seletor):
+    """Equivalente ao get_text(strip=True) do BeautifulSoup: concatena os nós de texto sem espaços nas pontas."""
+    if seletor is None:
+        return ""
+    return "".join(texto.strip() for texto in seletor.xpath(".//text()").getall())
+
+
+def impressao_linha(*valores):
+    """Resumo (SHA-1) do conteúdo de uma linha da listagem, usado em meta['vistos'] para detectar mudanças."""
+    conteudo = json.dumps(valores, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()